@@ -6,6 +6,14 @@ import time
 import os
 import pythoncom  # <--- IMPORTANTE: Necesario para trabajar con hilos
 
+try:
+    from nexus_metrics import paso_sap
+    from nexus_cancel import verificar_cancelacion
+except ImportError:  # Bot ejecutado suelto, fuera de la suite
+    from contextlib import nullcontext
+    def paso_sap(bot, paso): return nullcontext()
+    def verificar_cancelacion(): pass
+
 class SapBotAuditor:
     def __init__(self):
         self.RUTA_BASE = r"C:\SAP_TEMP"
@@ -125,7 +133,8 @@ class SapBotAuditor:
             session.findById("wnd[0]/usr/ctxtCHARG-LOW").text = ""
             session.findById("wnd[0]/usr/ctxtWERKS-LOW").text = CENTRO
             session.findById("wnd[0]/usr/ctxtLGORT-LOW").text = ALMACEN
-            session.findById("wnd[0]/tbar[1]/btn[8]").press()
+            with paso_sap("AUDITOR", "MB52"):
+                session.findById("wnd[0]/tbar[1]/btn[8]").press()
 
             if "No existen" in session.findById("wnd[0]/sbar").Text:
                 print(f"⚠️ El almacén {ALMACEN} está vacío.")
@@ -150,6 +159,7 @@ class SapBotAuditor:
                 return
 
             # 2. MB51
+            verificar_cancelacion()
             print(f"🕵️ 2. Descargando MB51 (Últimos {DIAS_HISTORIA} días)...")
             session.findById("wnd[0]/tbar[0]/okcd").text = "/nMB51"
             session.findById("wnd[0]").sendVKey(0)
@@ -176,7 +186,8 @@ class SapBotAuditor:
             inicio = hoy - datetime.timedelta(days=DIAS_HISTORIA)
             session.findById("wnd[0]/usr/ctxtBUDAT-LOW").text = inicio.strftime("%d.%m.%Y")
             session.findById("wnd[0]/usr/ctxtBUDAT-HIGH").text = hoy.strftime("%d.%m.%Y")
-            session.findById("wnd[0]/tbar[1]/btn[8]").press()
+            with paso_sap("AUDITOR", "MB51"):
+                session.findById("wnd[0]/tbar[1]/btn[8]").press()
 
             df_mb51 = pd.DataFrame()
             msg = session.findById("wnd[0]/sbar").Text
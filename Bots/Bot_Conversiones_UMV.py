@@ -6,6 +6,11 @@ import os
 import pyperclip
 import pythoncom
 
+try:
+    from nexus_cancel import verificar_cancelacion
+except ImportError:  # Bot ejecutado suelto, fuera de la suite
+    def verificar_cancelacion(): pass
+
 class SapBotConversiones:
     def __init__(self):
         self.session = None
@@ -41,6 +46,7 @@ class SapBotConversiones:
         conversiones = []
         
         for idx, material in enumerate(materiales):
+            verificar_cancelacion()
             print(f"[{idx+1}/{len(materiales)}] Procesando material: {material}")
             
             try:
@@ -7,6 +7,11 @@ import time
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 
+try:
+    from nexus_cancel import verificar_cancelacion
+except ImportError:  # Bot ejecutado suelto, fuera de la suite
+    def verificar_cancelacion(): pass
+
 class SapBotTransporte:
     def check_file_open(self, filepath):
         if not os.path.exists(filepath): return False
@@ -77,6 +82,7 @@ class SapBotTransporte:
         print("📊 Leyendo lista...")
         
         while intentos_sin_datos < 3:
+            verificar_cancelacion()
             datos_en_pantalla = 0
             
             # Leer hasta 34 filas visibles
@@ -112,6 +118,7 @@ class SapBotTransporte:
         timestamp = datetime.now().strftime("%d-%m-%Y %H:%M")
 
         for i, tknum in enumerate(lista_tknum):
+            verificar_cancelacion()
             print(f"   [{i+1}/{len(lista_tknum)}] Procesando {tknum}...", end="\r")
             try:
                 session.findById("wnd[0]/tbar[0]/okcd").text = "/nVT03N"
@@ -212,6 +219,7 @@ class SapBotTransporte:
 
         # --- GUARDAR ---
         print("\n💾 Guardando Excel...")
+        guardado = None
         if datos_finales:
             df_nuevos = pd.DataFrame(datos_finales)
             df_nuevos['Transporte'] = pd.to_numeric(df_nuevos['Transporte'], errors='coerce')
@@ -241,6 +249,7 @@ class SapBotTransporte:
 
             try:
                 df_total.to_excel(archivo_master, index=False)
+                guardado = archivo_master
                 print(f"✅ Archivo actualizado: {os.path.basename(archivo_master)}")
                 
                 if enviar_correo:
@@ -258,4 +267,5 @@ class SapBotTransporte:
                     print("📋 Correo omitido (opción desactivada).")
             except: print("❌ ERROR: Cierra el Excel para guardar.")
         
-        pythoncom.CoUninitialize()
\ No newline at end of file
+        pythoncom.CoUninitialize()
+        return guardado
\ No newline at end of file
@@ -8,6 +8,11 @@ import pythoncom
 import shutil
 from datetime import datetime
 
+try:
+    from nexus_cancel import verificar_cancelacion
+except ImportError:  # Bot ejecutado suelto, fuera de la suite
+    def verificar_cancelacion(): pass
+
 class SapBotTraspasoLT01:
     def __init__(self):
         self.session = None
@@ -524,6 +529,7 @@ class SapBotTraspasoLT01:
         print(f"--- Ejecutando {len(movimientos)} Movimientos en LT01 ---")
         
         for i, mov in enumerate(movimientos):
+            verificar_cancelacion()
             print(f"[{i+1}/{len(movimientos)}] LT01: {mov['Material']} | Lote {mov['Lote']} | {mov['Cantidad']} -> {mov['Tipo_Destino']}")
             
             try:
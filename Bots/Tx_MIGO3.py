@@ -10,6 +10,14 @@ from datetime import datetime
 import pythoncom
 import ctypes # [NEW]
 
+try:
+    from nexus_metrics import paso_sap
+    from nexus_cancel import verificar_cancelacion
+except ImportError:  # Bot ejecutado suelto, fuera de la suite
+    from contextlib import nullcontext
+    def paso_sap(bot, paso): return nullcontext()
+    def verificar_cancelacion(): pass
+
 class SapMigoBotTurbo:
     def __init__(self):
         self.session = None
@@ -279,6 +287,7 @@ class SapMigoBotTurbo:
         current_sap_scroll = 0 
 
         for block_idx in range(num_blocks):
+            verificar_cancelacion()  # entre bloques: SAP queda en un estado conocido
             start_idx = block_idx * BLOCK_SIZE
             end_idx = min((block_idx + 1) * BLOCK_SIZE, total_rows)
             print(f"\n--- Bloque {block_idx + 1} (Filas {start_idx} a {end_idx}) ---")
@@ -309,8 +318,9 @@ class SapMigoBotTurbo:
                         self.set_val_robust(self.cols[key], i, val)
 
             print("   -> Validando Origen...")
-            self.session.findById("wnd[0]").sendVKey(0) 
-            time.sleep(0.8) # Opt
+            with paso_sap("MIGO", "validar_origen"):
+                self.session.findById("wnd[0]").sendVKey(0) 
+                time.sleep(0.8) # Opt
             
             self.table = self.find_migo_table()
             try: 
@@ -337,8 +347,9 @@ class SapMigoBotTurbo:
 
             if has_dest:
                 print("   -> Validando Destinos...")
-                self.session.findById("wnd[0]").sendVKey(0)
-                time.sleep(0.8) # Opt
+                with paso_sap("MIGO", "validar_destinos"):
+                    self.session.findById("wnd[0]").sendVKey(0)
+                    time.sleep(0.8) # Opt
                 self.table = self.find_migo_table()
                 try: 
                     if self.table.VerticalScrollbar.Position != current_sap_scroll:
@@ -424,15 +424,47 @@ export default function App() {
     if (!confirm("¿Estás seguro de que deseas cancelar esta orden?")) return;
     try {
       const currentOrder = orders.find(o => o.id === orderId);
-      const { error } = await supabase
-        .from('ordenes_bot')
-        .update({
-          status: 'cancelled',
-          execution_logs: [...(currentOrder?.execution_logs || []), "⚠️ Cancelado por el usuario"]
-        })
-        .eq('id', orderId);
-
-      if (error) throw error;
+      // En cola: se descarta directo. En ejecución: el worker la detiene en
+      // el próximo punto de control del bot (o al vencer su tiempo de gracia).
+      // .select() devuelve las filas actualizadas: si no hay ninguna, la orden
+      // cambió de estado entre la lista y el clic
+      const cancelar = (status?: string) => status === 'running'
+        ? supabase
+          .from('ordenes_bot')
+          .update({ cancel_requested: true })
+          .eq('id', orderId)
+          .eq('status', 'running')
+          .select('id')
+        : supabase
+          .from('ordenes_bot')
+          .update({
+            status: 'cancelled',
+            execution_logs: [...(currentOrder?.execution_logs || []), "⚠️ Cancelado por el usuario"]
+          })
+          .eq('id', orderId)
+          .eq('status', 'pending')
+          .select('id');
+
+      let status = currentOrder?.status;
+      for (let intento = 0; intento < 2; intento++) {
+        const { data, error } = await cancelar(status);
+        if (error) throw error;
+        if (data && data.length > 0) return;
+
+        // Releer el estado real y decidir de nuevo (p. ej. pasó de pending a running)
+        const { data: actual, error: errorLectura } = await supabase
+          .from('ordenes_bot')
+          .select('status')
+          .eq('id', orderId)
+          .single();
+        if (errorLectura) throw errorLectura;
+        status = actual?.status;
+        if (status !== 'pending' && status !== 'running') {
+          alert(`La orden ya no se puede cancelar (estado: ${status}).`);
+          return;
+        }
+      }
+      throw new Error("La orden cambió de estado mientras se cancelaba");
     } catch (error) {
       console.error("Error cancelling order:", error);
       alert("Error al cancelar la orden.");
@@ -891,6 +923,8 @@ const StatusIndicator = ({ status }: { status: string }) => {
     case 'running': return <span className="text-blue-500 font-bold text-xs animate-pulse">[PROCESANDO]</span>;
     case 'success': return <span className="text-emerald-500 font-bold text-xs">[EXITOSO]</span>;
     case 'error': return <span className="text-red-500 font-bold text-xs">[FALLIDO]</span>;
+    case 'dead_letter': return <span className="text-red-700 font-bold text-xs">[DESCARTADO]</span>;
+    case 'cancelled': return <span className="text-slate-400 font-bold text-xs">[CANCELADO]</span>;
     default: return <span className="text-slate-500 text-xs">[UNK]</span>;
   }
 };
\ No newline at end of file
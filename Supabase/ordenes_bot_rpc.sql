@@ -0,0 +1,88 @@
+-- Funciones RPC que usa worker_sap sobre la tabla public.ordenes_bot.
+-- Ejecutar en el SQL Editor de Supabase (es idempotente: create or replace).
+
+-- ---------------------------------------------------------------------------
+-- Long-poll de órdenes pendientes (nexus_intake.LongPollIntake)
+-- Bloquea hasta que exista al menos una orden pending o venza p_timeout_s.
+-- El statement_timeout del rol debe ser mayor que la espera usada por el
+-- worker (20 s por defecto); si no, el worker acorta la espera solo.
+--   alter role anon set statement_timeout = '30s';
+-- Devuelve primero las urgentes y las de plazo más cercano; el orden fino
+-- (prioridad por bot, envejecimiento) lo hace el worker (nexus_priority).
+-- p_excluir: pendientes que el worker ya salteó porque su carril está
+-- ocupado; no lo despiertan. p_corriendo: órdenes que el worker ejecuta; si
+-- alguna deja de estar 'running' se liberó un carril y vuelve enseguida.
+-- Con ambas listas vacías se comporta como la versión anterior.
+-- ---------------------------------------------------------------------------
+alter table public.ordenes_bot add column if not exists prioridad smallint;
+alter table public.ordenes_bot add column if not exists fecha_limite timestamptz;
+
+-- La firma cambió: la vieja quedaría como sobrecarga ambigua para PostgREST
+drop function if exists public.esperar_ordenes_pendientes(int, int);
+
+create or replace function public.esperar_ordenes_pendientes(
+    p_timeout_s int default 20,
+    p_limite int default 20,
+    p_excluir text[] default '{}',
+    p_corriendo text[] default '{}'
+)
+returns setof public.ordenes_bot
+language plpgsql
+as $$
+declare
+    t_fin timestamptz := clock_timestamp() + make_interval(secs => least(p_timeout_s, 55));
+begin
+    loop
+        if exists (select 1 from public.ordenes_bot
+                   where status = 'pending' and not (id::text = any(p_excluir)))
+           or exists (select 1 from public.ordenes_bot
+                      where id::text = any(p_corriendo) and status <> 'running') then
+            return query
+                select * from public.ordenes_bot
+                where status = 'pending'
+                order by coalesce(prioridad, 2), fecha_limite nulls last, fecha_creacion
+                limit p_limite;
+            return;
+        end if;
+        exit when clock_timestamp() >= t_fin;
+        perform pg_sleep(0.25);
+    end loop;
+end;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Reclamo atómico de órdenes (nexus_claim.reclamar_orden)
+-- El worker hace PATCH ... WHERE status = 'pending' y sólo uno de los PCs
+-- obtiene la fila de vuelta.
+-- ---------------------------------------------------------------------------
+alter table public.ordenes_bot add column if not exists lease_token text;
+alter table public.ordenes_bot add column if not exists lease_expira timestamptz;
+create index if not exists ordenes_bot_status_idx on public.ordenes_bot (status, fecha_creacion);
+
+-- ---------------------------------------------------------------------------
+-- Latidos y reciclaje (nexus_claim.Latido / reciclar_vencidas)
+-- Las órdenes 'running' con lease vencido vuelven a 'pending' sumando un
+-- intento; al llegar al máximo quedan en 'dead_letter'.
+-- ---------------------------------------------------------------------------
+alter table public.ordenes_bot add column if not exists intentos int not null default 0;
+create index if not exists ordenes_bot_lease_idx on public.ordenes_bot (status, lease_expira);
+
+-- ---------------------------------------------------------------------------
+-- Cancelación (nexus_cancel). El panel marca cancel_requested en una orden
+-- 'running'; el latido del worker lo ve y el bot se detiene en su próximo
+-- punto de control. La orden termina en status 'cancelled'.
+-- ---------------------------------------------------------------------------
+alter table public.ordenes_bot add column if not exists cancel_requested boolean not null default false;
+
+-- ---------------------------------------------------------------------------
+-- Logs por lote (nexus_logship.LogShipper)
+-- Agrega varias líneas a execution_logs en una sola llamada.
+-- ---------------------------------------------------------------------------
+create or replace function public.append_execution_logs(order_id text, log_lines text[])
+returns void
+language sql
+as $$
+    update public.ordenes_bot
+    set execution_logs = coalesce(execution_logs, '[]'::jsonb) || to_jsonb(log_lines)
+    where id::text = order_id;
+$$;
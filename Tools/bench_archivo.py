@@ -0,0 +1,99 @@
+"""
+Benchmark del archivo de la bitácora (nexus_archive).
+
+Genera un historial sintético (días x bots x eventos) como CSV diarios de
+nexus_logger, lo compacta y compara una consulta de una semana de un bot
+contra recorrer el CSV completo. Verifica que ambas den los mismos eventos.
+
+    python Tools/bench_archivo.py --dias 365 --bots 10 --eventos 100
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nexus_archive import COLUMNAS, compactar, estadisticas, query_events
+
+ESTADOS = ["OK"] * 8 + ["INFO", "ERROR"]
+
+
+def generar(carpeta, dias, bots, eventos):
+    """CSV por día (como los deja la rotación) y el mismo historial en un solo CSV."""
+    random.seed(7)
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    nombres = ["MIGO", "LT01", "UMV", "AUDITOR", "TRANSPORTE", "PALLET", "VISION", "ZONALES", "STOCK", "MERMAS"]
+    nombres = (nombres * (bots // len(nombres) + 1))[:bots]
+    unico = open(os.path.join(carpeta, "historial_completo.csv"), "w", newline="", encoding="utf-8")
+    todo = csv.writer(unico)
+    todo.writerow(COLUMNAS)
+    for d in range(dias, 0, -1):
+        dia = hoy - timedelta(days=d)
+        filas = []
+        for bot in nombres:
+            for _ in range(eventos):
+                ts = dia + timedelta(seconds=random.randrange(86400), microseconds=random.randrange(10 ** 6))
+                filas.append([ts.isoformat(), bot, "operador", "Paso", f"Documento {random.randrange(10 ** 9)}",
+                              random.choice(ESTADOS)])
+        filas.sort()
+        with open(os.path.join(carpeta, f"bitacora_operaciones_{dia:%Y-%m-%d}.csv"), "w", newline="",
+                  encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(COLUMNAS)
+            escritor.writerows(filas)
+        todo.writerows(filas)
+    unico.close()
+    return hoy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--eventos", type=int, default=100, help="eventos por bot y día")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    hoy = generar(carpeta, args.dias, args.bots, args.eventos)
+    desde, hasta = hoy - timedelta(days=10), hoy - timedelta(days=3)
+    print(f"Historial: {args.dias * args.bots * args.eventos:,} eventos "
+          f"({os.path.getsize(os.path.join(carpeta, 'historial_completo.csv')) / 1e6:.1f} MB de CSV)")
+
+    # Antes: recorrer el CSV completo (sin pandas, que sería aún más lento)
+    inicio = time.perf_counter()
+    with open(os.path.join(carpeta, "historial_completo.csv"), newline="", encoding="utf-8") as f:
+        esperados = [fila for fila in csv.reader(f)
+                     if fila[1] == "MIGO" and desde.isoformat() <= fila[0] < hasta.isoformat()]
+    t_csv = time.perf_counter() - inicio
+    os.remove(os.path.join(carpeta, "historial_completo.csv"))
+
+    inicio = time.perf_counter()
+    resumen = compactar(carpeta)
+    t_compactar = time.perf_counter() - inicio
+    print(f"Compactación: {resumen} en {t_compactar:.1f}s -> {estadisticas(carpeta)}")
+
+    tiempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        encontrados = list(query_events(bot="MIGO", since=desde, until=hasta, log_dir=carpeta))
+        tiempos.append(time.perf_counter() - inicio)
+    errores = list(query_events(bot="MIGO", since=desde, until=hasta, estado="ERROR", log_dir=carpeta))
+
+    print(f"\nUna semana de MIGO ({len(esperados)} eventos):")
+    print(f"   CSV completo:   {t_csv * 1000:9.1f} ms")
+    print(f"   query_events:   {min(tiempos) * 1000:9.1f} ms (primera {tiempos[0] * 1000:.1f} ms)")
+    iguales = [[e[c] for c in COLUMNAS] for e in encontrados] == sorted(esperados)
+    solo_errores = all(e["Estado"] == "ERROR" for e in errores) and \
+        len(errores) == sum(1 for fila in esperados if fila[5] == "ERROR")
+    print(f"   Mismos eventos: {'✅' if iguales else '❌'}  filtro por estado: {'✅' if solo_errores else '❌'}")
+    if not (iguales and solo_errores):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de arranque en frío de la GUI (el camino de nexus_launcher sin
+argumentos): chequeo de actualizaciones, import de logistic_suite y ventana
+dibujada. Cada corrida es un proceso nuevo.
+
+Mide:
+- ventana: desde el inicio del proceso hasta la primera ventana dibujada.
+- bots: hasta que la precarga en segundo plano terminó (0 si se cargaban
+  todos antes de la ventana).
+- qué librerías pesadas ya estaban cargadas cuando apareció la ventana.
+
+Con --comparar REV corre lo mismo sobre otra revisión del repo (git archive)
+para ver el antes y el después:
+
+    python Tools/bench_arranque_gui.py --corridas 5
+    python Tools/bench_arranque_gui.py --comparar HEAD~1
+
+Necesita pantalla (Windows, o DISPLAY en Linux) y customtkinter.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import io
+
+HERRAMIENTAS = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(HERRAMIENTAS)
+sys.path.append(HERRAMIENTAS)
+
+from bench_importtime import PESADOS
+
+CORRIDA = '''
+import json, sys, time
+inicio = time.perf_counter()
+sys.argv = ["nexus_launcher.py"]
+import nexus_launcher
+import nexus_updater
+nexus_updater.NexusUpdater().check_for_updates()   # lo del arranque, sin ofrecer instalar
+import logistic_suite
+importado = time.perf_counter()
+app = logistic_suite.App()
+app.update()
+ventana = time.perf_counter()
+pesados = sorted(m for m in {pesados!r} if m in sys.modules)
+paneles = getattr(logistic_suite, "PANELES", [])
+limite = time.perf_counter() + 60
+while any(p.estado in ("pendiente", "cargando") for p in paneles) and time.perf_counter() < limite:
+    app.update()
+    time.sleep(0.01)
+bots = time.perf_counter() if paneles else ventana
+app.destroy()
+print("RESULTADO " + json.dumps({{
+    "import_ms": (importado - inicio) * 1000,
+    "ventana_ms": (ventana - inicio) * 1000,
+    "bots_ms": (bots - inicio) * 1000,
+    "pesados": pesados,
+    "errores": [p.texto for p in paneles if p.estado == "error"],
+}}))
+'''
+
+
+def medir(carpeta, corridas):
+    resultados = []
+    for _ in range(corridas):
+        proceso = subprocess.run([sys.executable, "-c", CORRIDA.format(pesados=PESADOS)], cwd=carpeta,
+                                 capture_output=True, text=True, encoding="utf-8", errors="replace")
+        linea = next((l for l in proceso.stdout.splitlines() if l.startswith("RESULTADO ")), None)
+        if linea is None:
+            raise RuntimeError(f"La corrida falló:\n{proceso.stderr[-2000:]}")
+        resultados.append(json.loads(linea[len("RESULTADO "):]))
+    return resultados
+
+
+def extraer(rev):
+    """Copia de la revisión `rev` en una carpeta temporal."""
+    carpeta = tempfile.mkdtemp(prefix="nexus_bench_")
+    archivo = subprocess.run(["git", "archive", rev], cwd=RAIZ, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archivo)) as tar:
+        tar.extractall(carpeta)
+    return carpeta
+
+
+def reportar(nombre, resultados):
+    def mediana(clave):
+        return statistics.median(r[clave] for r in resultados)
+
+    ultimo = resultados[-1]
+    print(f"{nombre:<10} import {mediana('import_ms'):7.0f} ms | ventana {mediana('ventana_ms'):7.0f} ms | "
+          f"bots listos {mediana('bots_ms'):7.0f} ms")
+    print(f"{'':<10} pesados antes de la ventana: {', '.join(ultimo['pesados']) or 'ninguno'}"
+          + (f" | bots con error: {', '.join(ultimo['errores'])}" if ultimo['errores'] else ""))
+    return mediana("ventana_ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--comparar", metavar="REV", help="revisión de git contra la que comparar")
+    args = parser.parse_args()
+
+    print(f"Arranque en frío de la GUI, mediana de {args.corridas} corridas\n")
+    if args.comparar:
+        antes = reportar(args.comparar, medir(extraer(args.comparar), args.corridas))
+    despues = reportar("actual", medir(RAIZ, args.corridas))
+    if args.comparar:
+        print(f"\nVentana visible {antes / despues:.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark de arranque: cuánto tarda en importarse worker_sap (u otro módulo)
+según `python -X importtime`, con presupuesto de regresión.
+
+Falla (código 1) si el import supera el presupuesto o si arrastra alguna de
+las librerías pesadas que sólo deben cargarse con el primer bot que las use.
+
+    python Tools/bench_importtime.py
+    python Tools/bench_importtime.py --modulo nexus_server --presupuesto-ms 2500
+"""
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# No deben cargarse al arrancar el worker (las importa cada bot en diferido)
+PESADOS = ("pandas", "numpy", "win32com", "PIL", "google.generativeai", "customtkinter", "cv2")
+
+
+def medir(modulo):
+    """(total_us, {modulo: (propio_us, acumulado_us)}) de una corrida en un proceso limpio."""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"import {modulo} falló:\n{proceso.stderr[-2000:]}")
+
+    tiempos = {}
+    total = 0
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        nombre = nombre.strip()
+        tiempos[nombre] = (int(propio), int(acumulado))
+        if nombre == modulo:
+            total = int(acumulado)
+    return total, tiempos
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modulo", default="worker_sap")
+    parser.add_argument("--presupuesto-ms", type=float, default=800,
+                        help="Tiempo máximo de import aceptado (mejor de las corridas)")
+    parser.add_argument("--corridas", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    corridas = [medir(args.modulo) for _ in range(args.corridas)]
+    total, tiempos = min(corridas, key=lambda c: c[0])
+    total_ms = total / 1000
+
+    print(f"import {args.modulo}: {total_ms:.0f} ms (mejor de {args.corridas}), "
+          f"{len(tiempos)} módulos, presupuesto {args.presupuesto_ms:.0f} ms\n")
+    print(f"{'acumulado ms':>13} {'propio ms':>10}  módulo")
+    for nombre, (propio, acumulado) in sorted(tiempos.items(), key=lambda t: -t[1][1])[:args.top]:
+        print(f"{acumulado / 1000:13.1f} {propio / 1000:10.1f}  {nombre}")
+
+    cargados = sorted(p for p in PESADOS if p in tiempos)
+    fallas = []
+    if cargados:
+        fallas.append(f"librerías pesadas cargadas al importar: {', '.join(cargados)}")
+    if total_ms > args.presupuesto_ms:
+        fallas.append(f"{total_ms:.0f} ms supera el presupuesto de {args.presupuesto_ms:.0f} ms")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ Dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
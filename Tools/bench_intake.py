@@ -0,0 +1,92 @@
+"""
+Benchmark de ingesta de órdenes: latencia de recogida y peticiones por hora.
+
+Levanta el PostgREST local (Tools/postgrest_local.py), inserta órdenes en
+momentos aleatorios y mide cuánto tarda cada modo de nexus_intake en verlas.
+
+    python Tools/bench_intake.py --ordenes 20 --gap 4
+"""
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from postgrest_local import ServidorLocal
+from nexus_intake import PollingIntake, LongPollIntake
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def medir(nombre, fabrica, n_ordenes, gap_max, reposo_s):
+    srv = ServidorLocal().iniciar()
+    intake = fabrica(srv.url)
+    insertadas = {}
+    latencias = []
+    fin = threading.Event()
+
+    def consumidor():
+        while not fin.is_set():
+            for orden in intake.esperar_ordenes():
+                visto = time.time()
+                if orden["id"] in insertadas:
+                    latencias.append(visto - insertadas[orden["id"]])
+                # Igual que ejecutar_tarea: la orden deja de estar pending
+                srv.tabla.actualizar([("id", f"eq.{orden['id']}")], {"status": "running"})
+
+    hilo = threading.Thread(target=consumidor, daemon=True)
+    inicio = time.time()
+    hilo.start()
+
+    for _ in range(n_ordenes):
+        time.sleep(random.uniform(0, gap_max))
+        fila = srv.tabla.insertar([{"tipo_bot": "AUDITOR"}])[0]
+        insertadas[fila["id"]] = time.time()
+
+    # Esperar a que se recojan todas
+    limite = time.time() + 30
+    while len(latencias) < n_ordenes and time.time() < limite:
+        time.sleep(0.05)
+    duracion = time.time() - inicio
+    peticiones_carga = intake.peticiones
+
+    # Ventana sin órdenes: lo que cuesta un worker ocioso
+    time.sleep(reposo_s)
+    peticiones_reposo = intake.peticiones - peticiones_carga
+    fin.set()
+    srv.detener()
+
+    latencias.sort()
+    p95 = latencias[int(0.95 * (len(latencias) - 1))] if latencias else float("nan")
+    print(f"{nombre:<22} recogidas={len(latencias):>3}/{n_ordenes}  "
+          f"p50={statistics.median(latencias) * 1000:7.0f} ms  "
+          f"p95={p95 * 1000:7.0f} ms  "
+          f"max={max(latencias) * 1000:7.0f} ms  "
+          f"peticiones/h carga={peticiones_carga * 3600 / duracion:7.0f}  "
+          f"reposo={peticiones_reposo * 3600 / reposo_s:7.0f}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ordenes", type=int, default=15)
+    parser.add_argument("--gap", type=float, default=4.0, help="Separación máxima entre órdenes (s)")
+    parser.add_argument("--reposo", type=float, default=60.0, help="Ventana sin órdenes para medir costo ocioso (s)")
+    args = parser.parse_args()
+
+    print(f"Órdenes: {args.ordenes}, separación aleatoria 0-{args.gap}s, reposo {args.reposo}s\n")
+    modos = [
+        ("polling fijo 3s", lambda u: PollingIntake(u, HEADERS, intervalo_min=3, intervalo_max=3)),
+        ("polling con backoff", lambda u: PollingIntake(u, HEADERS)),
+        ("long-poll", lambda u: LongPollIntake(u, HEADERS)),
+    ]
+    for nombre, fabrica in modos:
+        medir(nombre, fabrica, args.ordenes, args.gap, args.reposo)
+
+
+if __name__ == "__main__":
+    main()
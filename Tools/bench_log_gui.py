@@ -0,0 +1,80 @@
+"""
+Benchmark del log del panel (logistic_suite): un bot de prueba imprime
+miles de líneas mientras se mide cuánto tarda el loop de Tk en atender un
+latido cada 10 ms (si la ventana se congela, el latido se atrasa).
+
+    python Tools/bench_log_gui.py --lineas 50000
+
+Falla (exit 1) si el peor atraso supera --max-ms, si el log pasa de
+MAX_LINEAS o si no termina con la línea de éxito.
+Necesita pantalla (Windows, o DISPLAY en Linux) y customtkinter.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import logistic_suite
+from logistic_suite import App, PANELES, MAX_LINEAS
+
+
+class BotRuidoso:
+    lineas = 0
+
+    def run(self, *args):
+        for i in range(self.lineas):
+            print(f"[RUIDOSO] Procesando material {i:06d} lote SGVT-000123 ... OK")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", type=int, default=50000)
+    parser.add_argument("--max-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    BotRuidoso.lineas = args.lineas
+    panel = next(p for p in PANELES if not (p.archivo or p.pide_almacen or p.modos))
+    panel.clase_bot, panel.estado = BotRuidoso, "listo"
+    logistic_suite.PRECARGA_MS = 10 ** 9  # sin precarga de los bots reales
+
+    app = App()
+    app.seleccionar(panel)
+    app.update()
+
+    atrasos = []
+    esperado = [time.perf_counter() + 0.01]
+
+    def latido():
+        ahora = time.perf_counter()
+        atrasos.append((ahora - esperado[0]) * 1000)
+        esperado[0] = ahora + 0.01
+        app.after(10, latido)
+
+    app.after(10, latido)
+    inicio = time.perf_counter()
+    app.encolar()
+    limite = inicio + 300
+    while "FINALIZADO" not in app.log_box.get("end-2l", "end") and time.perf_counter() < limite:
+        app.update()
+    total = time.perf_counter() - inicio
+    lineas = int(app.log_box.index("end-1c").split(".")[0]) - 1
+    final = app.log_box.get("end-2l", "end").strip()
+    app.destroy()
+
+    peor = max(atrasos)
+    print(f"{args.lineas} líneas en {total:.2f} s ({args.lineas / total:,.0f} líneas/s)")
+    print(f"Atraso del loop de Tk: mediana {statistics.median(atrasos):.1f} ms, peor {peor:.1f} ms "
+          f"({len(atrasos)} latidos)")
+    print(f"Líneas en el log: {lineas} (tope {MAX_LINEAS})")
+    if peor > args.max_ms or lineas > MAX_LINEAS or "FINALIZADO" not in final:
+        print("❌ La ventana se congeló o el log no quedó bien")
+        sys.exit(1)
+    print("✅ La ventana siguió respondiendo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark de la bitácora (nexus_logger): abrir/agregar/cerrar el CSV por
+evento (como antes) vs. escritura por lotes con bloqueo entre procesos.
+
+Mide eventos/s en un proceso y con varios procesos escribiendo el mismo
+archivo, y verifica que no se pierdan ni se mezclen filas.
+
+    python Tools/bench_logger.py --eventos 5000 --procesos 4
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+import nexus_logger
+from nexus_logger import NexusLogger, COLUMNAS
+
+DETALLE = "Contabilizado documento 5000012345 posicion 10 lote SGVT-000123"
+
+HIJO = '''
+import sys, time
+sys.path.insert(0, {raiz!r})
+import nexus_logger
+modo, carpeta, n, i = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4]
+sys.stdout = open(__import__("os").devnull, "w")
+inicio = time.perf_counter()
+if modo == "antes":
+    import csv, os
+    ruta = os.path.join(carpeta, nexus_logger.DEFAULT_LOG_FILE)
+    for j in range(n):
+        with open(ruta, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["ts", f"BOT{{i}}", "u", "Paso", f"{{j}} " + {detalle!r}, "OK"])
+else:
+    logger = nexus_logger.NexusLogger(log_dir=carpeta)
+    for j in range(n):
+        logger.log(f"BOT{{i}}", "Paso", f"{{j}} " + {detalle!r}, "OK")
+    logger.flush()
+sys.__stdout__.write(f"{{time.perf_counter() - inicio}}\\n")
+'''
+
+
+def por_evento(carpeta, n):
+    """El log() anterior: un open/append/close del CSV por evento."""
+    ruta = os.path.join(carpeta, nexus_logger.DEFAULT_LOG_FILE)
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(COLUMNAS)
+    for j in range(n):
+        with open(ruta, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([time.time(), "BOT", "u", "Paso", f"{j} {DETALLE}", "OK"])
+        print(f"[BOT] Paso: {j} {DETALLE} (OK)")
+
+
+def por_lotes(carpeta, n):
+    logger = NexusLogger(log_dir=carpeta)
+    for j in range(n):
+        logger.log("BOT", "Paso", f"{j} {DETALLE}", "OK")
+    logger.flush()
+    return logger.lotes
+
+
+def medir(funcion, n):
+    carpeta = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        aperturas = funcion(carpeta, n) or n
+        return time.perf_counter() - inicio, aperturas
+
+
+def varios_procesos(modo, procesos, n):
+    carpeta = tempfile.mkdtemp()
+    codigo = HIJO.format(raiz=RAIZ, detalle=DETALLE)
+    inicio = time.perf_counter()
+    hijos = [subprocess.Popen([sys.executable, "-c", codigo, modo, carpeta, str(n), str(i)],
+                              stdout=subprocess.PIPE, text=True) for i in range(procesos)]
+    for hijo in hijos:
+        hijo.communicate()
+    total = time.perf_counter() - inicio
+    with open(os.path.join(carpeta, nexus_logger.DEFAULT_LOG_FILE), newline="", encoding="utf-8") as f:
+        filas = [fila for fila in csv.reader(f) if fila != COLUMNAS]
+    sanas = sum(1 for fila in filas if len(fila) == 6 and fila[4].endswith(DETALLE))
+    return total, len(filas), sanas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eventos", type=int, default=5000)
+    parser.add_argument("--procesos", type=int, default=4)
+    args = parser.parse_args()
+    n = args.eventos
+
+    print(f"Un proceso, {n} eventos:")
+    antes, aperturas_antes = medir(por_evento, n)
+    despues, aperturas = medir(por_lotes, n)
+    # Cada apertura del CSV es una sincronización de OneDrive
+    print(f"   Por evento: {n / antes:10,.0f} eventos/s  {aperturas_antes} aperturas del CSV")
+    print(f"   Por lotes:  {n / despues:10,.0f} eventos/s  {aperturas} aperturas del CSV (x{antes / despues:.1f})")
+
+    esperadas = n * args.procesos
+    print(f"\n{args.procesos} procesos sobre el mismo archivo, {n} eventos cada uno:")
+    for modo, nombre in (("antes", "Por evento"), ("despues", "Por lotes ")):
+        total, filas, sanas = varios_procesos(modo, args.procesos, n)
+        print(f"   {nombre}: {esperadas / total:10,.0f} eventos/s  filas {filas}/{esperadas}, íntegras {sanas}")
+        if modo == "despues" and (filas != esperadas or sanas != esperadas):
+            print("❌ Se perdieron o mezclaron filas con la escritura por lotes")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
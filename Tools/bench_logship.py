@@ -0,0 +1,79 @@
+"""
+Benchmark del envío de logs: un POST por línea vs. LogShipper por lotes.
+
+Simula un bot conversador (muchos print) contra el PostgREST local con una
+latencia de red artificial, y mide el tiempo total del "job" incluido el
+drenado final de logs.
+
+    python Tools/bench_logship.py --lineas 500 --latencia 0.02
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from postgrest_local import ServidorLocal
+from nexus_logship import LogShipper
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def job(emitir, lineas):
+    """Bot ficticio: algo de trabajo de CPU entre prints."""
+    for i in range(lineas):
+        sum(range(2000))
+        emitir(f"   Procesando fila {i} de {lineas}...")
+
+
+def medir_por_linea(srv, order_id, lineas):
+    url = f"{srv.url}/rest/v1/rpc/append_execution_log"
+
+    def emitir(texto):
+        requests.post(url, headers=HEADERS, json={'order_id': order_id, 'log_line': texto})
+
+    inicio = time.perf_counter()
+    job(emitir, lineas)
+    return time.perf_counter() - inicio, None
+
+
+def medir_por_lotes(srv, order_id, lineas):
+    shipper = LogShipper(srv.url, HEADERS)
+    inicio = time.perf_counter()
+    job(lambda texto: shipper.enviar(order_id, texto), lineas)
+    fin_job = time.perf_counter() - inicio
+    shipper.drenar(order_id)
+    return time.perf_counter() - inicio, (fin_job, shipper.estadisticas())
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", type=int, default=500)
+    parser.add_argument("--latencia", type=float, default=0.02, help="RTT simulado hacia Supabase (s)")
+    args = parser.parse_args()
+
+    srv = ServidorLocal(latencia_s=args.latencia).iniciar()
+    a, b = srv.tabla.insertar([{"tipo_bot": "ZONALES"}, {"tipo_bot": "ZONALES"}])
+
+    t_antes, _ = medir_por_linea(srv, a["id"], args.lineas)
+    peticiones_antes = srv.total_peticiones()
+    t_despues, (t_job, stats) = medir_por_lotes(srv, b["id"], args.lineas)
+    peticiones_despues = srv.total_peticiones() - peticiones_antes
+
+    filas = {f["id"]: f for f in srv.tabla.seleccionar([])}
+    srv.detener()
+
+    print(f"Líneas: {args.lineas}  Latencia simulada: {args.latencia * 1000:.0f} ms\n")
+    print(f"POST por línea : {t_antes:7.2f} s  peticiones={peticiones_antes:5d}  "
+          f"guardadas={len(filas[a['id']]['execution_logs'])}")
+    print(f"LogShipper     : {t_despues:7.2f} s  peticiones={peticiones_despues:5d}  "
+          f"guardadas={len(filas[b['id']]['execution_logs'])}  (bot libre a los {t_job:.2f} s)")
+    print(f"Estadísticas   : {stats}")
+    print(f"Aceleración    : x{t_antes / max(t_despues, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Prueba de contención del reclamo de órdenes con varios procesos.
+
+Levanta el PostgREST local, carga N órdenes y lanza K procesos que compiten
+por ellas con nexus_claim.reclamar_orden, tal como lo harían K PCs.
+Falla (exit 1) si alguna orden se ejecuta dos veces o queda sin ejecutar.
+
+    python Tools/contencion_claims.py --workers 6 --ordenes 200
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def worker(base_url, nombre, salida):
+    import requests
+    from nexus_claim import reclamar_orden, url_orden
+
+    url_pendientes = f"{base_url}/rest/v1/ordenes_bot?status=eq.pending"
+    vacios = 0
+    while vacios < 3:
+        ordenes = requests.get(url_pendientes, headers=HEADERS, timeout=15).json()
+        if not ordenes:
+            vacios += 1
+            time.sleep(0.1)
+            continue
+        vacios = 0
+        for datos in ordenes:
+            token = reclamar_orden(base_url, HEADERS, datos["id"], nombre)
+            if token:
+                salida.put((datos["id"], nombre))
+                requests.patch(url_orden(base_url, datos["id"], token), headers=HEADERS,
+                               json={"status": "success"}, timeout=15)
+
+
+def main():
+    import argparse
+    from postgrest_local import ServidorLocal
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--ordenes", type=int, default=200)
+    args = parser.parse_args()
+
+    srv = ServidorLocal().iniciar()
+    srv.tabla.insertar([{"tipo_bot": "AUDITOR", "worker": "En Cola"} for _ in range(args.ordenes)])
+
+    salida = multiprocessing.Queue()
+    procesos = [
+        multiprocessing.Process(target=worker, args=(srv.url, f"PC{i}", salida))
+        for i in range(args.workers)
+    ]
+    inicio = time.time()
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+    duracion = time.time() - inicio
+
+    ejecuciones = {}
+    while not salida.empty():
+        doc_id, nombre = salida.get()
+        ejecuciones.setdefault(doc_id, []).append(nombre)
+    srv.detener()
+
+    dobles = {k: v for k, v in ejecuciones.items() if len(v) > 1}
+    faltantes = args.ordenes - len(ejecuciones)
+    por_worker = {}
+    for nombres in ejecuciones.values():
+        for n in nombres:
+            por_worker[n] = por_worker.get(n, 0) + 1
+
+    print(f"Órdenes: {args.ordenes}  Workers: {args.workers}  Tiempo: {duracion:.2f}s")
+    print(f"Reparto: {dict(sorted(por_worker.items()))}")
+    print(f"Ejecuciones dobles: {len(dobles)}  Sin ejecutar: {faltantes}")
+    if dobles or faltantes:
+        print("❌ FALLÓ")
+        sys.exit(1)
+    print("✅ OK: cada orden se ejecutó exactamente una vez")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Prueba del supervisor (nexus_manager) con servicios de prueba, en Linux o
+Windows, con tiempos cortos:
+
+1. SANO: late siempre; no se reinicia nunca.
+2. CAE: termina con código 1 al arrancar; el backoff crece (x2) y al
+   juntar `crashloop_n` caídas entra en crash-loop (pausa larga).
+3. COLGADO: late un momento y se queda pegado (como una llamada COM);
+   la sonda de pulso lo mata y lo relanza.
+4. API: responde /status y después deja de contestar; la sonda HTTP lo
+   mata y lo relanza.
+5. /estado y /metrics del supervisor muestran reinicios y uptime.
+6. RUIDOSO: imprime 20.000 líneas de golpe; se leen todas sin frenarlo, el
+   buffer en memoria queda acotado y el archivo JSON Lines las tiene todas.
+7. /logs/<servicio> filtra por nivel y sigue en vivo (long-poll).
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/demo_manager.py
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+os.environ["NEXUS_PULSOS_DIR"] = tempfile.mkdtemp()
+os.environ["PYTHONPATH"] = os.pathsep.join([RAIZ, os.environ.get("PYTHONPATH", "")])
+
+SANO = '''
+import time
+from nexus_pulso import latir
+print("sano: arriba")
+while True:
+    latir("demo_sano")
+    time.sleep(0.2)
+'''
+
+CAE = '''
+import sys
+print("cae: arranco y me caigo")
+sys.exit(1)
+'''
+
+COLGADO = '''
+import time
+from nexus_pulso import latir
+for _ in range(3):
+    latir("demo_colgado")
+    time.sleep(1.1)
+print("colgado: esperando un diálogo que nunca llega...")
+time.sleep(3600)
+'''
+
+RUIDOSO = '''
+import time
+from nexus_pulso import latir
+inicio = time.time()
+for i in range(20000):
+    print(f"linea {i} " + "x" * 80)
+print(f"ruidoso: 20000 lineas en {time.time() - inicio:.2f}s")
+while True:
+    latir("demo_ruidoso")
+    time.sleep(0.2)
+'''
+
+API = '''
+import sys, time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+inicio = time.time()
+class Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if time.time() - inicio > 1.5:
+            time.sleep(3600)  # deja de contestar
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'{"status": "online"}')
+    def log_message(self, *args):
+        pass
+print("api: escuchando")
+HTTPServer(("127.0.0.1", int(sys.argv[1])), Manejador).serve_forever()
+'''
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    from nexus_manager import Supervisor, Servicio, SondaHttp, SondaPulso
+    from nexus_registros import RegistroServicio
+
+    class SupervisorDemo(Supervisor):
+        """Anota cada espera decidida tras una caída."""
+        esperas = {}
+
+        def _registrar_caida(self, s, motivo):
+            espera = super()._registrar_caida(s, motivo)
+            self.esperas.setdefault(s.nombre, []).append((round(espera, 2), s.estado))
+            return espera
+
+    puerto_api, puerto_estado = puerto_libre(), puerto_libre()
+    py = [sys.executable, "-u", "-c"]
+    servicios = [
+        Servicio("SANO", py + [SANO], sonda=SondaPulso("demo_sano", max_edad_s=1, intervalo_s=0.3),
+                 arranque_s=0.5, cwd=RAIZ),
+        Servicio("CAE", py + [CAE], cwd=RAIZ),
+        Servicio("COLGADO", py + [COLGADO], sonda=SondaPulso("demo_colgado", max_edad_s=1.5, intervalo_s=0.3),
+                 arranque_s=0.5, cwd=RAIZ),
+        Servicio("API", py + [API, str(puerto_api)],
+                 sonda=SondaHttp(f"http://127.0.0.1:{puerto_api}/status", intervalo_s=0.3, timeout_s=0.5,
+                                 fallos_max=2),
+                 arranque_s=0.5, cwd=RAIZ),
+        Servicio("RUIDOSO", py + [RUIDOSO], cwd=RAIZ),
+    ]
+    servicios[-1].registro = RegistroServicio("RUIDOSO", capacidad=500)
+    carpeta_logs = tempfile.mkdtemp()
+    supervisor = SupervisorDemo(servicios, backoff_base_s=0.2, backoff_max_s=2, estable_s=3,
+                                crashloop_n=4, crashloop_ventana_s=10, crashloop_pausa_s=4,
+                                puerto_estado=puerto_estado, escalonar_s=0, directorio_logs=carpeta_logs)
+
+    consultas = {}
+
+    def pedir(ruta):
+        url = f"http://127.0.0.1:{puerto_estado}{ruta}"
+        return urllib.request.urlopen(url, timeout=10).read().decode()
+
+    async def escenario():
+        tarea = asyncio.create_task(supervisor.correr())
+        await asyncio.sleep(9)
+        for ruta in ("/estado", "/metrics", "/logs/CAE?nivel=WARNING&n=0", "/logs/ruidoso?n=5"):
+            consultas[ruta] = await asyncio.to_thread(pedir, ruta)
+        # Seguir en vivo: la consulta espera hasta que SANO imprima algo nuevo
+        sano = servicios[0]
+        desde = sano.registro.seq
+        seguimiento = asyncio.create_task(asyncio.to_thread(pedir, f"/logs/SANO?desde={desde}&esperar=5"))
+        await asyncio.sleep(0.5)
+        sano.registro.agregar("sano: línea nueva")
+        consultas["tail"] = await seguimiento
+        supervisor.detener()
+        await tarea
+
+    asyncio.run(escenario())
+    estado = json.loads(consultas["/estado"])["servicios"]
+    fallas = []
+
+    def revisar(condicion, mensaje):
+        print(f"{'✅' if condicion else '❌'} {mensaje}")
+        if not condicion:
+            fallas.append(mensaje)
+
+    print()
+    revisar(estado["SANO"]["reinicios"] == 0 and estado["SANO"]["estado"] == "corriendo"
+            and estado["SANO"]["uptime_s"] > 5, f"1. SANO: {estado['SANO']}")
+    esperas = supervisor.esperas.get("CAE", [])
+    revisar([e for e, _ in esperas[:3]] == [0.2, 0.4, 0.8] and esperas[3:4] == [(4, "crashloop")],
+            f"2. CAE: backoff y crash-loop {esperas}")
+    revisar(estado["COLGADO"]["reinicios"] >= 1 and str(estado["COLGADO"]["ultimo_motivo"]).startswith("sonda"),
+            f"3. COLGADO: {estado['COLGADO']}")
+    revisar(estado["API"]["reinicios"] >= 1 and str(estado["API"]["ultimo_motivo"]).startswith("sonda"),
+            f"4. API: {estado['API']}")
+    metricas = consultas["/metrics"]
+    revisar('nexus_servicio_reinicios_total{servicio="COLGADO",motivo="sonda"}' in metricas
+            and 'nexus_servicio_uptime_segundos{servicio="SANO"}' in metricas,
+            "5. /metrics con reinicios y uptime por servicio")
+    ruidoso = servicios[-1].registro
+    en_archivo = sum(1 for _ in open(os.path.join(carpeta_logs, "ruidoso.jsonl"), encoding="utf-8"))
+    ultimas = json.loads(consultas["/logs/ruidoso?n=5"])["lineas"]
+    revisar(ruidoso.seq >= 20001 and len(ruidoso.lineas) == 500 and en_archivo >= 20001
+            and len(ultimas) == 5 and {"ts", "servicio", "nivel", "mensaje", "seq"} <= set(ultimas[-1]),
+            f"6. RUIDOSO: {ruidoso.seq} líneas leídas, {len(ruidoso.lineas)} en memoria, {en_archivo} en disco "
+            f"({[l['mensaje'] for l in ultimas if l['mensaje'].startswith('ruidoso')]})")
+    avisos = json.loads(consultas["/logs/CAE?nivel=WARNING&n=0"])["lineas"]
+    seguido = json.loads(consultas["tail"])["lineas"]
+    revisar(avisos and all(l["nivel"] in ("WARNING", "ERROR") for l in avisos)
+            and [l["mensaje"] for l in seguido] == ["sano: línea nueva"],
+            f"7. /logs: {len(avisos)} avisos de CAE filtrados por nivel; seguimiento en vivo {seguido}")
+    revisar(all(s.proceso.returncode is not None for s in servicios), "Al detener no quedan procesos vivos")
+
+    print()
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: supervisor con backoff, crash-loop y sondas de vida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Servidor local que imita el subconjunto de PostgREST/Supabase que usa worker_sap.
+
+Sirve para probar el worker sin tocar la base real:
+
+    python Tools/postgrest_local.py --port 54321
+    set SUPABASE_URL=http://127.0.0.1:54321
+    set SUPABASE_KEY=local
+    python worker_sap.py
+
+Soporta:
+- GET/POST/PATCH sobre /rest/v1/ordenes_bot con filtros col=op.valor
+  (eq, neq, lt, lte, gt, gte, in, is), or=(...)/and=(...), order=,
+  limit= y select=.
+- Prefer: return=representation en POST/PATCH.
+- rpc/append_execution_log y rpc/append_execution_logs (lote)
+- rpc/esperar_ordenes_pendientes (long-poll: bloquea hasta que haya pending)
+
+Las fechas ISO en UTC con 'Z' (lease_expira) se comparan como texto, que
+para ese formato coincide con el orden cronológico.
+
+Todo vive en memoria. `latencia_s` agrega un retardo artificial a cada
+petición para simular la red hacia Supabase.
+"""
+import json
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+
+def _convertir(valor):
+    """Convierte el texto de un filtro a un tipo comparable."""
+    if valor == "null":
+        return None
+    if valor in ("true", "false"):
+        return valor == "true"
+    try:
+        return int(valor)
+    except ValueError:
+        pass
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+
+def _separar(texto):
+    """Separa 'a,b(c,d),e' por las comas de primer nivel."""
+    partes, nivel, actual = [], 0, ""
+    for ch in texto:
+        if ch == "," and nivel == 0:
+            partes.append(actual)
+            actual = ""
+            continue
+        nivel += (ch == "(") - (ch == ")")
+        actual += ch
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def _cumple_logico(fila, operador, expresion):
+    """Evalúa or=(...) / and=(...), incluyendo grupos anidados."""
+    resultados = []
+    for parte in _separar(expresion.strip()[1:-1]):
+        if parte.startswith(("and(", "or(")):
+            sub_op, _, resto = parte.partition("(")
+            resultados.append(_cumple_logico(fila, sub_op, "(" + resto))
+        else:
+            columna, _, sub_expr = parte.partition(".")
+            resultados.append(_cumple(fila, columna, sub_expr))
+    return any(resultados) if operador == "or" else all(resultados)
+
+
+def _cumple(fila, columna, expresion):
+    if columna in ("or", "and"):
+        return _cumple_logico(fila, columna, expresion)
+    op, _, valor = expresion.partition(".")
+    actual = fila.get(columna)
+    if op == "is":
+        return actual is _convertir(valor)
+    if op == "in":
+        opciones = [_convertir(v.strip('"')) for v in valor.strip("()").split(",")]
+        return actual in opciones
+    esperado = _convertir(valor)
+    if op == "eq":
+        return actual == esperado or str(actual) == valor
+    if op == "neq":
+        return actual != esperado and str(actual) != valor
+    if actual is None:
+        return False
+    try:
+        if op == "lt":
+            return actual < esperado
+        if op == "lte":
+            return actual <= esperado
+        if op == "gt":
+            return actual > esperado
+        if op == "gte":
+            return actual >= esperado
+    except TypeError:
+        return str(actual) < str(esperado) if op in ("lt", "lte") else str(actual) > str(esperado)
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+class TablaMemoria:
+    """Tabla ordenes_bot en memoria con notificación de inserciones."""
+
+    def __init__(self):
+        self.filas = []
+        self.cond = threading.Condition()
+
+    def insertar(self, registros):
+        creadas = []
+        with self.cond:
+            for reg in registros:
+                fila = dict(reg)
+                fila.setdefault("id", str(uuid.uuid4()))
+                fila.setdefault("status", "pending")
+                fila.setdefault("fecha_creacion", datetime.now().isoformat())
+                fila.setdefault("execution_logs", [])
+                self.filas.append(fila)
+                creadas.append(dict(fila))
+            self.cond.notify_all()
+        return creadas
+
+    def seleccionar(self, filtros, orden=None, limite=None):
+        with self.cond:
+            filas = [dict(f) for f in self.filas if all(_cumple(f, c, e) for c, e in filtros)]
+        if orden:
+            for parte in reversed(orden.split(",")):
+                col, _, direccion = parte.partition(".")
+                filas.sort(key=lambda f: (f.get(col) is None, f.get(col)), reverse=direccion.startswith("desc"))
+        if limite is not None:
+            filas = filas[:limite]
+        return filas
+
+    def actualizar(self, filtros, cambios):
+        # Filtro y escritura bajo el mismo lock: igual que un UPDATE ... WHERE en Postgres
+        with self.cond:
+            afectadas = []
+            for fila in self.filas:
+                if all(_cumple(fila, c, e) for c, e in filtros):
+                    fila.update(cambios)
+                    afectadas.append(dict(fila))
+            if afectadas:
+                self.cond.notify_all()
+            return afectadas
+
+    def agregar_log(self, order_id, linea):
+        with self.cond:
+            for fila in self.filas:
+                if str(fila.get("id")) == str(order_id):
+                    fila.setdefault("execution_logs", []).append(linea)
+                    return True
+        return False
+
+    def esperar_pendientes(self, timeout_s, limite, excluir=(), corriendo=()):
+        fin = time.time() + timeout_s
+        excluir, corriendo = set(excluir), set(corriendo)
+        with self.cond:
+            while True:
+                pendientes = [dict(f) for f in self.filas if f.get("status") == "pending"]
+                # Como la RPC: sólo despiertan las no excluidas o un carril liberado
+                despierta = any(f["id"] not in excluir for f in pendientes) or any(
+                    f["id"] in corriendo and f.get("status") != "running" for f in self.filas)
+                # Mismo orden que la RPC: prioridad, plazo, creación
+                pendientes.sort(key=lambda f: (f.get("prioridad") if f.get("prioridad") is not None else 2,
+                                               f.get("fecha_limite") is None, f.get("fecha_limite") or "",
+                                               f.get("fecha_creacion") or ""))
+                if despierta:
+                    return pendientes[:limite]
+                restante = fin - time.time()
+                if restante <= 0:
+                    return []
+                self.cond.wait(restante)
+
+
+class ServidorLocal:
+    """Envuelve ThreadingHTTPServer con la tabla y contadores de peticiones."""
+
+    def __init__(self, host="127.0.0.1", port=0, latencia_s=0.0):
+        self.tabla = TablaMemoria()
+        self.latencia_s = latencia_s
+        self.peticiones = {}
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(_Handler):
+            srv = servidor
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._hilo = None
+
+    def contar(self, clave):
+        with self._lock:
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+
+    def total_peticiones(self):
+        with self._lock:
+            return sum(self.peticiones.values())
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    srv = None  # ServidorLocal, se asigna en la subclase
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- helpers ---
+    def _cuerpo(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        if not largo:
+            return None
+        return json.loads(self.rfile.read(largo).decode("utf-8"))
+
+    def _responder(self, status, payload=None):
+        data = b"" if payload is None else json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _ruta(self):
+        partes = urlsplit(self.path)
+        params = parse_qsl(partes.query, keep_blank_values=True)
+        filtros, opciones = [], {}
+        for clave, valor in params:
+            if clave in ("select", "order", "limit"):
+                opciones[clave] = valor
+            else:
+                filtros.append((clave, valor))
+        return partes.path, filtros, opciones
+
+    def _representacion(self):
+        return "return=representation" in (self.headers.get("Prefer") or "")
+
+    def _preparar(self, metodo):
+        ruta, filtros, opciones = self._ruta()
+        self.srv.contar(f"{metodo} {ruta}")
+        if self.srv.latencia_s:
+            time.sleep(self.srv.latencia_s)
+        return ruta, filtros, opciones
+
+    # --- verbos ---
+    def do_GET(self):
+        ruta, filtros, opciones = self._preparar("GET")
+        if ruta != "/rest/v1/ordenes_bot":
+            return self._responder(404, {"message": f"Ruta desconocida {ruta}"})
+        limite = int(opciones["limit"]) if "limit" in opciones else None
+        filas = self.srv.tabla.seleccionar(filtros, opciones.get("order"), limite)
+        self._responder(200, filas)
+
+    def do_PATCH(self):
+        ruta, filtros, _ = self._preparar("PATCH")
+        cuerpo = self._cuerpo()  # leerlo siempre: la conexión es keep-alive
+        if ruta != "/rest/v1/ordenes_bot":
+            return self._responder(404, {"message": f"Ruta desconocida {ruta}"})
+        filas = self.srv.tabla.actualizar(filtros, cuerpo or {})
+        if self._representacion():
+            return self._responder(200, filas)
+        self._responder(204)
+
+    def do_POST(self):
+        ruta, _, _ = self._preparar("POST")
+        cuerpo = self._cuerpo()
+        if ruta == "/rest/v1/ordenes_bot":
+            registros = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+            filas = self.srv.tabla.insertar(registros)
+            return self._responder(201, filas) if self._representacion() else self._responder(201)
+        if ruta.startswith("/rest/v1/rpc/"):
+            return self._rpc(ruta.rsplit("/", 1)[-1], cuerpo or {})
+        self._responder(404, {"message": f"Ruta desconocida {ruta}"})
+
+    def _rpc(self, nombre, args):
+        tabla = self.srv.tabla
+        if nombre == "append_execution_log":
+            tabla.agregar_log(args.get("order_id"), args.get("log_line"))
+            return self._responder(204)
+        if nombre == "append_execution_logs":
+            for linea in args.get("log_lines") or []:
+                tabla.agregar_log(args.get("order_id"), linea)
+            return self._responder(204)
+        if nombre == "esperar_ordenes_pendientes":
+            filas = tabla.esperar_pendientes(float(args.get("p_timeout_s", 20)), int(args.get("p_limite", 20)),
+                                             args.get("p_excluir") or (), args.get("p_corriendo") or ())
+            return self._responder(200, filas)
+        self._responder(404, {"code": "PGRST202", "message": f"Función desconocida {nombre}"})
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Stand-in local de PostgREST para worker_sap")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Retardo artificial por petición (s)")
+    args = parser.parse_args()
+
+    srv = ServidorLocal(args.host, args.port, args.latencia)
+    print(f"🧪 PostgREST local escuchando en {srv.url} (Ctrl+C para salir)")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        srv.detener()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
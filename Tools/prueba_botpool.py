@@ -0,0 +1,96 @@
+"""
+Prueba del pool de bots sobre el planificador (sin SAP ni COM).
+
+1. Muchos trabajos SAP intercalados con trabajos CPU: el bot SAP corre siempre
+   en el mismo hilo, se crea una sola vez y el resto son reutilizaciones.
+2. Sin tráfico, la instancia ociosa expira por el barrido periódico y su
+   close() corre en el hilo que la creó.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_botpool.py --trabajos 40 --ttl 0.5
+"""
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+
+class BotFalso:
+    def __init__(self):
+        self.hilo = threading.get_ident()
+        self.cerrado_en = None
+
+    def run(self):
+        time.sleep(0.005)
+        return threading.get_ident()
+
+    def close(self):
+        self.cerrado_en = threading.get_ident()
+
+
+def main():
+    import argparse
+    from nexus_botpool import BotPool
+    from nexus_scheduler import ResourceScheduler, SAP, CPU
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trabajos", type=int, default=40)
+    parser.add_argument("--ttl", type=float, default=0.5)
+    args = parser.parse_args()
+
+    scheduler = ResourceScheduler()
+    pool = BotPool(ttl_s=args.ttl)
+    scheduler.periodico(args.ttl / 4, pool.evictar_inactivos)
+    creados = []
+    fallas = []
+
+    def fabrica():
+        bot = BotFalso()
+        creados.append(bot)
+        return bot
+
+    def trabajo_sap():
+        with pool.prestar("MIGO", fabrica) as bot:
+            return bot.run()
+
+    # 1: SAP intercalado con CPU
+    futuros = []
+    for i in range(args.trabajos):
+        futuros.append(scheduler.enviar("MIGO", {SAP}, trabajo_sap))
+        futuros.append(scheduler.enviar("CPU", {CPU}, time.sleep, 0.01))
+    hilos = {f.result(timeout=30) for f in futuros[::2]}
+    for f in futuros[1::2]:
+        f.result(timeout=30)
+    stats = pool.estadisticas()
+    print(f"1. {args.trabajos} trabajos SAP: {len(hilos)} hilo(s), {stats}")
+    if len(hilos) != 1 or stats["creadas"] != 1 or stats["reutilizadas"] != args.trabajos - 1:
+        fallas.append(f"el bot SAP no se reutilizó en un solo hilo: {len(hilos)} hilos, {stats}")
+
+    # 2: sin tráfico, el barrido expira la instancia en su hilo
+    limite = time.time() + args.ttl * 6
+    while pool.estadisticas()["expiradas"] == 0 and time.time() < limite:
+        time.sleep(0.05)
+    bot = creados[0]
+    stats = pool.estadisticas()
+    print(f"2. Sin tráfico tras {args.ttl * 6:.1f}s: {stats}; close() en el hilo que la creó: "
+          f"{bot.cerrado_en == bot.hilo}")
+    if stats["expiradas"] != 1 or stats["libres"] != 0:
+        fallas.append(f"la instancia ociosa no expiró sin tráfico: {stats}")
+    elif bot.cerrado_en != bot.hilo:
+        fallas.append("close() no corrió en el hilo que creó la instancia")
+
+    scheduler.cerrar()
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: reutilización por hilo de carril y expiración sin tráfico")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Prueba de la caché de resultados (nexus_resultados) por el camino real de
+worker_sap.run_automation, con un bot de reporte de prueba que escribe un
+archivo y cuenta sus ejecuciones:
+
+1. Segundo pedido igual dentro de la frescura: no se ejecuta, mismo archivo,
+   y ni siquiera se importa el módulo del bot.
+2. Parámetros equivalentes (espacios, valor por defecto): misma entrada.
+3. sinCache=true: se ejecuta y actualiza la caché.
+4. Obsoleto: se entrega al instante y se refresca en segundo plano.
+5. Vencido: se ejecuta de nuevo.
+6. Original modificado: se entrega la copia guardada.
+7. Tamaño acotado: se expulsan los archivos menos usados.
+8. TRANSPORTE sólo cachea rangos de fechas pasados y sin correo.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_cache_resultados.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+BOT_PRUEBA = '''
+import os, time
+
+EJECUCIONES = []
+
+class BotReporte:
+    def run(self, almacen="SGVT", kb=1):
+        time.sleep(0.2)  # "extracción SAP"
+        EJECUCIONES.append(almacen)  # después: un refresco en curso aún no cuenta
+        ruta = os.path.join(os.environ["CARPETA_REPORTES"], f"Auditoria_{almacen}_{len(EJECUCIONES)}.txt")
+        with open(ruta, "w") as f:
+            f.write(almacen * (kb * 1024 // max(len(almacen), 1)))
+        return ruta
+'''
+
+FRESCO_S = 1.0
+REVALIDAR_S = 1.5
+
+
+def main():
+    carpeta = tempfile.mkdtemp()
+    with open(os.path.join(carpeta, "bot_prueba_reporte.py"), "w", encoding="utf-8") as f:
+        f.write(BOT_PRUEBA)
+    sys.path.append(carpeta)
+    os.environ["CARPETA_REPORTES"] = carpeta
+    os.environ.setdefault("NEXUS_OUTBOX_DB", os.path.join(carpeta, "outbox.db"))
+
+    import worker_sap
+    import bot_prueba_reporte
+    from nexus_bots import BOTS, Bot, Param, Cache, clave_resultado
+    from nexus_resultados import ResultCache
+    from nexus_scheduler import CPU
+
+    BOTS['PRUEBA_REPORTE'] = Bot('bot_prueba_reporte', 'BotReporte', [Param('almacen', 'SGVT'), Param('kb', 1)],
+                                 {CPU}, devuelve_resultado=True, cache=Cache(FRESCO_S, revalidar_s=REVALIDAR_S))
+    worker_sap.RESULTADOS = cache = ResultCache(directorio=os.path.join(carpeta, "cache"), max_bytes=40 * 1024,
+                                                revalidador=worker_sap._revalidar)
+    ejecuciones = bot_prueba_reporte.EJECUCIONES
+    fallas = []
+
+    def pedir(params):
+        inicio = time.perf_counter()
+        ruta = worker_sap.run_automation('PRUEBA_REPORTE', None, params)
+        return ruta, time.perf_counter() - inicio
+
+    def revisar(condicion, mensaje):
+        print(f"{'✅' if condicion else '❌'} {mensaje}")
+        if not condicion:
+            fallas.append(mensaje)
+
+    primera, t_bot = pedir({'almacen': 'SGVT'})
+    segunda, t_cache = pedir({'almacen': 'SGVT'})
+    revisar(len(ejecuciones) == 1 and segunda == primera,
+            f"1. Acierto: {len(ejecuciones)} ejecución, {t_bot * 1000:.0f} ms -> {t_cache * 1000:.1f} ms")
+
+    # Un acierto no debe importar el módulo del bot (pandas, win32com en los reales)
+    import nexus_bots
+    modulo, clases = sys.modules.pop('bot_prueba_reporte'), dict(nexus_bots._clases)
+    nexus_bots._clases.clear()
+    pedir({'almacen': 'SGVT'})
+    revisar('bot_prueba_reporte' not in sys.modules, "1b. Un acierto no importa el bot")
+    sys.modules['bot_prueba_reporte'] = modulo
+    nexus_bots._clases.update(clases)
+
+    pedir({'almacen': ' SGVT ', 'kb': 1})
+    pedir({})
+    revisar(len(ejecuciones) == 1, "2. Parámetros equivalentes comparten la entrada")
+
+    tercera, _ = pedir({'almacen': 'SGVT', 'sinCache': True})
+    revisar(len(ejecuciones) == 2 and tercera != primera, "3. sinCache ejecuta y actualiza")
+
+    time.sleep(FRESCO_S + 0.2)
+    obsoleta, t_obsoleta = pedir({'almacen': 'SGVT'})
+    # Inmediato = sin esperar la "extracción SAP" (0.2 s) del refresco en segundo plano
+    inmediata = obsoleta == tercera and t_obsoleta < 0.1
+    fin = time.time() + 5
+    while cache._revalidando and time.time() < fin:  # hasta que el refresco guarde su resultado
+        time.sleep(0.05)
+    refrescada, _ = pedir({'almacen': 'SGVT'})
+    revisar(inmediata and len(ejecuciones) == 3 and refrescada not in (tercera, None),
+            f"4. Obsoleto entregado en {t_obsoleta * 1000:.1f} ms y refrescado en segundo plano")
+
+    time.sleep(FRESCO_S + REVALIDAR_S + 0.2)
+    pedir({'almacen': 'SGVT'})
+    revisar(len(ejecuciones) == 4, "5. Vencido: se ejecuta de nuevo")
+
+    original, _ = pedir({'almacen': 'SGVT'})
+    with open(original, "a") as f:
+        f.write("modificado")
+    copia, _ = pedir({'almacen': 'SGVT'})
+    revisar(copia != original and os.path.dirname(copia) == cache.directorio and len(ejecuciones) == 4,
+            "6. Original modificado: se entrega la copia guardada")
+
+    for almacen in ("A1", "A2", "A3", "A4", "A5"):
+        pedir({'almacen': almacen, 'kb': 10})
+    stats = cache.estadisticas()
+    revisar(stats["bytes"] <= cache.max_bytes and stats["expulsados"] >= 1,
+            f"7. Tamaño acotado: {stats}")
+
+    hoy = date.today()
+    pasado = f"{(hoy - timedelta(days=7)):%d.%m.%Y}-{(hoy - timedelta(days=1)):%d.%m.%Y}"
+    hasta_hoy = f"{(hoy - timedelta(days=1)):%d.%m.%Y}-{hoy:%d.%m.%Y}"
+    revisar(clave_resultado('TRANSPORTE', {'fechas': pasado}) is not None
+            and clave_resultado('TRANSPORTE', {'fechas': hasta_hoy}) is None
+            and clave_resultado('TRANSPORTE', {'fechas': pasado, 'sendEmail': True}) is None
+            and clave_resultado('TRANSPORTE', {}) is None,
+            "8. TRANSPORTE: sólo rangos pasados y sin correo")
+
+    print()
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: caché de resultados")
+
+
+if __name__ == "__main__":
+    main()
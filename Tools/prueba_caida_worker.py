@@ -0,0 +1,123 @@
+"""
+Prueba de leases, latidos y reciclaje de órdenes contra el PostgREST local.
+
+1. Un proceso reclama una orden larga y late: la orden NO se recicla aunque
+   dure varias veces el lease.
+2. Se mata el proceso (kill) a mitad del trabajo: la orden vuelve a 'pending'
+   en menos de LEASE + RECICLAR (+ margen).
+3. Una orden que tumba a su worker en cada intento termina en 'dead_letter'
+   tras MAX_INTENTOS.
+4. Una orden terminada nunca se recicla.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_caida_worker.py --lease 2 --reciclar 0.5
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def worker_que_late(base_url, doc_id, lease_s, listo):
+    """Reclama, late y 'trabaja' hasta que lo maten."""
+    from nexus_claim import reclamar_orden, Latido
+    token = reclamar_orden(base_url, HEADERS, doc_id, "PC_CAIDO", lease_s=lease_s)
+    with Latido(base_url, HEADERS, doc_id, token, lease_s=lease_s, intervalo_s=lease_s / 4):
+        listo.set()
+        time.sleep(3600)
+
+
+def main():
+    import argparse
+    from postgrest_local import ServidorLocal
+    from nexus_claim import reclamar_orden, reciclar_vencidas, url_orden
+    from nexus_http import http
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lease", type=float, default=2.0)
+    parser.add_argument("--reciclar", type=float, default=0.5)
+    parser.add_argument("--intentos", type=int, default=3)
+    args = parser.parse_args()
+
+    srv = ServidorLocal().iniciar()
+    base = srv.url
+    fallas = []
+
+    def estado(doc_id):
+        return srv.tabla.seleccionar([("id", f"eq.{doc_id}")])[0]
+
+    def reciclador(duracion):
+        """Corre el reciclaje como lo haría otro worker durante `duracion` segundos."""
+        fin = time.time() + duracion
+        while time.time() < fin:
+            reciclar_vencidas(base, HEADERS, max_intentos=args.intentos)
+            time.sleep(args.reciclar)
+
+    # 1 y 2: orden larga con latidos; luego caída
+    larga, = srv.tabla.insertar([{"tipo_bot": "MIGO"}])
+    listo = multiprocessing.Event()
+    proceso = multiprocessing.Process(target=worker_que_late, args=(base, larga["id"], args.lease, listo))
+    proceso.start()
+    listo.wait(10)
+
+    reciclador(args.lease * 3)
+    if estado(larga["id"])["status"] != "running":
+        fallas.append("una orden con latidos fue reciclada")
+    print(f"1. Orden con latidos tras {args.lease * 3:.0f}s (3 leases): {estado(larga['id'])['status']}")
+
+    proceso.kill()
+    proceso.join()
+    caida = time.time()
+    limite = args.lease + args.reciclar + 1.5  # +1 s de resolución de lease_expira
+    while estado(larga["id"])["status"] == "running" and time.time() - caida < limite * 3:
+        reciclar_vencidas(base, HEADERS, max_intentos=args.intentos)
+        time.sleep(args.reciclar)
+    recuperacion = time.time() - caida
+    fila = estado(larga["id"])
+    print(f"2. Tras matar el worker: {fila['status']} (intentos={fila.get('intentos')}) "
+          f"en {recuperacion:.1f}s (límite {limite:.1f}s)")
+    if fila["status"] != "pending" or recuperacion > limite:
+        fallas.append(f"recuperación tras caída: {fila['status']} en {recuperacion:.1f}s")
+
+    # 3: orden que tumba a su worker en cada intento
+    veneno, = srv.tabla.insertar([{"tipo_bot": "UMV"}])
+    ejecuciones = 0
+    fin = time.time() + args.intentos * (args.lease + 2) * 3
+    while estado(veneno["id"])["status"] != "dead_letter" and time.time() < fin:
+        if reclamar_orden(base, HEADERS, veneno["id"], f"PC{ejecuciones}", lease_s=args.lease):
+            ejecuciones += 1  # ... y el worker muere sin latir
+        reciclar_vencidas(base, HEADERS, max_intentos=args.intentos)
+        time.sleep(args.reciclar)
+    fila = estado(veneno["id"])
+    print(f"3. Orden que tumba al worker: {fila['status']} tras {ejecuciones} ejecuciones "
+          f"(intentos={fila.get('intentos')}) - {fila.get('error')}")
+    if fila["status"] != "dead_letter" or ejecuciones != args.intentos:
+        fallas.append(f"dead letter: {fila['status']} con {ejecuciones} ejecuciones")
+
+    # 4: orden terminada
+    ok, = srv.tabla.insertar([{"tipo_bot": "AUDITOR"}])
+    token = reclamar_orden(base, HEADERS, ok["id"], "PC_OK", lease_s=args.lease)
+    http.patch(url_orden(base, ok["id"], token), headers=HEADERS, json={"status": "success"})
+    reciclador(args.lease + 1.5)
+    print(f"4. Orden terminada tras vencer su lease: {estado(ok['id'])['status']}")
+    if estado(ok["id"])["status"] != "success":
+        fallas.append("una orden terminada fue reciclada")
+
+    srv.detener()
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: leases, latidos y reciclaje")
+
+
+if __name__ == "__main__":
+    main()
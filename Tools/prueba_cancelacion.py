@@ -0,0 +1,165 @@
+"""
+Prueba de cancelación cooperativa y tiempos máximos (nexus_cancel, nexus_aislado).
+
+Usa un bot de prueba (se escribe en una carpeta temporal) que avanza por pasos
+con verificar_cancelacion() entre pasos, o que se "cuelga" ignorándola como un
+diálogo SAP, y lo corre por el mismo camino que la API (JobManager +
+worker_sap.run_automation):
+
+1. Bot en proceso: se cancela en el próximo paso.
+2. Bot aislado: se cancela en el próximo paso (aviso por stdin al hijo).
+3. Bot aislado colgado: se mata al vencer la gracia tras cancelar.
+4. Bot aislado colgado con tiempo máximo: termina en error y la orden
+   siguiente del mismo carril arranca enseguida.
+5. Bot aislado normal: devuelve su resultado y sus logs llegan al trabajo.
+6. cancel_requested en la orden (PostgREST local): el latido cancela el token.
+7. Bot aislado caliente: tras la primera orden (arranque en frío), las
+   siguientes reutilizan el mismo proceso hijo, aunque una escriba basura en
+   stderr y directo en el fd 1 (como una extensión C): eso llega al log de la
+   orden y no rompe el protocolo.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_cancelacion.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BOT_PRUEBA = '''
+import os, sys, time
+from nexus_cancel import verificar_cancelacion
+
+class BotPrueba:
+    def run(self, pasos=100, espera=0.1, colgar=False, ruido=False):
+        for i in range(pasos):
+            verificar_cancelacion()
+            print(f"paso {i}")
+            time.sleep(espera)
+            if colgar:
+                time.sleep(3600)  # diálogo colgado: nunca vuelve a verificar
+        if ruido:
+            os.write(1, b"basura del fd 1\\n")
+            sys.stderr.write("aviso sin salto de línea ")  # se pegaría al mensaje final
+            sys.stderr.flush()
+        return {"pasos": pasos}
+'''
+
+GRACIA_S = 1.5
+TIMEOUT_S = 2.0
+
+
+def main():
+    carpeta = tempfile.mkdtemp()
+    with open(os.path.join(carpeta, "bot_prueba_cancelacion.py"), "w", encoding="utf-8") as f:
+        f.write(BOT_PRUEBA)
+    sys.path.append(carpeta)
+    # El hijo de nexus_aislado también tiene que encontrar el bot de prueba
+    os.environ["PYTHONPATH"] = os.pathsep.join([carpeta, RAIZ, os.environ.get("PYTHONPATH", "")])
+    os.environ["NEXUS_CANCEL_GRACIA_S"] = str(GRACIA_S)
+    os.environ.setdefault("NEXUS_OUTBOX_DB", os.path.join(carpeta, "outbox.db"))
+
+    import worker_sap
+    from nexus_bots import BOTS, Bot, Param
+    from nexus_jobs import JobManager
+    from nexus_scheduler import CPU
+
+    args = [Param('pasos', 100), Param('espera', 0.1), Param('colgar', False), Param('ruido', False)]
+    BOTS['PRUEBA'] = Bot('bot_prueba_cancelacion', 'BotPrueba', args, {CPU})
+    BOTS['PRUEBA_AISLADO'] = Bot('bot_prueba_cancelacion', 'BotPrueba', args, {CPU}, timeout_s=600,
+                                 devuelve_resultado=True)
+    BOTS['PRUEBA_LIMITE'] = Bot('bot_prueba_cancelacion', 'BotPrueba', args, {CPU}, timeout_s=TIMEOUT_S)
+
+    jobs = JobManager(worker_sap.run_automation, limite_defecto=2)
+    fallas = []
+
+    def cancelar_y_medir(nombre, bot_id, params, limite_s):
+        trabajo = jobs.enviar(bot_id, params)
+        fin = time.time() + 20
+        while not trabajo.logs and time.time() < fin:  # que llegue a ejecutar algo
+            time.sleep(0.05)
+        inicio = time.time()
+        jobs.cancelar(trabajo.id)
+        trabajo.esperar(timeout=30)
+        demora = time.time() - inicio
+        print(f"{nombre}: {trabajo.status} en {demora:.2f}s (límite {limite_s:.1f}s) - {trabajo.error}")
+        if trabajo.status != "cancelled" or demora > limite_s:
+            fallas.append(f"{nombre}: {trabajo.status} en {demora:.2f}s")
+
+    cancelar_y_medir("1. En proceso", 'PRUEBA', {}, 0.5)
+    cancelar_y_medir("2. Aislado", 'PRUEBA_AISLADO', {}, 1.0)
+    cancelar_y_medir("3. Aislado colgado", 'PRUEBA_AISLADO', {'colgar': True}, GRACIA_S + 1.0)
+
+    # 4: el carril CPU tiene capacidad 2, así que se ocupan los dos con órdenes colgadas
+    colgadas = [jobs.enviar('PRUEBA_LIMITE', {'colgar': True}) for _ in range(2)]
+    siguiente = jobs.enviar('PRUEBA_AISLADO', {'pasos': 1, 'espera': 0})
+    inicio = time.time()
+    siguiente.esperar(timeout=30)
+    espera = time.time() - inicio
+    print(f"4. Colgadas con tiempo máximo {TIMEOUT_S}s: {[t.status for t in colgadas]} "
+          f"({colgadas[0].error}); la siguiente terminó en {espera:.1f}s: {siguiente.status}")
+    if any(t.status != "error" for t in colgadas) or siguiente.status != "success" or espera > TIMEOUT_S + 3:
+        fallas.append("tiempo máximo: las colgadas no liberaron el carril")
+
+    normal = jobs.enviar('PRUEBA_AISLADO', {'pasos': 3, 'espera': 0})
+    normal.esperar(timeout=30)
+    lineas, _ = normal.logs_desde(0)
+    print(f"5. Aislado normal: {normal.status} {normal.result}; logs {[l for l in lineas if l.startswith('paso')]}")
+    if normal.result != {"pasos": 3} or [l for l in lineas if l.startswith("paso")] != ["paso 0", "paso 1", "paso 2"]:
+        fallas.append("el bot aislado no devolvió su resultado o sus logs")
+
+    # 7: el hijo queda vivo entre órdenes; sólo se mata por tiempo, gracia o caída
+    import nexus_aislado
+    nexus_aislado.cerrar_todos()  # la primera arranca en frío
+    antes = nexus_aislado.estadisticas()
+    duraciones, ruidoso = [], None
+    for i in range(3):
+        inicio = time.perf_counter()
+        caliente = jobs.enviar('PRUEBA_AISLADO', {'pasos': 1, 'espera': 0, 'ruido': i == 1})
+        caliente.esperar(timeout=30)
+        duraciones.append(time.perf_counter() - inicio)
+        ruidoso = caliente if i == 1 else ruidoso
+    despues = nexus_aislado.estadisticas()
+    time.sleep(0.2)  # el hilo de stderr puede ir una línea atrás
+    lineas_ruido = "\n".join(ruidoso.logs_desde(0)[0])
+    print(f"7. Aislado en frío y caliente: {' / '.join(f'{d * 1000:.0f} ms' for d in duraciones)}; {despues}")
+    if caliente.status != "success" or despues["reutilizados"] - antes["reutilizados"] != 2 \
+            or despues["creados"] - antes["creados"] != 1:
+        fallas.append("el bot aislado no reutilizó su proceso hijo")
+    if ruidoso.status != "success" or "basura del fd 1" not in lineas_ruido:
+        fallas.append(f"la salida fuera del protocolo rompió el hijo o no llegó al log: {ruidoso.status}")
+
+    # 6: cancel_requested desde el panel, visto por el latido
+    from postgrest_local import ServidorLocal
+    from nexus_claim import reclamar_orden, Latido
+    from nexus_cancel import CancelToken
+    from nexus_http import http
+    srv = ServidorLocal().iniciar()
+    headers = {"Content-Type": "application/json"}
+    orden, = srv.tabla.insertar([{"tipo_bot": "MIGO"}])
+    token = reclamar_orden(srv.url, headers, orden["id"], "PC_PRUEBA", lease_s=4)
+    cancel = CancelToken()
+    with Latido(srv.url, headers, orden["id"], token, lease_s=4, intervalo_s=0.2, cancel=cancel):
+        http.patch(f"{srv.url}/rest/v1/ordenes_bot?id=eq.{orden['id']}", headers=headers,
+                   json={"cancel_requested": True})
+        cancel.esperar(3)
+    srv.detener()
+    print(f"6. cancel_requested en la orden: token cancelado={cancel.cancelado} ({cancel.motivo})")
+    if not cancel.cancelado:
+        fallas.append("el latido no propagó cancel_requested")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: cancelación cooperativa, gracia y tiempos máximos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Regresión del costo de importar nexus_logger (lo importa logistic_suite
+antes de dibujar la ventana):
+
+1. import nexus_logger dentro del presupuesto y sin librerías pesadas (pandas).
+2. Importarlo no lee settings.json ni crea carpetas en OneDrive.
+3. El primer log_event sí resuelve la carpeta de settings.json y escribe.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_import_logger.py --presupuesto-ms 40
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERRAMIENTAS = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(HERRAMIENTAS)
+sys.path.append(HERRAMIENTAS)
+
+from bench_importtime import PESADOS, medir
+
+PRUEBA = '''
+import os, sys
+sys.path.insert(0, {raiz!r})
+import nexus_logger
+print("tras import:", os.path.exists("OneDrive"))
+nexus_logger.log_event("Prueba", "Inicio", "primer evento", "OK")
+nexus_logger.nexus_logger.flush()
+print("tras log_event:", os.path.exists(os.path.join("OneDrive", "Nexus_System", "Logs", "bitacora_operaciones.csv")))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--presupuesto-ms", type=float, default=40)
+    parser.add_argument("--corridas", type=int, default=5)
+    args = parser.parse_args()
+    fallas = []
+
+    total, tiempos = min((medir("nexus_logger") for _ in range(args.corridas)), key=lambda c: c[0])
+    cargados = sorted(p for p in PESADOS if p in tiempos)
+    print(f"1. import nexus_logger: {total / 1000:.1f} ms (presupuesto {args.presupuesto_ms:.0f} ms), "
+          f"{len(tiempos)} módulos, pesados: {cargados or 'ninguno'}")
+    if total / 1000 > args.presupuesto_ms or cargados:
+        fallas.append("import de nexus_logger fuera de presupuesto")
+
+    carpeta = tempfile.mkdtemp()
+    with open(os.path.join(carpeta, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"OneDrivePath": "OneDrive"}, f)
+    salida = subprocess.run([sys.executable, "-c", PRUEBA.format(raiz=RAIZ)], cwd=carpeta,
+                            capture_output=True, text=True, encoding="utf-8").stdout
+    sin_efectos = "tras import: False" in salida
+    escribe = "tras log_event: True" in salida
+    print(f"2. Sin tocar disco al importar: {'✅' if sin_efectos else '❌'}")
+    print(f"3. El primer log_event escribe en la carpeta de settings.json: {'✅' if escribe else '❌'}")
+    if not (sin_efectos and escribe):
+        fallas.append(f"efectos del import / primer evento:\n{salida}")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: nexus_logger liviano al importar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Prueba del long-poll con el carril ocupado, con worker_sap real contra el
+PostgREST local.
+
+Un bot SAP largo ocupa el único carril SAP y otra orden SAP queda pendiente:
+el worker la saltea y el long-poll debe seguir bloqueado por ella (no una
+petición cada pocos segundos), pero volver apenas termina la primera para
+arrancar la segunda sin demora.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_intake_ocupado.py --duracion 15
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+RPC = "POST /rest/v1/rpc/esperar_ordenes_pendientes"
+
+BOT_LARGO = '''
+import time
+
+class BotLargo:
+    def run(self, segundos=1):
+        print(f"ocupando SAP {segundos} s")
+        time.sleep(segundos)
+'''
+
+LANZADOR = '''
+import sys
+sys.path[:0] = [{carpeta!r}, {raiz!r}]
+from nexus_bots import BOTS, Bot, Param
+from nexus_scheduler import SAP
+BOTS['LARGO'] = Bot('bot_largo', 'BotLargo', [Param('segundos', 1)], {{SAP}})
+import worker_sap
+worker_sap.start_worker()
+'''
+
+
+def main():
+    import argparse
+    from postgrest_local import ServidorLocal
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duracion", type=float, default=15)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    with open(os.path.join(carpeta, "bot_largo.py"), "w", encoding="utf-8") as f:
+        f.write(BOT_LARGO)
+    lanzador = os.path.join(carpeta, "lanzar.py")
+    with open(lanzador, "w", encoding="utf-8") as f:
+        f.write(LANZADOR.format(carpeta=carpeta, raiz=RAIZ))
+
+    srv = ServidorLocal().iniciar()
+    primera, segunda = srv.tabla.insertar([
+        {"tipo_bot": "LARGO", "status": "pending", "parametros": {"segundos": args.duracion}},
+        {"tipo_bot": "LARGO", "status": "pending", "parametros": {"segundos": 0.5}},
+    ])
+    env = dict(os.environ, SUPABASE_URL=srv.url, SUPABASE_KEY="local", NEXUS_INTAKE_MODE="longpoll",
+               NEXUS_OUTBOX_DB=os.path.join(carpeta, "outbox.db"))
+    proceso = subprocess.Popen([sys.executable, lanzador], env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+
+    def fila(doc_id):
+        return srv.tabla.seleccionar([("id", f"eq.{doc_id}")])[0]
+
+    limite = time.time() + args.duracion + 30
+    while fila(primera["id"]).get("status") != "running" and time.time() < limite:
+        time.sleep(0.05)
+    antes = srv.peticiones.get(RPC, 0)
+    while fila(primera["id"]).get("status") == "running" and time.time() < limite:
+        time.sleep(0.05)
+    durante = srv.peticiones.get(RPC, 0) - antes
+    while fila(segunda["id"]).get("status") not in ("success", "error") and time.time() < limite:
+        time.sleep(0.05)
+    proceso.kill()
+    salida = proceso.communicate()[0]
+    srv.detener()
+
+    uno, dos = fila(primera["id"]), fila(segunda["id"])
+    hueco = None
+    if uno.get("fin") and dos.get("inicio"):
+        hueco = (datetime.fromisoformat(dos["inicio"]) - datetime.fromisoformat(uno["fin"])).total_seconds()
+    print(f"1. Carril SAP ocupado {args.duracion:.0f} s: {durante} long-poll(s) mientras tanto")
+    print(f"2. La segunda arrancó {hueco if hueco is None else round(hueco, 2)} s después de terminar la primera")
+
+    fallas = []
+    if uno.get("status") != "success" or dos.get("status") != "success":
+        fallas.append(f"estados finales {uno.get('status')} / {dos.get('status')}")
+    if durante > 2:
+        fallas.append(f"{durante} long-polls con el carril ocupado: no siguió bloqueado")
+    if hueco is None or hueco > 1.5:
+        fallas.append(f"la segunda tardó {hueco} s en arrancar tras liberarse el carril")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        print(salida[-3000:])
+        sys.exit(1)
+    print("✅ OK: el long-poll espera por las órdenes salteadas y vuelve al liberarse el carril")
+
+
+if __name__ == "__main__":
+    main()
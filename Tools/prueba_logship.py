@@ -0,0 +1,76 @@
+"""
+Prueba del drenado por orden de LogShipper contra el PostgREST local.
+
+Un bot conversador (orden A) deja miles de líneas en el buffer y otra orden
+(B) termina con unas pocas: drenar(B) debe volver en lo que tarda UN lote, no
+esperar a que se envíe todo lo de A. Al final ambas órdenes deben tener todas
+sus líneas, en orden.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_logship.py --lineas 2000 --latencia 0.05
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from postgrest_local import ServidorLocal
+from nexus_logship import LogShipper
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", type=int, default=2000)
+    parser.add_argument("--latencia", type=float, default=0.05, help="RTT simulado hacia Supabase (s)")
+    args = parser.parse_args()
+
+    srv = ServidorLocal(latencia_s=args.latencia).iniciar()
+    a, b = srv.tabla.insertar([{"tipo_bot": "ZONALES"}, {"tipo_bot": "MIGO"}])
+    shipper = LogShipper(srv.url, HEADERS, lote=20)
+
+    for i in range(args.lineas):
+        shipper.enviar(a["id"], f"A {i}")
+    for i in range(5):
+        shipper.enviar(b["id"], f"B {i}")
+
+    inicio = time.perf_counter()
+    drenada = shipper.drenar(b["id"])
+    t_b = time.perf_counter() - inicio
+    quedan = shipper.estadisticas()["en_buffer"]
+    print(f"1. drenar(B) en {t_b * 1000:.0f} ms con {quedan} líneas de A aún en el buffer")
+
+    inicio = time.perf_counter()
+    todo = shipper.drenar(timeout=120)
+    print(f"2. drenar() de todo en {time.perf_counter() - inicio:.2f} s")
+    stats = shipper.estadisticas()
+    filas = {f["id"]: f for f in srv.tabla.seleccionar([])}
+    srv.detener()
+
+    fallas = []
+    if not drenada or t_b > 20 * args.latencia:
+        fallas.append(f"drenar(B) tardó {t_b:.2f}s: esperó líneas de otra orden")
+    if not todo:
+        fallas.append("no se vació el buffer")
+    if filas[a["id"]]["execution_logs"] != [f"A {i}" for i in range(args.lineas)]:
+        fallas.append("las líneas de A llegaron incompletas o desordenadas")
+    if filas[b["id"]]["execution_logs"] != [f"B {i}" for i in range(5)]:
+        fallas.append("las líneas de B llegaron incompletas o desordenadas")
+    if stats["errores"]:
+        fallas.append(f"errores de envío: {stats}")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: cada orden espera sólo sus propios logs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Prueba de la bandeja de salida (nexus_outbox) con un corte de red y un
+reinicio del worker a mitad del corte, contra el PostgREST local.
+
+1. Con el servidor caído, un proceso "worker" encola los cambios de estado de
+   N órdenes (varios por orden) y muere sin haber podido enviarlos.
+2. Vuelve la red y un worker nuevo abre la misma bandeja: todo debe llegar,
+   en orden (el último cambio de cada orden gana) y fusionado en menos
+   peticiones que mensajes. Un cambio rechazado (4xx) no debe trabar la cola.
+3. Dos bandejas sobre el mismo archivo (p. ej. worker y otro proceso que la
+   abrió): sólo una envía, ningún PATCH se duplica.
+4. Corte más largo que el lease: el PATCH filtrado por un lease_token ya
+   reciclado no toca filas. Si la orden volvió a 'pending' el resultado se
+   aplica por el respaldo (sin tocar `intentos`); si otro worker ya la
+   terminó, no se pisa y se cuenta como huérfano. En ambos casos se avisa
+   (al_terminar) para soltar el latido.
+
+Falla (exit 1) si algo no se cumple.
+
+    python Tools/prueba_outbox.py --ordenes 40
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+HEADERS = {"Content-Type": "application/json"}
+PASOS = 5
+
+
+def worker_offline(base_url, ruta_db, ids, listo):
+    """Encola todo sin red, informa cuánto tardó y queda 'colgado' hasta que lo maten."""
+    from nexus_outbox import Outbox
+    outbox = Outbox(HEADERS, ruta=ruta_db).iniciar()
+    inicio = time.perf_counter()
+    for i, doc_id in enumerate(ids):
+        url = f"{base_url}/rest/v1/ordenes_bot?id=eq.{doc_id}"
+        for paso in range(PASOS):
+            outbox.encolar(url, {"paso": paso, "mensaje": f"paso {paso}"})
+        if i == len(ids) // 2:
+            outbox.encolar(f"{base_url}/rest/v1/tabla_que_no_existe?id=eq.{doc_id}", {"x": 1})
+        outbox.encolar(url, {"status": "success", "result_payload": i})
+    listo.put(time.perf_counter() - inicio)
+    time.sleep(3600)
+
+
+def main():
+    import argparse
+    from postgrest_local import ServidorLocal
+    from nexus_outbox import Outbox
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ordenes", type=int, default=40)
+    args = parser.parse_args()
+
+    srv = ServidorLocal().iniciar()
+    filas = srv.tabla.insertar([{"tipo_bot": "AUDITOR", "status": "running"} for _ in range(args.ordenes)])
+    ids = [f["id"] for f in filas]
+    puerto = int(srv.url.rsplit(":", 1)[1])
+    tabla = srv.tabla
+    srv.detener()  # corte de red
+
+    ruta_db = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    listo = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=worker_offline, args=(srv.url, ruta_db, ids, listo))
+    proceso.start()
+    t_encolar = listo.get(timeout=60)
+    proceso.kill()
+    proceso.join()
+    mensajes = args.ordenes * (PASOS + 1) + 1
+    print(f"1. Sin red: {mensajes} cambios encolados en {t_encolar * 1000:.0f} ms "
+          f"({t_encolar / mensajes * 1e6:.0f} µs c/u); worker muerto con todo pendiente")
+
+    # Vuelve la red (mismo puerto, misma tabla) y arranca un worker nuevo
+    srv = ServidorLocal(port=puerto)
+    srv.tabla = tabla
+    srv.iniciar()
+    inicio = time.perf_counter()
+    outbox = Outbox(HEADERS, ruta=ruta_db).iniciar()
+    vacio = outbox.drenar(timeout=60)
+    duracion = time.perf_counter() - inicio
+    stats = outbox.estadisticas()
+
+
+    finales = {f["id"]: f for f in tabla.seleccionar([])}
+    malas = [i for i, doc_id in enumerate(ids)
+             if finales[doc_id].get("status") != "success"
+             or finales[doc_id].get("result_payload") != i
+             or finales[doc_id].get("paso") != PASOS - 1]
+    print(f"2. Con red: reenvío en {duracion:.2f}s, {stats['peticiones']} peticiones para "
+          f"{mensajes} cambios; {stats}")
+
+    # 3. Un segundo drenador sobre la misma bandeja: queda en espera del bloqueo
+    otra = Outbox(HEADERS, ruta=ruta_db).iniciar()
+    srv.latencia_s = 0.02  # que los dos tengan tiempo de pisarse
+    antes = srv.peticiones.get("PATCH /rest/v1/ordenes_bot", 0)
+    for i, doc_id in enumerate(ids):
+        (outbox if i % 2 else otra).encolar(f"{srv.url}/rest/v1/ordenes_bot?id=eq.{doc_id}", {"revisado": True})
+    doble_vacio = otra.drenar(timeout=60)
+    patches = srv.peticiones.get("PATCH /rest/v1/ordenes_bot", 0) - antes
+    print(f"3. Dos bandejas, un archivo: {patches} PATCH para {len(ids)} órdenes; "
+          f"envía la primera={outbox.drenando}, la segunda={otra.drenando}")
+
+    # 4. El lease venció durante el corte: una orden reciclada y otra ya terminada por otro
+    from nexus_claim import url_orden, url_sin_terminar
+    reciclada, ajena = tabla.insertar([
+        {"tipo_bot": "AUDITOR", "status": "pending", "lease_token": None, "intentos": 1},
+        {"tipo_bot": "AUDITOR", "status": "success", "result_payload": "de otro worker", "intentos": 1},
+    ])
+    avisos = []
+    for fila in (reciclada, ajena):
+        outbox.encolar(url_orden(srv.url, fila["id"], "token-reciclado"), {"status": "success", "result_payload": "propio"},
+                       respaldo=url_sin_terminar(srv.url, fila["id"]),
+                       al_terminar=lambda doc_id=fila["id"]: avisos.append(doc_id))
+    outbox.drenar(timeout=30)
+    vencidas = {f["id"]: f for f in tabla.seleccionar([])}
+    huerfanos = outbox.estadisticas()["huerfanos"]
+    print(f"4. Lease vencido: reciclada -> {vencidas[reciclada['id']]['status']}/"
+          f"{vencidas[reciclada['id']]['result_payload']}, terminada por otro -> "
+          f"{vencidas[ajena['id']]['result_payload']}, huérfanos={huerfanos}, avisos={len(avisos)}")
+    srv.detener()
+
+    fallas = []
+    if not vacio or stats["pendientes"]:
+        fallas.append(f"quedaron {stats['pendientes']} cambios sin enviar")
+    if malas:
+        fallas.append(f"{len(malas)} órdenes con estado final incorrecto")
+    if stats["descartados"] != 1:
+        fallas.append(f"se esperaba 1 cambio descartado, hubo {stats['descartados']}")
+    if stats["peticiones"] >= mensajes:
+        fallas.append("no se fusionaron cambios consecutivos")
+    if not doble_vacio or patches != len(ids) or otra.drenando:
+        fallas.append(f"dos drenadores: {patches} PATCH para {len(ids)} cambios (duplicados)")
+    if (vencidas[reciclada["id"]]["status"], vencidas[reciclada["id"]]["result_payload"],
+            vencidas[reciclada["id"]]["intentos"]) != ("success", "propio", 1):
+        fallas.append("el resultado de la orden reciclada se perdió o tocó intentos")
+    if vencidas[ajena["id"]]["result_payload"] != "de otro worker" or huerfanos != 1:
+        fallas.append(f"orden terminada por otro: se pisó o no se contó huérfana ({huerfanos})")
+    if sorted(avisos) != sorted([reciclada["id"], ajena["id"]]):
+        fallas.append(f"al_terminar no se llamó para todos: {avisos}")
+
+    print()
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ OK: cambios durables, en orden y reenviados tras el corte")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Simulación de la cola de órdenes: FIFO contra prioridad + plazo (nexus_priority).
+
+Reproduce un PC con los carriles de nexus_scheduler (CAPACIDADES) y la misma
+regla de despacho que worker_sap.procesar_ordenes: se recorre la cola en orden,
+se lanza lo que tiene sus recursos libres y los recursos de una orden salteada
+quedan reservados para las que vienen detrás. Sólo cambia el orden de la cola.
+
+Reporta por banda de prioridad la espera (p50/p95/p99/máx) y los plazos
+vencidos.
+
+La traza puede ser:
+- JSONL con {"llegada_s", "tipo_bot", "duracion_s", "prioridad"?, "plazo_s"?, "parametros"?}
+- JSON con filas de ordenes_bot (fecha_creacion ISO; duracion_s opcional,
+  si falta se usa la duración típica del bot)
+- Generada (--generar), reproducible con --semilla; --grabar la guarda en JSONL.
+
+    python Tools/sim_prioridades.py --generar 400 --carga 0.9
+    python Tools/sim_prioridades.py --traza ordenes.jsonl
+"""
+import heapq
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nexus_bots import recursos_bot
+from nexus_scheduler import CAPACIDADES
+from nexus_priority import ordenar_ordenes, prioridad_orden, NOMBRES, _epoch
+
+# (peso en la mezcla, duración típica en s, prioridad de la orden si se fuerza, plazo en s)
+MEZCLA = {
+    'MIGO': (20, 240, None, None),
+    'PALLET': (8, 180, None, None),
+    'TRANSPORTE': (10, 600, None, None),
+    'AUDITOR': (14, 60, None, 1800),
+    'AUDITOR_URGENTE': (5, 60, 0, 600),   # pedido por correo
+    'LT01': (8, 150, None, None),
+    'UMV': (8, 120, None, None),
+    'CONCILIACION_EMAIL': (4, 300, None, None),
+    'ZONALES': (4, 420, None, None),
+    'ANALISIS_ZONALES': (4, 90, None, None),
+    'VISION': (15, 20, None, 900),
+}
+
+
+def generar(n, carga, semilla):
+    """n órdenes con llegadas Poisson; `carga` ~ ocupación media del carril SAP."""
+    rnd = random.Random(semilla)
+    tipos = list(MEZCLA)
+    pesos = [MEZCLA[t][0] for t in tipos]
+    sap = sum(MEZCLA[t][0] * MEZCLA[t][1] for t in tipos
+              if 'sap' in recursos_bot(t.replace('_URGENTE', ''))) / sum(pesos)
+    tasa = carga / sap
+    t = 0.0
+    traza = []
+    for _ in range(n):
+        t += rnd.expovariate(tasa)
+        tipo = rnd.choices(tipos, pesos)[0]
+        _, duracion, prioridad, plazo = MEZCLA[tipo]
+        orden = {"llegada_s": round(t, 1), "tipo_bot": tipo.replace('_URGENTE', ''),
+                 "duracion_s": round(rnd.uniform(0.5, 1.5) * duracion, 1)}
+        if prioridad is not None:
+            orden["prioridad"] = prioridad
+        if plazo is not None:
+            orden["plazo_s"] = plazo
+        traza.append(orden)
+    return traza
+
+
+def cargar(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        texto = f.read()
+    if texto.lstrip().startswith("["):
+        filas = json.loads(texto)
+        inicio = min(_epoch(f["fecha_creacion"]) for f in filas)
+        traza = []
+        for fila in filas:
+            llegada = _epoch(fila["fecha_creacion"]) - inicio
+            orden = {"llegada_s": llegada, "tipo_bot": fila["tipo_bot"], "parametros": fila.get("parametros") or {},
+                     "duracion_s": fila.get("duracion_s") or MEZCLA.get(fila["tipo_bot"], (0, 120))[1]}
+            if fila.get("prioridad") is not None:
+                orden["prioridad"] = fila["prioridad"]
+            if fila.get("fecha_limite"):
+                orden["plazo_s"] = _epoch(fila["fecha_limite"]) - inicio - llegada
+            traza.append(orden)
+        return sorted(traza, key=lambda o: o["llegada_s"])
+    return [json.loads(linea) for linea in texto.splitlines() if linea.strip()]
+
+
+def simular(traza, ordenar):
+    """Devuelve [(orden, espera_s, fin_s)] con la regla de despacho de worker_sap."""
+    ordenes = []
+    for i, o in enumerate(sorted(traza, key=lambda o: o["llegada_s"])):
+        datos = {"id": i, "tipo_bot": o["tipo_bot"], "parametros": o.get("parametros") or {},
+                 "fecha_creacion": o["llegada_s"], "duracion_s": o["duracion_s"]}
+        if o.get("prioridad") is not None:
+            datos["prioridad"] = o["prioridad"]
+        if o.get("plazo_s") is not None:
+            datos["fecha_limite"] = o["llegada_s"] + o["plazo_s"]
+        ordenes.append(datos)
+
+    libres = dict(CAPACIDADES)
+    pendientes = []
+    en_curso = []  # heap (fin, id, recursos)
+    resultados = []
+    llegadas = iter(ordenes)
+    proxima = next(llegadas, None)
+    ahora = 0.0
+    while proxima is not None or pendientes or en_curso:
+        # Próximo evento: llegada o fin de una orden
+        t_llegada = proxima["fecha_creacion"] if proxima is not None else float("inf")
+        t_fin = en_curso[0][0] if en_curso else float("inf")
+        ahora = min(t_llegada, t_fin)
+        while en_curso and en_curso[0][0] <= ahora:
+            _, _, recursos = heapq.heappop(en_curso)
+            for r in recursos:
+                libres[r] += 1
+        while proxima is not None and proxima["fecha_creacion"] <= ahora:
+            pendientes.append(proxima)
+            proxima = next(llegadas, None)
+
+        bloqueados = set()
+        for datos in ordenar(pendientes, ahora):
+            recursos = recursos_bot(datos["tipo_bot"], datos["parametros"])
+            if recursos & bloqueados or any(libres.get(r, 1) <= 0 for r in recursos):
+                bloqueados |= recursos
+                continue
+            for r in recursos:
+                libres[r] -= 1
+            pendientes.remove(datos)
+            fin = ahora + datos["duracion_s"]
+            heapq.heappush(en_curso, (fin, datos["id"], recursos))
+            resultados.append((datos, ahora - datos["fecha_creacion"], fin))
+    return resultados
+
+
+def fifo(ordenes, ahora):
+    return sorted(ordenes, key=lambda d: d["fecha_creacion"])
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+def reporte(nombre, resultados):
+    print(f"\n{nombre}")
+    print(f"{'banda':<10}{'n':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}  plazos vencidos")
+    bandas = sorted({prioridad_orden(d) for d, _, _ in resultados})
+    for banda in bandas:
+        filas = [(d, espera, fin) for d, espera, fin in resultados if prioridad_orden(d) == banda]
+        esperas = [espera / 60 for _, espera, _ in filas]
+        con_plazo = [(d, fin) for d, _, fin in filas if d.get("fecha_limite") is not None]
+        vencidos = sum(1 for d, fin in con_plazo if fin > d["fecha_limite"])
+        plazos = f"{vencidos}/{len(con_plazo)}" if con_plazo else "-"
+        print(f"{NOMBRES.get(banda, banda):<10}{len(filas):>5}"
+              f"{percentil(esperas, 50):>8.1f}m{percentil(esperas, 95):>8.1f}m"
+              f"{percentil(esperas, 99):>8.1f}m{max(esperas):>8.1f}m  {plazos}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traza", help="JSONL de órdenes o JSON con filas de ordenes_bot")
+    parser.add_argument("--generar", type=int, default=400, help="órdenes a generar si no hay --traza")
+    parser.add_argument("--carga", type=float, default=0.9, help="ocupación media del carril SAP")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--grabar", help="guarda la traza generada en este JSONL")
+    args = parser.parse_args()
+
+    traza = cargar(args.traza) if args.traza else generar(args.generar, args.carga, args.semilla)
+    if args.grabar:
+        with open(args.grabar, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(o) + "\n" for o in traza)
+        print(f"💾 Traza guardada en {args.grabar}")
+    print(f"📊 {len(traza)} órdenes, carriles {CAPACIDADES}")
+
+    reporte("FIFO (antes)", simular(traza, fifo))
+    reporte("Prioridad + plazo + envejecimiento (nexus_priority)", simular(traza, ordenar_ordenes))
+
+
+if __name__ == "__main__":
+    main()
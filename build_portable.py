@@ -3,6 +3,7 @@ import os
 import shutil
 import sys
 import io
+from nexus_bots import modulos_ocultos
 
 # Fix unicode on windows console
 if sys.platform == 'win32':
@@ -68,8 +69,12 @@ args = [
     # --- RECURSOS ---
     '--collect-all=customtkinter', # Trae temas y assets de CTk
     '--collect-submodules=Bots',   # Trae todos los bots
+    '--paths=%s' % os.path.abspath('Bots'),
 ]
 
+# Bots: worker_sap los importa en diferido (nexus_bots), PyInstaller no los ve solo
+args += ['--hidden-import=%s' % modulo for modulo in modulos_ocultos()]
+
 # Ejecutar PyInstaller
 PyInstaller.__main__.run(args)
 
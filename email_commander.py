@@ -6,6 +6,7 @@ from firebase_admin import credentials, firestore
 import win32com.client
 import pythoncom
 from datetime import datetime
+from nexus_pulso import latir
 import google.generativeai as genai
 
 # --- CONFIGURACIÓN ---
@@ -96,6 +97,7 @@ class NexusEmailCommander:
         print(f"📡 Escuchando frecuencias... (Asuntos: {TRIGGER_PREFIXES})")
         
         while True:
+            latir("email_commander")  # vida para nexus_manager (Outlook colgado = sin pulso)
             try:
                 # 1. Leer Comandos
                 items = self.inbox.Items.Restrict("[UnRead] = True")
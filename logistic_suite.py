@@ -1,10 +1,16 @@
 import customtkinter as ctk
+import importlib
+import queue
 import threading
+import time
 import sys
 import os
 import json
 from tkinter import filedialog, messagebox
 
+from nexus_bots import BOTS
+from nexus_jobs import JobManager, ColaLlena
+
 SETTINGS_FILE = "settings.json"
 
 # --- LOGGER CENTRALIZADO ---
@@ -18,70 +24,109 @@ except Exception as e:
 # --- CONFIGURACIÓN PATH ---
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Bots'))
 
-# --- IMPORTAR TODOS LOS BOTS (Con reporte de errores real) ---
-print("--- CARGANDO SISTEMA ---")
-try:
-    from Tx_MIGO3 import SapMigoBotTurbo 
-    print("✅ MIGO cargado.")
-except Exception as e: 
-    print(f"❌ Error MIGO: {e}")
-    SapMigoBotTurbo = None
-
-try:
-    from Bot_Pallet import SapBotPallet
-    print("✅ Pallet cargado.")
-except Exception as e: 
-    print(f"❌ Error Pallet: {e}")
-    SapBotPallet = None
-
-try:
-    from Bot_Transporte import SapBotTransporte
-    print("✅ Transporte cargado.")
-except Exception as e: 
-    print(f"❌ Error Transporte: {e}")
-    SapBotTransporte = None
-
-try:
-    from Bot_Vision import BotVisionPizarra
-    print("✅ Visión cargado.")
-except Exception as e: 
-    print(f"❌ Error Visión: {e}")
-    BotVisionPizarra = None
-
-try:
-    from Bot_Auditor import SapBotAuditor
-    print("✅ Auditor cargado.")
-except Exception as e: 
-    print(f"❌ Error Auditor: {e}")
-    SapBotAuditor = None
-
-try:
-    from Bot_Traspaso_LT01 import SapBotTraspasoLT01
-    print("✅ Traspaso LT01 cargado.")
-except Exception as e:
-    print(f"❌ Error Traspaso LT01: {e}")
-    SapBotTraspasoLT01 = None
-
-try:
-    from Bot_Conversiones_UMV import SapBotConversiones
-    print("✅ Conversiones UMV cargado.")
-except Exception as e:
-    print(f"❌ Error Conversiones UMV: {e}")
-    SapBotConversiones = None
-
-try:
-    from Bot_Reporte_Cambiados import BotReporteCambiados
-    print("✅ Resporte Cambiados cargado.")
-except Exception as e:
-    print(f"❌ Error Reporte Cambiados: {e}")
-    BotReporteCambiados = None
-
-try:
-    from Bot_SAP_Existencias import SapBotExistencias
-    print("✅ SAP Existencias cargado.")
-except Exception as e:
-    print(f"❌ Error SAP Existencias: {e}")
-    SapBotExistencias = None
+# --- MANIFIESTO DE BOTS ---
+# Los bots NO se importan al abrir el panel (arrastran pandas, win32com, PIL,
+# google.generativeai...): el menú se arma con este manifiesto y cada módulo
+# se importa en segundo plano después de mostrar la ventana, o al primer clic.
+# Si un bot no carga, su botón queda deshabilitado con el error en consola.
+class PanelBot:
+    def __init__(self, bot_id, texto, info, seccion="BOTS", titulo=None, archivo=False, pide_almacen=False,
+                 modos=False):
+        """
+        bot_id: clave en nexus_bots.BOTS (módulo, clase, argumentos y recursos salen de ahí).
+        archivo: run(ruta). pide_almacen: run(almacen). modos: run("normal"|"simulation").
+        """
+        bot = BOTS[bot_id]
+        self.bot_id = bot_id
+        self.texto = texto
+        self.titulo = titulo or texto
+        self.info = info
+        self.seccion = seccion
+        self.archivo = archivo
+        self.pide_almacen = pide_almacen
+        self.modos = modos
+        self.modulo = bot.modulo
+        self.clase = bot.clase
+        self.clase_bot = None     # la clase, una vez importado el módulo
+        self.estado = "pendiente" # pendiente | cargando | listo | error
+        self.error = None
+
+
+SECCIONES = {"BOTS": "🤖 BOTS SAP", "REPORTES": "📊 REPORTES"}
+
+PANELES = [
+    PanelBot("MIGO", "Transferencia MIGO",
+             "Selecciona el Excel para realizar la carga (Plantilla_MIGO.xlsx).", archivo=True),
+    PanelBot("PALLET", "Auditor de Altura", "Selecciona el Excel para pegar la hoja de LX02.", archivo=True),
+    PanelBot("TRANSPORTE", "Auditor de Transporte", "Extrae reporte VT11 (Rango Fechas) -> VT03N."),
+    # PanelBot("VISION", "Vision IA: Panel de operación", "Baja temporal.", archivo=True), # REMOVED
+    PanelBot("AUDITOR", "Auditor de tránsitos pendientes", "Al ejecutar, te pedirá el Almacén.",
+             pide_almacen=True),
+    PanelBot("LT01", "Transferencias Lt01",
+             "Realiza traspasos LT01 basándose en stock.\nSelecciona el Excel (Plantilla_LT01.xlsx).", archivo=True),
+    PanelBot("UMV", "Conversiones UMV",
+             "Extrae factores de conversión (UN -> UNV/CJ).\nSelecciona el Excel con materiales.", archivo=True),
+    PanelBot("REPORTE_CAMBIADOS", "Reporte: Cambiados",
+             "Genera el borrador del correo con la tabla de 'Cambiados'.\n\nRequiere que el Excel 'Reporte Desv. Zonales...' esté en OneDrive.",
+             seccion="REPORTES", titulo="Reporte Cambiados Zonales"),
+    PanelBot("EXISTENCIAS", "Control de Existencias",
+             "Ejecuta el bot de SAP para verificar negativos en 920 y documentos pendientes.\n\nModo Normal: Ejecuta análisis real.\nModo Simulacro: Fuerza alertas para pruebas.",
+             seccion="REPORTES", modos=True),
+]
+
+PANELES_POR_ID = {p.bot_id: p for p in PANELES}
+
+# Espera tras mostrar la ventana antes de empezar a importar los bots en segundo plano
+PRECARGA_MS = 1500
+
+# --- LOG DEL PANEL ---
+# Los hilos de los bots nunca tocan el widget: el hilo de Tk vuelca cada
+# FRAME_MS, con un solo insert, lo nuevo del trabajo visible (nexus_jobs
+# guarda sus líneas) y los mensajes del panel (cola de App.log). El log
+# guarda como máximo MAX_LINEAS: las más viejas se recortan.
+FRAME_MS = 50
+MAX_LINEAS = 5000
+LINEAS_POR_FRAME = 20000
+
+# --- COLA DE TRABAJOS ---
+# EJECUTAR encola: los trabajos corren solos en orden, y en paralelo si no
+# comparten recursos (mismas reglas que worker_sap: nexus_bots.recursos_bot
+# sobre nexus_scheduler). Un bot no corre dos veces a la vez.
+REFRESCO_MS = 250
+HISTORIAL = 50  # trabajos terminados que quedan en la lista
+ESTADOS = {
+    "queued": ("⏳ En cola", "gray70"),
+    "running": ("▶️ Corriendo", "#3B8ED0"),
+    "success": ("✅ OK", "#2CC985"),
+    "error": ("❌ Error", "#E74C3C"),
+    "cancelled": ("⛔ Cancelado", "gray50"),
+}
+
+
+def ejecutar_panel(bot_id, ruta, params):
+    """Ejecutor del JobManager del panel (hilo del scheduler; print() va al log del trabajo)."""
+    panel = PANELES_POR_ID[bot_id]
+    print(f"--- Iniciando {panel.clase}... ---")
+    try:
+        resultado = panel.clase_bot().run(*BOTS[bot_id].argumentos(ruta, params))
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
+        raise
+    print("✅ PROCESO FINALIZADO CON ÉXITO")
+    return resultado
+
+
+def _duracion(segundos):
+    minutos, segundos = divmod(int(segundos), 60)
+    return f"{minutos}:{segundos:02d}"
+
+
+def cargar_bot(panel):
+    """Importa el módulo del bot (en cualquier hilo). Devuelve (clase, error)."""
+    try:
+        return getattr(importlib.import_module(panel.modulo), panel.clase), None
+    except Exception as e:
+        return None, e
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -93,26 +138,32 @@ class App(ctk.CTk):
         self.geometry("900x600")
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
-        self.bot_actual_class = None
+        self.panel_actual = None
+        self.botones = {}
+        self._cargas = queue.Queue()
+        self._lineas = queue.Queue()   # mensajes de App.log, de cualquier hilo; ver _renderizar
+        self.jobs = JobManager(ejecutar_panel, historial=HISTORIAL)
+        self.filas = {}                # job_id -> (frame, botón, cancelar, último texto)
+        self.numeros = {}              # job_id -> número visible (#1, #2...)
+        self.trabajo_visible = None    # job_id cuyo log se muestra
+        self._arrancados = set()       # job_id que ya se vieron arrancar (para seguirlos en el log)
+        self._titulo_cola = None
+        self.cerrando = False          # cerrar() esperando a los trabajos que corren
+        self._desde = 0                # próxima línea de ese log a dibujar
 
         # --- MENU LATERAL ---
         self.sidebar = ctk.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar.grid(row=0, column=0, rowspan=4, sticky="nsew")
-        
-        ctk.CTkLabel(self.sidebar, text="🤖 BOTS SAP", font=ctk.CTkFont(size=20, weight="bold")).pack(pady=20)
-
-        self.crear_boton("Transferencia MIGO", self.panel_migo)
-        self.crear_boton("Auditor de Altura", self.panel_pallet)
-        self.crear_boton("Auditor de Transporte", self.panel_transporte)
-        # self.crear_boton("Vision IA: Panel de operación", self.panel_vision) # REMOVED
-        self.crear_boton("Auditor de tránsitos pendientes", self.panel_auditor)
-        self.crear_boton("Transferencias Lt01", self.panel_lt01)
-        self.crear_boton("Conversiones UMV", self.panel_conversiones)
-        
-        # --- REPORTES ---
-        ctk.CTkLabel(self.sidebar, text="📊 REPORTES", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
-        self.crear_boton("Reporte: Cambiados", self.panel_reporte_cambiados)
-        self.crear_boton("Control de Existencias", self.panel_existencias)
+
+        seccion = None
+        for panel in PANELES:
+            if panel.seccion != seccion:
+                seccion = panel.seccion
+                if seccion == "BOTS":
+                    ctk.CTkLabel(self.sidebar, text=SECCIONES[seccion], font=ctk.CTkFont(size=20, weight="bold")).pack(pady=20)
+                else:
+                    ctk.CTkLabel(self.sidebar, text=SECCIONES[seccion], font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+            self.botones[panel.bot_id] = self.crear_boton(panel.texto, lambda p=panel: self.seleccionar(p))
 
         # --- PANEL CENTRAL ---
         self.main_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -120,9 +171,17 @@ class App(ctk.CTk):
         
         self.setup_ui_generica()
 
+        # Bots: en segundo plano una vez que la ventana ya se ve
+        self.after(100, self._revisar_cargas)
+        self.after(FRAME_MS, self._renderizar)
+        self.after(REFRESCO_MS, self._refrescar_cola)
+        self.after(PRECARGA_MS, self._precargar)
+        self.protocol("WM_DELETE_WINDOW", self.cerrar)
+
     def crear_boton(self, texto, comando):
         btn = ctk.CTkButton(self.sidebar, text=texto, command=comando, height=40)
         btn.pack(pady=5, padx=20)
+        return btn
 
     def setup_ui_generica(self):
         self.lbl_title = ctk.CTkLabel(self.main_frame, text="Selecciona un Bot", font=ctk.CTkFont(size=24))
@@ -134,9 +193,15 @@ class App(ctk.CTk):
         self.entry_file = ctk.CTkEntry(self.main_frame, placeholder_text="Ruta archivo...", width=400)
         self.btn_select = ctk.CTkButton(self.main_frame, text="Buscar Archivo", command=self.sel_archivo, fg_color="gray")
         
-        self.btn_run = ctk.CTkButton(self.main_frame, text="EJECUTAR", command=self.run_migo_thread, height=50, fg_color="#2CC985", state="disabled")
+        self.btn_run = ctk.CTkButton(self.main_frame, text="EJECUTAR", command=self.encolar, height=50, fg_color="#2CC985", state="disabled")
         self.btn_run.pack(pady=20)
-        
+
+        self.lista_cola = ctk.CTkScrollableFrame(self.main_frame, height=140, label_text="Cola de trabajos")
+        self.lista_cola.pack(fill="x", pady=(0, 10))
+
+        self.lbl_log = ctk.CTkLabel(self.main_frame, text="Log", anchor="w")
+        self.lbl_log.pack(fill="x")
+
         self.log_box = ctk.CTkTextbox(self.main_frame, width=600, height=250)
         self.log_box.pack(fill="both", expand=True)
 
@@ -161,7 +226,6 @@ class App(ctk.CTk):
     def reset_ui(self, titulo, info, necesita_archivo=False):
         self.lbl_title.configure(text=titulo)
         self.lbl_info.configure(text=info)
-        self.log_box.delete("0.0", "end")
         self.entry_file.delete(0, "end")
         
         # Limpiar switch si existe
@@ -169,12 +233,12 @@ class App(ctk.CTk):
             self.switch.pack_forget()
 
         if necesita_archivo:
-            self.entry_file.pack(pady=5)
-            self.btn_select.pack(pady=5)
+            self.entry_file.pack(pady=5, before=self.btn_run)
+            self.btn_select.pack(pady=5, before=self.btn_run)
             
-            # Cargar ruta guardada si existe
-            if self.bot_actual_class:
-                bot_name = getattr(self.bot_actual_class, "__name__", "")
+            # Cargar ruta guardada si existe (guardada con el nombre de la clase del bot)
+            if self.panel_actual:
+                bot_name = self.panel_actual.clase
                 settings = self.load_settings()
                 saved_path = settings.get(bot_name, "")
                 if saved_path and os.path.exists(saved_path):
@@ -187,55 +251,57 @@ class App(ctk.CTk):
         self.btn_run.configure(state="normal")
 
     # --- PANELES ---
-    def panel_migo(self):
-        self.bot_actual_class = SapMigoBotTurbo
-        self.reset_ui("Transferencia MIGO", "Selecciona el Excel para realizar la carga (Plantilla_MIGO.xlsx).", True)
-
-    def panel_pallet(self):
-        self.bot_actual_class = SapBotPallet
-        self.reset_ui("Auditor de Altura", "Selecciona el Excel para pegar la hoja de LX02.", True)
-
-    def panel_transporte(self):
-        self.bot_actual_class = SapBotTransporte
-        self.reset_ui("Auditor de Transporte", "Extrae reporte VT11 (Rango Fechas) -> VT03N.", False)
-
-    def panel_vision(self):
-        self.bot_actual_class = BotVisionPizarra
-        self.reset_ui("Vision IA", "Baja temporal.", True)
-
-    def panel_auditor(self):
-        self.bot_actual_class = SapBotAuditor
-        self.reset_ui("Auditor de tránsitos pendientes", "Al ejecutar, te pedirá el Almacén.", False)
-
-    def panel_lt01(self):
-        self.bot_actual_class = SapBotTraspasoLT01
-        self.reset_ui("Transferencias Lt01",
-                      "Realiza traspasos LT01 basándose en stock.\nSelecciona el Excel (Plantilla_LT01.xlsx).",
-                      necesita_archivo=True)
-
-    def panel_conversiones(self):
-        self.bot_actual_class = SapBotConversiones
-        self.reset_ui("Conversiones UMV",
-                      "Extrae factores de conversión (UN -> UNV/CJ).\nSelecciona el Excel con materiales.",
-                      necesita_archivo=True)
-
-    def panel_reporte_cambiados(self):
-        self.bot_actual_class = BotReporteCambiados
-        self.reset_ui("Reporte Cambiados Zonales", 
-                      "Genera el borrador del correo con la tabla de 'Cambiados'.\n\nRequiere que el Excel 'Reporte Desv. Zonales...' esté en OneDrive.", 
-                      False)
-
-    def panel_existencias(self):
-        self.bot_actual_class = SapBotExistencias
-        self.reset_ui("Control de Existencias", 
-                      "Ejecuta el bot de SAP para verificar negativos en 920 y documentos pendientes.\n\nModo Normal: Ejecuta análisis real.\nModo Simulacro: Fuerza alertas para pruebas.", 
-                      False)
-        
-        if not hasattr(self, "switch"):
-            self.switch_var = ctk.StringVar(value="normal")
-            self.switch = ctk.CTkSwitch(self.main_frame, text="Modo Simulacro", variable=self.switch_var, on_value="simulation", off_value="normal")
-        
-        self.switch.pack(pady=10)
+    def seleccionar(self, panel):
+        self.panel_actual = panel
+        self.reset_ui(panel.titulo, panel.info, panel.archivo)
+
+        if panel.modos:
+            if not hasattr(self, "switch"):
+                self.switch_var = ctk.StringVar(value="normal")
+                self.switch = ctk.CTkSwitch(self.main_frame, text="Modo Simulacro", variable=self.switch_var, on_value="simulation", off_value="normal")
+            self.switch.pack(pady=10, before=self.btn_run)
+
+        if panel.estado != "listo":
+            # Primer clic antes de que termine la precarga: se importa ya, sin congelar la ventana
+            self.btn_run.configure(state="disabled", text="Cargando bot...")
+            if panel.estado == "pendiente":
+                self._cargar([panel])
+
+    # --- CARGA DE BOTS ---
+    def _precargar(self):
+        self._cargar([p for p in PANELES if p.estado == "pendiente"])
+
+    def _cargar(self, paneles):
+        for panel in paneles:
+            panel.estado = "cargando"
+
+        def trabajo():
+            for panel in paneles:
+                self._cargas.put((panel, *cargar_bot(panel)))
+
+        threading.Thread(target=trabajo, daemon=True, name="carga-bots").start()
+
+    def _revisar_cargas(self):
+        """Aplica en el hilo de Tk los bots que terminaron de importarse."""
+        try:
+            while True:
+                panel, clase, error = self._cargas.get_nowait()
+                if error is not None:
+                    panel.estado, panel.error = "error", error
+                    print(f"❌ Error {panel.texto}: {error}")
+                    self.botones[panel.bot_id].configure(state="disabled", text=f"⚠️ {panel.texto}")
+                else:
+                    panel.estado, panel.clase_bot = "listo", clase
+                    print(f"✅ {panel.texto} cargado.")
+                if panel is self.panel_actual:
+                    if error is not None:
+                        self.btn_run.configure(state="disabled", text="EJECUTAR")
+                        self.log(f"❌ ERROR: El bot no se pudo cargar (Faltan librerías o error de código): {error}")
+                    else:
+                        self.btn_run.configure(state="normal", text="EJECUTAR")
+        except queue.Empty:
+            pass
+        self.after(100, self._revisar_cargas)
 
     # --- LOGICA ---
     def sel_archivo(self):
@@ -245,70 +311,177 @@ class App(ctk.CTk):
             self.entry_file.insert(0, f)
 
     def log(self, msg):
-        self.log_box.insert("end", str(msg) + "\n")
+        """Seguro desde cualquier hilo: la línea se dibuja en el próximo frame."""
+        self._lineas.put(str(msg))
+
+    def _renderizar(self):
+        """Vuelca en el hilo de Tk lo nuevo: un insert y un see por frame."""
+        lote = []
+        try:
+            # Con tope por frame: un bot que imprime sin parar no congela la ventana
+            for _ in range(LINEAS_POR_FRAME):
+                lote.append(self._lineas.get_nowait())
+        except queue.Empty:
+            pass
+        trabajo = self.jobs.obtener(self.trabajo_visible)
+        if trabajo is not None:
+            lineas, self._desde = trabajo.logs_desde(self._desde)
+            lote.extend(lineas)
+        self._volcar(lote)
+        self.after(FRAME_MS, self._renderizar)
+
+    def _volcar(self, lineas):
+        if not lineas:
+            return
+        # De un lote más largo que el log sólo se dibuja lo que va a quedar
+        self.log_box.insert("end", "\n".join(lineas[-MAX_LINEAS:]) + "\n")
+        total = int(self.log_box.index("end-1c").split(".")[0]) - 1
+        if total > MAX_LINEAS:
+            self.log_box.delete("1.0", f"{total - MAX_LINEAS + 1}.0")
         self.log_box.see("end")
 
-    # --- FUNCIONES DE EJECUCIÓN (AHORA DENTRO DE LA CLASE) ---
-    def run_migo_thread(self):
-        if self.bot_actual_class is None:
+    # --- COLA DE TRABAJOS ---
+    def encolar(self):
+        panel = self.panel_actual
+        if self.cerrando:
+            return
+        if panel is None or panel.clase_bot is None:
             self.log("❌ ERROR: El bot seleccionado no se cargó correctamente (Faltan librerías o error de código).")
             return
 
         ruta = None
-        arg_extra = None
+        params = {}
 
         # Validar archivo para MIGO, PALLET, VISION, LT01 y CONVERSIONES
-        if self.bot_actual_class in [SapMigoBotTurbo, SapBotPallet, BotVisionPizarra, SapBotTraspasoLT01, SapBotConversiones]:
+        if panel.archivo:
             ruta = self.entry_file.get()
             if not ruta:
                 self.log("❌ Error: Selecciona un archivo primero.")
                 return
-            
+
             # Guardar ruta exitosa
-            bot_name = getattr(self.bot_actual_class, "__name__", "")
-            self.save_settings(bot_name, ruta)
+            self.save_settings(panel.clase, ruta)
 
         # Input especial para Auditor
-        elif self.bot_actual_class == SapBotAuditor:
+        elif panel.pide_almacen:
             almacenes = ["SGVT", "CDNW", "SGTR", "TAVI", "SGSD", "AVAS", "SGBC", "SGVE", "SGEN", "SDIF"]
             dialog = ctk.CTkInputDialog(text=f"Almacenes: {', '.join(almacenes)}\n\nEscribe el Almacén:", title="Auditor MM")
-            arg_extra = dialog.get_input()
-            if not arg_extra:
+            almacen = dialog.get_input()
+            if not almacen:
                 self.log("Cancelado.")
                 return
-            arg_extra = arg_extra.upper().strip()
+            params["almacen"] = almacen.upper().strip()
 
-        self.btn_run.configure(state="disabled", text="Ejecutando...")
-        
-        # Obtener nombre del bot de forma segura
-        nombre_bot = getattr(self.bot_actual_class, "__name__", "Bot SAP")
-        self.log(f"--- Iniciando {nombre_bot}... ---")
-        
-        threading.Thread(target=self.execute, args=(ruta, arg_extra)).start()
+        # El switch se lee al encolar: el trabajo no toca widgets
+        elif panel.modos:
+            params["mode"] = self.switch_var.get() if hasattr(self, "switch_var") else "normal"
 
-    def execute(self, ruta, arg_extra):
         try:
-            bot = self.bot_actual_class()
-            
-            # Ejecución según tipo de bot
-            if self.bot_actual_class in [SapMigoBotTurbo, SapBotPallet, BotVisionPizarra, SapBotTraspasoLT01, SapBotConversiones]:
-                bot.run(ruta) 
-            elif self.bot_actual_class == SapBotAuditor:
-                bot.run(arg_extra)
-            elif self.bot_actual_class == SapBotExistencias:
-                # Obtener valor del switch si existe
-                mode = "normal"
-                if hasattr(self, "switch_var"):
-                    mode = self.switch_var.get()
-                bot.run(mode)
-            else: # Transporte
-                bot.run()
-                
-            self.log("✅ PROCESO FINALIZADO CON ÉXITO")
-        except Exception as e:
-            self.log(f"❌ ERROR: {e}")
-        finally:
-            self.btn_run.configure(state="normal", text="EJECUTAR")
+            trabajo = self.jobs.enviar(panel.bot_id, params, ruta)
+        except ColaLlena as e:
+            self.log(f"❌ {e}")
+            return
+        self.numeros[trabajo.id] = len(self.numeros) + 1
+        self._pintar_cola()
+
+    def _describir(self, trabajo):
+        panel = PANELES_POR_ID[trabajo.bot_id]
+        detalle = os.path.basename(trabajo.file_path or "") or trabajo.params.get("almacen") or ""
+        if trabajo.params.get("mode") == "simulation":
+            detalle = "simulacro"
+        texto = f"#{self.numeros[trabajo.id]}  {panel.texto}" + (f" ({detalle})" if detalle else "")
+        estado, color = ESTADOS[trabajo.status]
+        if trabajo.inicio:
+            texto += f"   {estado}  {_duracion((trabajo.fin or time.time()) - trabajo.inicio)}"
+        else:
+            texto += f"   {estado}"
+        return texto, color
+
+    def _refrescar_cola(self):
+        self._pintar_cola()
+        self.after(REFRESCO_MS, self._refrescar_cola)
+
+    def _pintar_cola(self):
+        """Una fila por trabajo (nuevas arriba); sólo se reconfigura lo que cambió."""
+        trabajos = list(self.jobs.trabajos.values())
+        for job_id in set(self.filas) - {t.id for t in trabajos}:
+            self.filas.pop(job_id)[0].destroy()  # podado por el historial del JobManager
+            self._arrancados.discard(job_id)
+
+        visible = self.jobs.obtener(self.trabajo_visible)
+        for trabajo in trabajos:
+            fila = self.filas.get(trabajo.id) or self._crear_fila(trabajo)
+            texto, color = self._describir(trabajo)
+            frame, boton, cancelar, anterior = fila
+            if texto != anterior:
+                boton.configure(text=texto, text_color=color)
+                if trabajo.terminado():
+                    cancelar.configure(state="disabled")
+                self.filas[trabajo.id] = (frame, boton, cancelar, texto)
+            # El log sigue al trabajo que arranca, salvo que se esté mirando otro en curso
+            if trabajo.status != "queued" and trabajo.id not in self._arrancados:
+                self._arrancados.add(trabajo.id)
+                if visible is None or (visible.terminado() and visible is not trabajo):
+                    self.mostrar(trabajo.id)
+                    visible = trabajo
+
+        cuenta = {}
+        for trabajo in trabajos:
+            cuenta[trabajo.status] = cuenta.get(trabajo.status, 0) + 1
+        terminados = sum(cuenta.get(e, 0) for e in ("success", "error", "cancelled"))
+        titulo = (f"Cola de trabajos: {cuenta.get('queued', 0)} en cola, "
+                  f"{cuenta.get('running', 0)} corriendo, {terminados} terminados")
+        if titulo != self._titulo_cola:
+            self.lista_cola.configure(label_text=titulo)
+            self._titulo_cola = titulo
+
+    def _crear_fila(self, trabajo):
+        frame = ctk.CTkFrame(self.lista_cola, fg_color="transparent")
+        filas = [f[0] for f in self.filas.values()]
+        if filas:
+            frame.pack(fill="x", pady=1, before=filas[-1])
+        else:
+            frame.pack(fill="x", pady=1)
+        boton = ctk.CTkButton(frame, text="", anchor="w", fg_color="transparent", height=24,
+                              command=lambda: self.mostrar(trabajo.id))
+        boton.pack(side="left", fill="x", expand=True)
+        cancelar = ctk.CTkButton(frame, text="✖", width=28, height=24, fg_color="gray",
+                                 command=lambda: self.jobs.cancelar(trabajo.id))
+        cancelar.pack(side="right")
+        fila = self.filas[trabajo.id] = (frame, boton, cancelar, None)
+        return fila
+
+    def mostrar(self, job_id):
+        """Muestra en el log la salida del trabajo (desde lo que aún guarda nexus_jobs)."""
+        trabajo = self.jobs.obtener(job_id)
+        if trabajo is None:
+            return
+        self.trabajo_visible, self._desde = job_id, 0
+        self.log_box.delete("1.0", "end")
+        self.lbl_log.configure(text=f"Log del trabajo #{self.numeros[job_id]}: {PANELES_POR_ID[trabajo.bot_id].texto}")
+
+    def cerrar(self):
+        pendientes = [t for t in self.jobs.trabajos.values() if not t.terminado()]
+        if pendientes and not messagebox.askyesno(
+                "Trabajos pendientes",
+                f"Hay {len(pendientes)} trabajo(s) en cola o corriendo.\n"
+                "¿Cerrar igual? Los que están en cola se cancelan; los que corren terminan antes de salir."):
+            return
+        # Sólo se descartan los que no empezaron: cortar un bot a mitad de una
+        # transacción SAP deja el documento a medias
+        for trabajo in pendientes:
+            if trabajo.status != "running":
+                self.jobs.cancelar(trabajo.id)
+        self.cerrando = True
+        self.protocol("WM_DELETE_WINDOW", lambda: None)
+        self.btn_run.configure(state="disabled", text="Cerrando...")
+        self._esperar_cierre()
+
+    def _esperar_cierre(self):
+        if any(not t.terminado() for t in self.jobs.trabajos.values()):
+            self.after(REFRESCO_MS, self._esperar_cierre)
+            return
+        self.destroy()
 
 def main():
     app = App()
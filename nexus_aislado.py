@@ -0,0 +1,328 @@
+"""
+Ejecución de un bot en un proceso hijo supervisado, con tiempo máximo.
+
+Un diálogo SAP colgado en Tx_MIGO3 o Bot_Transporte bloqueaba el hilo del
+worker para siempre y con él todo lo que esperaba ese carril. Los bots con
+`timeout_s` en nexus_bots corren aparte:
+
+    resultado = ejecutar_aislado('MIGO', [ruta], timeout_s=3600, cancel=token)
+
+- El hijo (python nexus_aislado.py, o el exe con --bot-aislado) queda vivo
+  entre órdenes, uno por tipo de bot: ya importó pandas/win32com y guarda la
+  instancia conectada a SAP en su propio pool (nexus_botpool), así una orden
+  no vuelve a pagar el arranque en frío. Se descarta tras `TTL_S` sin uso.
+- Recibe cada pedido por stdin y devuelve líneas JSON por stdout: los print()
+  del bot ({"log": ...}) y el final ({"fin": "ok" | "cancelado" | "error", ...}).
+  Los logs se reimprimen en el padre, dentro de la captura de la orden.
+- stdout es sólo del protocolo: el hijo lo duplica para sí y apunta el fd 1 a
+  stderr, así tracebacks, avisos de librerías y escrituras de extensiones C
+  van a un pipe aparte que un hilo del padre vacía (al log de la orden en
+  curso, o a la consola si el hijo está ocioso) sin romper el JSON.
+- Cancelación: el padre avisa al hijo por stdin y el bot se detiene en su
+  próximo verificar_cancelacion(). Si no lo hace en `gracia_s`, se mata.
+- Tiempo máximo: pasado `timeout_s` el proceso (y sus hijos) se matan y se
+  lanza TiempoAgotado. El carril queda libre para la orden siguiente, que
+  arranca un hijo nuevo. Lo mismo si el hijo se cae.
+
+Los objetos COM que el bot haya abierto en SAP/Excel siguen vivos en esos
+programas; tras matar un hijo el bot siguiente parte de una sesión nueva
+(/n...) como siempre.
+"""
+import atexit
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from nexus_capture import propagar
+from nexus_cancel import CancelToken, Cancelado, TiempoAgotado, con_token
+
+# Espera entre el aviso de cancelación y matar el proceso
+GRACIA_S = float(os.getenv("NEXUS_CANCEL_GRACIA_S", "30"))
+# Un hijo ocioso por más de esto se cierra (como las instancias de nexus_botpool)
+TTL_S = float(os.getenv("NEXUS_BOT_TTL_S", "900"))
+
+_libres = {}  # bot_type -> [_Hijo] ociosos
+_lock = threading.Lock()
+_estadisticas = {"creados": 0, "reutilizados": 0, "matados": 0, "expirados": 0}
+
+
+def _comando():
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, "--bot-aislado"]
+    return [sys.executable, "-u", os.path.abspath(__file__)]
+
+
+def _matar(proceso):
+    """Mata el proceso y sus hijos (Excel/diálogos lanzados por el bot)."""
+    if proceso.poll() is not None:
+        return
+    if sys.platform == 'win32':
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proceso.pid)], capture_output=True)
+    else:
+        proceso.kill()
+    try:
+        proceso.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+class _Hijo:
+    """Un proceso hijo de larga vida para un tipo de bot (corre un pedido a la vez)."""
+
+    def __init__(self, bot_type):
+        self.bot_type = bot_type
+        self.ocioso_desde = None
+        self.proceso = subprocess.Popen(
+            _comando(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+        )
+        self.eco = None  # print() de la orden en curso (propagar), o None
+        threading.Thread(target=self._leer_stderr, daemon=True, name=f"aislado-{bot_type}-stderr").start()
+
+    def _leer_stderr(self):
+        # Vive lo que vive el proceso: si el pipe se llena el hijo se bloquea
+        for linea in iter(self.proceso.stderr.readline, ""):
+            if linea.strip():
+                (self.eco or print)(linea.rstrip())
+
+    def vivo(self):
+        return self.proceso.poll() is None
+
+    def enviar(self, linea):
+        self.proceso.stdin.write(linea + "\n")
+        self.proceso.stdin.flush()
+
+
+def _tomar(bot_type):
+    """Un hijo ocioso y vivo de este bot, o uno nuevo."""
+    ahora = time.monotonic()
+    vencidos = []
+    with _lock:
+        for lista in _libres.values():
+            vencidos += [h for h in lista if ahora - h.ocioso_desde > TTL_S]
+            lista[:] = [h for h in lista if ahora - h.ocioso_desde <= TTL_S]
+        _estadisticas["expirados"] += len(vencidos)
+        hijo = None
+        lista = _libres.get(bot_type, [])
+        while lista and hijo is None:
+            candidato = lista.pop()
+            if candidato.vivo():
+                hijo = candidato
+                _estadisticas["reutilizados"] += 1
+        if hijo is None:
+            _estadisticas["creados"] += 1
+    for vencido in vencidos:
+        _cerrar(vencido)
+    return hijo or _Hijo(bot_type)
+
+
+def _devolver(hijo):
+    hijo.ocioso_desde = time.monotonic()
+    with _lock:
+        _libres.setdefault(hijo.bot_type, []).append(hijo)
+
+
+def _cerrar(hijo):
+    """Cierra un hijo ocioso: sin stdin termina solo; si no, se mata."""
+    try:
+        hijo.proceso.stdin.close()
+        hijo.proceso.wait(timeout=5)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        _matar(hijo.proceso)
+
+
+def cerrar_todos():
+    """Cierra los hijos ociosos (al salir del proceso)."""
+    with _lock:
+        hijos = [h for lista in _libres.values() for h in lista]
+        _libres.clear()
+    for hijo in hijos:
+        _cerrar(hijo)
+
+
+atexit.register(cerrar_todos)
+
+
+def estadisticas():
+    with _lock:
+        return {**_estadisticas, "ociosos": sum(len(l) for l in _libres.values())}
+
+
+def ejecutar_aislado(bot_type, args, timeout_s=None, cancel=None, gracia_s=None):
+    """Corre bot_type(...).run(*args) en un proceso hijo; devuelve lo que devuelva run()."""
+    from nexus_bots import obtener
+    bot_def = obtener(bot_type)
+    gracia_s = GRACIA_S if gracia_s is None else gracia_s
+    pedido = json.dumps({"modulo": bot_def.modulo, "clase": bot_def.clase, "args": args}, default=str)
+    hijo = _tomar(bot_type)
+    try:
+        hijo.enviar(pedido)
+    except OSError:
+        # Murió mientras esperaba ocioso: uno nuevo
+        _matar(hijo.proceso)
+        with _lock:
+            _estadisticas["creados"] += 1
+        hijo = _Hijo(bot_type)
+        hijo.enviar(pedido)
+    proceso = hijo.proceso
+    hijo.eco = propagar(print)
+
+    fin = {}
+    # propagar: los logs del hijo van a la captura de esta orden
+    lector = threading.Thread(target=propagar(_leer), args=(proceso, fin), daemon=True,
+                              name=f"aislado-{bot_type}")
+    lector.start()
+
+    limite = time.monotonic() + timeout_s if timeout_s else None
+    gracia = None
+    try:
+        while lector.is_alive():
+            lector.join(0.25)
+            ahora = time.monotonic()
+            if cancel is not None and cancel.cancelado and gracia is None:
+                _avisar_cancelacion(proceso)
+                gracia = ahora + gracia_s
+            if gracia is not None and ahora > gracia and lector.is_alive():
+                print(f"⛔ {bot_type} no se detuvo en {gracia_s}s tras la cancelación: proceso terminado")
+                raise Cancelado(cancel.motivo)
+            if limite is not None and ahora > limite and lector.is_alive():
+                print(f"⛔ {bot_type} superó su tiempo máximo ({timeout_s}s): proceso terminado")
+                raise TiempoAgotado(f"{bot_type} superó el tiempo máximo de {timeout_s}s")
+    finally:
+        hijo.eco = None
+        if fin and hijo.vivo():
+            _devolver(hijo)  # terminó el pedido (bien o mal) y sigue sano: queda caliente
+        else:
+            with _lock:
+                _estadisticas["matados"] += 1
+            _matar(proceso)
+            lector.join(5)
+
+    if fin.get("fin") == "ok":
+        return fin.get("resultado")
+    if fin.get("fin") == "cancelado":
+        raise Cancelado(cancel.motivo if cancel is not None and cancel.cancelado else fin.get("motivo"))
+    if fin.get("fin") == "error":
+        raise Exception(fin.get("error"))
+    raise Exception(f"El proceso de {bot_type} terminó sin resultado (código {proceso.returncode})")
+
+
+def _avisar_cancelacion(proceso):
+    try:
+        proceso.stdin.write("cancelar\n")
+        proceso.stdin.flush()
+    except (OSError, ValueError):
+        pass
+
+
+def _leer(proceso, fin):
+    """Reimprime los logs de un pedido hasta su mensaje final (o hasta que el hijo muera)."""
+    for linea in iter(proceso.stdout.readline, ""):
+        try:
+            mensaje = json.loads(linea)
+        except ValueError:
+            mensaje = None
+        if not isinstance(mensaje, dict):
+            # No debería pasar (stderr va por su propio pipe): mostrarla y seguir
+            if linea.strip():
+                print(linea.rstrip())
+        elif "log" in mensaje:
+            print(mensaje["log"])
+        elif "fin" in mensaje:
+            fin.update(mensaje)
+            return
+
+
+# --- Lado del hijo ---
+class _SalidaJson:
+    """sys.stdout del hijo: cada línea impresa por el bot sale como {"log": ...}."""
+
+    def __init__(self, emitir):
+        self.emitir = emitir
+        self._parcial = ""
+
+    def write(self, message):
+        *lineas, self._parcial = (self._parcial + message).split("\n")
+        for linea in lineas:
+            if linea.strip():
+                self.emitir({"log": linea.rstrip()})
+        return len(message)
+
+    def flush(self):
+        pass
+
+
+def hijo():
+    """Punto de entrada del proceso hijo: corre los pedidos que lleguen por stdin hasta que se cierre."""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Bots'))
+    # El protocolo usa una copia del stdout original; el fd 1 pasa a stderr para
+    # que nada más (extensiones C, subprocesos heredados) escriba en él
+    salida = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    lock = threading.Lock()
+
+    def emitir(mensaje):
+        with lock:
+            salida.write(json.dumps(mensaje, default=str) + "\n")
+            salida.flush()
+
+    pedidos = queue.Queue()
+    actual = {"token": None}
+
+    def escuchar():
+        # El padre sólo cancela mientras corre su pedido: "cancelar" siempre
+        # llega antes que el pedido siguiente
+        for linea in sys.stdin:
+            linea = linea.strip()
+            if linea == "cancelar":
+                token = actual["token"]
+                if token is not None:
+                    token.cancelar("Cancelación solicitada")
+            elif linea:
+                pedidos.put(json.loads(linea))
+        pedidos.put(None)  # stdin cerrado: el padre ya no lo necesita (o murió)
+
+    threading.Thread(target=escuchar, daemon=True).start()
+    sys.stdout = _SalidaJson(emitir)
+
+    import importlib
+    from nexus_botpool import BotPool
+    # La expiración la decide el padre (cierra el hijo ocioso)
+    pool = BotPool(ttl_s=float("inf"))
+    while True:
+        pedido = pedidos.get()
+        if pedido is None:
+            break
+        token = actual["token"] = CancelToken()
+        try:
+            clase = getattr(importlib.import_module(pedido["modulo"]), pedido["clase"])
+            with con_token(token):
+                token.verificar()
+                with pool.prestar(pedido["clase"], clase) as bot:
+                    resultado = bot.run(*pedido["args"])
+            emitir({"fin": "ok", "resultado": resultado})
+        except Cancelado as e:
+            emitir({"fin": "cancelado", "motivo": str(e)})
+        except Exception as e:
+            import traceback
+            for linea in traceback.format_exc().splitlines():
+                emitir({"log": linea})
+            emitir({"fin": "error", "error": str(e)})
+        finally:
+            actual["token"] = None
+    pool.vaciar()
+
+
+if __name__ == "__main__":
+    hijo()
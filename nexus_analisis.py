@@ -0,0 +1,63 @@
+"""
+Análisis de la bitácora de operaciones con pandas.
+
+Vive aparte de nexus_logger para que registrar un evento (log_event) no
+cargue pandas. Los datos salen de nexus_archive.query_events, así que sólo
+se leen las particiones del periodo pedido:
+
+    from nexus_analisis import cargar, resumen_por_bot
+    df = cargar(since="2026-10-01", until="2026-10-31")
+    print(resumen_por_bot(df))
+
+    python nexus_analisis.py --dias 30
+"""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from nexus_archive import COLUMNAS, query_events
+
+
+def cargar(bot=None, since=None, until=None, estado=None, log_dir=None):
+    """DataFrame de eventos con Timestamp como fecha, ordenado por tiempo."""
+    df = pd.DataFrame(list(query_events(bot, since, until, estado, log_dir=log_dir)), columns=COLUMNAS)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"], errors="coerce")
+    return df.sort_values("Timestamp", ignore_index=True)
+
+
+def resumen_por_bot(df):
+    """Eventos por bot y estado, con el porcentaje de ERROR."""
+    if df.empty:
+        return pd.DataFrame()
+    resumen = df.pivot_table(index="Bot", columns="Estado", values="Timestamp", aggfunc="count", fill_value=0)
+    resumen["Total"] = resumen.sum(axis=1)
+    errores = resumen["ERROR"] if "ERROR" in resumen else 0
+    resumen["% Error"] = (100 * errores / resumen["Total"]).round(1)
+    return resumen.sort_values("Total", ascending=False)
+
+
+def actividad_diaria(df):
+    """Eventos por día (filas) y bot (columnas)."""
+    if df.empty:
+        return pd.DataFrame()
+    return df.groupby([df["Timestamp"].dt.date, "Bot"]).size().unstack(fill_value=0)
+
+
+def errores_recientes(dias=7, bot=None, log_dir=None):
+    """Los eventos ERROR de los últimos `dias` días, del más nuevo al más viejo."""
+    df = cargar(bot, since=date.today() - timedelta(days=dias), estado="ERROR", log_dir=log_dir)
+    return df.sort_values("Timestamp", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Resumen de la bitácora de operaciones")
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--bot")
+    args = parser.parse_args()
+
+    datos = cargar(args.bot, since=date.today() - timedelta(days=args.dias))
+    print(f"📊 {len(datos)} eventos en los últimos {args.dias} días\n")
+    print(resumen_por_bot(datos).to_string())
+    print("\n🔴 Últimos errores:")
+    print(errores_recientes(args.dias, args.bot).head(20).to_string())
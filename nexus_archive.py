@@ -0,0 +1,292 @@
+"""
+Archivo consultable de la bitácora de operaciones (nexus_logger).
+
+bitacora_operaciones.csv crecía sin límite y cualquier análisis cargaba el
+CSV entero en pandas. Los CSV de días cerrados (bitacora_operaciones_AAAA-MM-DD.csv,
+que deja la rotación diaria de nexus_logger) se compactan en particiones
+columnares por fecha y bot:
+
+    Logs/Archivo/fecha=2026-10-01/bot=MIGO.json.gz   {"Timestamp": [...], "Accion": [...], ...}
+    Logs/Archivo/indice.json                          filas, ts_min/ts_max y estados por partición
+
+query_events() lee sólo el índice y las particiones que pueden tener filas
+pedidas, y devuelve un generador (no arma la tabla completa):
+
+    from nexus_archive import query_events
+    for evento in query_events(bot="MIGO", since="2026-10-01", until="2026-10-08", estado="ERROR"):
+        ...
+
+    python nexus_archive.py compactar
+    python nexus_archive.py consultar --bot MIGO --desde 2026-10-01 --estado ERROR
+
+La compactación corre sola cuando nexus_logger rota el día; es idempotente
+(el índice recuerda los CSV ya compactados) y borra cada CSV compactado.
+"""
+import bisect
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from nexus_bloqueo import BloqueoArchivo
+
+COLUMNAS = ["Timestamp", "Bot", "Usuario", "Accion", "Detalle", "Estado"]
+# En la partición no se repite el bot (va en la ruta)
+COLUMNAS_PARTICION = ["Timestamp", "Usuario", "Accion", "Detalle", "Estado"]
+CARPETA = "Archivo"
+INDICE = "indice.json"
+
+_cache_indices = {}
+_lock = threading.Lock()
+
+
+def _dir_logs(log_dir):
+    if log_dir:
+        return log_dir
+    from nexus_logger import nexus_logger
+    return nexus_logger.preparar().log_dir
+
+
+def _dir_archivo(log_dir):
+    return os.path.join(_dir_logs(log_dir), CARPETA)
+
+
+def _nombre_bot(bot):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", bot or "SIN_BOT")
+
+
+def _iso(valor, fin=False):
+    """datetime/date/str -> texto ISO comparable con los Timestamp del CSV.
+    Un `until` que es sólo fecha incluye ese día completo."""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, date):
+        return (valor + timedelta(days=1) if fin else valor).isoformat()
+    texto = str(valor).strip()
+    if fin and len(texto) == 10:
+        return (date.fromisoformat(texto) + timedelta(days=1)).isoformat()
+    return texto
+
+
+# --- Índice ---
+def _leer_indice(directorio, usar_cache=True):
+    """El índice (en memoria mientras no cambie en disco). Sin caché para modificarlo."""
+    ruta = os.path.join(directorio, INDICE)
+    try:
+        marca = os.path.getmtime(ruta)
+    except OSError:
+        return {"particiones": {}, "fuentes": []}
+    with _lock:
+        guardado = _cache_indices.get(ruta)
+        if usar_cache and guardado and guardado[0] == marca:
+            return guardado[1]
+    with open(ruta, encoding="utf-8") as f:
+        indice = json.load(f)
+    if usar_cache:
+        with _lock:
+            _cache_indices[ruta] = (marca, indice)
+    return indice
+
+
+def _escribir_atomico(ruta, datos, comprimir=False):
+    tmp = ruta + ".tmp"
+    abrir = gzip.open if comprimir else open
+    with abrir(tmp, "wt", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, ruta)
+
+
+def _leer_particion(ruta):
+    with gzip.open(ruta, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Compactación ---
+def compactar(log_dir=None, base=None):
+    """
+    Compacta los CSV de días cerrados de la bitácora en el archivo.
+    Devuelve {"archivos": n, "filas": n, "particiones": n}.
+    """
+    log_dir = _dir_logs(log_dir)
+    from nexus_logger import DEFAULT_LOG_FILE
+    base = os.path.splitext(base or DEFAULT_LOG_FILE)[0]
+    directorio = os.path.join(log_dir, CARPETA)
+    os.makedirs(directorio, exist_ok=True)
+    resumen = {"archivos": 0, "filas": 0, "particiones": 0}
+
+    # Un solo compactador a la vez por carpeta (varios procesos pueden rotar);
+    # el .lock en %TEMP%, como el de nexus_logger
+    marca = hashlib.sha1(os.path.abspath(directorio).lower().encode("utf-8")).hexdigest()[:12]
+    with BloqueoArchivo(os.path.join(tempfile.gettempdir(), f"nexus_archivo_{marca}.lock")):
+        indice = _leer_indice(directorio, usar_cache=False)
+        fuentes = set(indice["fuentes"])
+        for ruta_csv in sorted(glob.glob(os.path.join(log_dir, f"{base}_????-??-??*.csv"))):
+            nombre = os.path.basename(ruta_csv)
+            if nombre not in fuentes:
+                grupos = _agrupar(ruta_csv)
+                for (dia, bot), filas in grupos.items():
+                    _agregar_particion(directorio, indice, dia, bot, filas, nombre)
+                    resumen["filas"] += len(filas)
+                resumen["particiones"] += len(grupos)
+                indice["fuentes"].append(nombre)
+                # El índice se guarda antes de borrar el CSV: si algo falla en
+                # el medio, el CSV queda marcado y no se compacta dos veces
+                _escribir_atomico(os.path.join(directorio, INDICE), indice)
+                resumen["archivos"] += 1
+            try:
+                os.remove(ruta_csv)
+            except OSError:
+                pass # OneDrive lo tiene tomado: se borra en la próxima compactación
+    return resumen
+
+
+def _agrupar(ruta_csv):
+    grupos = {}
+    with open(ruta_csv, newline="", encoding="utf-8", errors="replace") as f:
+        for fila in csv.reader(f):
+            if len(fila) < 6 or fila[:6] == COLUMNAS:
+                continue
+            timestamp, bot, usuario, accion, detalle, estado = fila[:6]
+            grupos.setdefault((timestamp[:10], bot), []).append((timestamp, usuario, accion, detalle, estado))
+    return grupos
+
+
+def _agregar_particion(directorio, indice, dia, bot, filas, fuente):
+    relativa = f"fecha={dia}/bot={_nombre_bot(bot)}.json.gz"
+    ruta = os.path.join(directorio, relativa)
+    fuentes = [fuente]
+    if relativa in indice["particiones"] and os.path.exists(ruta):
+        anterior = _leer_particion(ruta)
+        if fuente in anterior.get("_fuentes", []):
+            filas = []  # ya entró antes de un corte (partición escrita, índice no)
+        filas = list(zip(*(anterior[c] for c in COLUMNAS_PARTICION))) + filas
+        fuentes = anterior.get("_fuentes", []) + [f for f in fuentes if f not in anterior.get("_fuentes", [])]
+    filas.sort(key=lambda fila: fila[0])
+    columnas = {c: [fila[i] for fila in filas] for i, c in enumerate(COLUMNAS_PARTICION)}
+    columnas["_fuentes"] = fuentes  # CSV que ya aportaron filas a esta partición
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    _escribir_atomico(ruta, columnas, comprimir=True)
+    indice["particiones"][relativa] = {
+        "fecha": dia,
+        "bot": bot,
+        "filas": len(filas),
+        "ts_min": columnas["Timestamp"][0],
+        "ts_max": columnas["Timestamp"][-1],
+        "estados": sorted(set(columnas["Estado"])),
+        "bytes": os.path.getsize(ruta),
+    }
+
+
+# --- Consulta ---
+def query_events(bot=None, since=None, until=None, estado=None, log_dir=None, incluir_hoy=True):
+    """
+    Eventos {"Timestamp", "Bot", "Usuario", "Accion", "Detalle", "Estado"} en
+    orden de tiempo dentro de cada partición. since incluido, until excluido
+    (una fecha sola como until incluye ese día). incluir_hoy suma el CSV vivo.
+    """
+    log_dir = _dir_logs(log_dir)
+    directorio = os.path.join(log_dir, CARPETA)
+    desde, hasta = _iso(since), _iso(until, fin=True)
+    bots = {bot} if isinstance(bot, str) else set(bot) if bot else None
+    estados = {estado} if isinstance(estado, str) else set(estado) if estado else None
+
+    candidatas = []
+    for relativa, meta in _leer_indice(directorio)["particiones"].items():
+        if bots is not None and meta["bot"] not in bots:
+            continue
+        if desde is not None and meta["ts_max"] < desde:
+            continue
+        if hasta is not None and meta["ts_min"] >= hasta:
+            continue
+        if estados is not None and not estados.intersection(meta["estados"]):
+            continue
+        candidatas.append((meta["ts_min"], relativa, meta["bot"]))
+
+    for _, relativa, nombre_bot in sorted(candidatas):
+        try:
+            columnas = _leer_particion(os.path.join(directorio, relativa))
+        except (OSError, ValueError):
+            continue
+        tiempos = columnas["Timestamp"]
+        inicio = bisect.bisect_left(tiempos, desde) if desde is not None else 0
+        fin = bisect.bisect_left(tiempos, hasta) if hasta is not None else len(tiempos)
+        for i in range(inicio, fin):
+            if estados is not None and columnas["Estado"][i] not in estados:
+                continue
+            evento = {c: columnas[c][i] for c in COLUMNAS_PARTICION}
+            evento["Bot"] = nombre_bot
+            yield evento
+
+    if incluir_hoy:
+        yield from _eventos_vivos(log_dir, bots, desde, hasta, estados)
+
+
+def _eventos_vivos(log_dir, bots, desde, hasta, estados):
+    """Lo que todavía está en CSV (el día en curso y lo no compactado)."""
+    from nexus_logger import DEFAULT_LOG_FILE
+    base = os.path.splitext(DEFAULT_LOG_FILE)[0]
+    fuentes = set(_leer_indice(os.path.join(log_dir, CARPETA))["fuentes"])
+    rutas = [r for r in sorted(glob.glob(os.path.join(log_dir, f"{base}_????-??-??*.csv")))
+             if os.path.basename(r) not in fuentes]
+    rutas.append(os.path.join(log_dir, DEFAULT_LOG_FILE))
+    for ruta in rutas:
+        try:
+            f = open(ruta, newline="", encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with f:
+            for fila in csv.reader(f):
+                if len(fila) < 6 or fila[:6] == COLUMNAS:
+                    continue
+                evento = dict(zip(COLUMNAS, fila))
+                if bots is not None and evento["Bot"] not in bots:
+                    continue
+                if desde is not None and evento["Timestamp"] < desde:
+                    continue
+                if hasta is not None and evento["Timestamp"] >= hasta:
+                    continue
+                if estados is not None and evento["Estado"] not in estados:
+                    continue
+                yield evento
+
+
+def estadisticas(log_dir=None):
+    indice = _leer_indice(_dir_archivo(log_dir))
+    particiones = indice["particiones"].values()
+    return {
+        "particiones": len(indice["particiones"]),
+        "filas": sum(p["filas"] for p in particiones),
+        "bytes": sum(p["bytes"] for p in particiones),
+        "csv_compactados": len(indice["fuentes"]),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Archivo de la bitácora de operaciones")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("compactar")
+    consulta = sub.add_parser("consultar")
+    consulta.add_argument("--bot")
+    consulta.add_argument("--desde")
+    consulta.add_argument("--hasta")
+    consulta.add_argument("--estado")
+    parser.add_argument("--logs", help="Carpeta de la bitácora (por defecto la de nexus_logger)")
+    args = parser.parse_args()
+
+    if args.comando == "compactar":
+        print(f"🗜️ {compactar(args.logs)}")
+        print(f"📦 {estadisticas(args.logs)}")
+    else:
+        total = 0
+        for evento in query_events(args.bot, args.desde, args.hasta, args.estado, log_dir=args.logs):
+            print(",".join(evento[c] for c in COLUMNAS))
+            total += 1
+        print(f"-- {total} eventos")
@@ -0,0 +1,47 @@
+"""
+Bloqueo exclusivo entre procesos sobre un archivo .lock (msvcrt / fcntl).
+
+Lo comparten la bitácora (nexus_logger), su compactador (nexus_archive) y la
+bandeja de salida (nexus_outbox). El archivo se crea vacío si no existe y el
+SO libera el bloqueo si el proceso muere.
+
+    with BloqueoArchivo(ruta + ".lock"):
+        ...  # un solo proceso a la vez
+"""
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos sobre `ruta` (se crea vacío si no existe)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.ruta, "a+b")
+        if msvcrt is not None:
+            self._f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)  # reintenta 10 s por sí solo
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if msvcrt is not None:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._f.close()
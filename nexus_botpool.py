@@ -0,0 +1,151 @@
+"""
+Pool de instancias de bot "calientes" para worker_sap y nexus_server.
+
+Crear un bot por orden repetía CoInitialize, el descubrimiento de SAP GUI
+(GetScriptingEngine -> Children), el Dispatch de Outlook y la carga de
+plantillas/cachés. El pool guarda las instancias ya conectadas por tipo de bot
+y las reutiliza (igual que worker_zonales reutiliza su BotConsolidacionZonales
+entre ciclos):
+
+    with BOT_POOL.prestar('MIGO', SapMigoBotTurbo) as bot:
+        bot.run(ruta)
+
+- Antes de reutilizar una instancia se valida con una sonda barata (sano()).
+  Si falla se descarta y se crea otra.
+- Las instancias sin uso por más de `ttl_s` se descartan.
+- Si el bot lanza una excepción la instancia no vuelve al pool: su estado
+  (sesión SAP en una pantalla intermedia, etc.) es desconocido.
+
+Los objetos COM pertenecen al hilo (apartment) que los creó, así que las
+instancias se guardan por (tipo de bot, hilo). El scheduler fija cada carril a
+sus propios hilos (y prefiere el que ya corrió la misma etiqueta), así que un
+bot SAP vuelve siempre al hilo donde está su instancia. La expiración por TTL
+se revisa en cada prestar() del mismo hilo y, sin tráfico, con el barrido
+periódico que worker_sap.preparar() registra en el scheduler
+(ResourceScheduler.periodico), que corre evictar_inactivos() en cada hilo.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+def sano(bot):
+    """Sonda barata: el bot puede definir health_check(); si no, se prueban sus enlaces COM."""
+    try:
+        if hasattr(bot, "health_check"):
+            return bool(bot.health_check())
+        if getattr(bot, "session", None) is not None:
+            bot.session.findById("wnd[0]")
+        if getattr(bot, "namespace", None) is not None:
+            bot.namespace.GetDefaultFolder(6)
+        return True
+    except Exception:
+        return False
+
+
+def _cerrar(bot):
+    for nombre in ("close", "cerrar"):
+        metodo = getattr(bot, nombre, None)
+        if callable(metodo):
+            try:
+                metodo()
+            except Exception:
+                pass
+            return
+
+
+class BotPool:
+    def __init__(self, ttl_s=900, max_por_tipo=1):
+        self.ttl_s = ttl_s
+        self.max_por_tipo = max_por_tipo
+        self.libres = {}  # (bot_type, hilo) -> [(bot, ultimo_uso)]
+        self.lock = threading.Lock()
+
+        self.creadas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+        self.expiradas = 0
+
+    @contextmanager
+    def prestar(self, bot_type, fabrica):
+        clave = (bot_type, threading.get_ident())
+        bot = self._tomar(clave)
+        if bot is None:
+            bot = fabrica()
+            with self.lock:
+                self.creadas += 1
+        try:
+            yield bot
+        except BaseException:
+            with self.lock:
+                self.descartadas += 1
+            _cerrar(bot)
+            raise
+        else:
+            self._devolver(clave, bot)
+
+    def evictar_inactivos(self, todos_los_hilos=False):
+        """
+        Descarta las instancias ociosas por más de ttl_s. Por defecto sólo las
+        del hilo actual, para que la liberación COM ocurra en su apartment.
+        """
+        limite = time.time() - self.ttl_s
+        hilo = threading.get_ident()
+        vencidas = []
+        with self.lock:
+            for clave, lista in list(self.libres.items()):
+                if not todos_los_hilos and clave[1] != hilo:
+                    continue
+                vigentes = [(b, t) for b, t in lista if t >= limite]
+                vencidas += [b for b, t in lista if t < limite]
+                if vigentes:
+                    self.libres[clave] = vigentes
+                else:
+                    del self.libres[clave]
+            self.expiradas += len(vencidas)
+        for bot in vencidas:
+            _cerrar(bot)
+        return len(vencidas)
+
+    def vaciar(self):
+        with self.lock:
+            todas = [b for lista in self.libres.values() for b, _ in lista]
+            self.libres.clear()
+        for bot in todas:
+            _cerrar(bot)
+
+    def estadisticas(self):
+        with self.lock:
+            return {
+                "libres": sum(len(l) for l in self.libres.values()),
+                "creadas": self.creadas,
+                "reutilizadas": self.reutilizadas,
+                "descartadas": self.descartadas,
+                "expiradas": self.expiradas,
+            }
+
+    # --- internos ---
+    def _tomar(self, clave):
+        self.evictar_inactivos()
+        while True:
+            with self.lock:
+                lista = self.libres.get(clave)
+                if not lista:
+                    return None
+                bot, _ = lista.pop()
+            if sano(bot):
+                with self.lock:
+                    self.reutilizadas += 1
+                return bot
+            with self.lock:
+                self.descartadas += 1
+            _cerrar(bot)
+
+    def _devolver(self, clave, bot):
+        with self.lock:
+            lista = self.libres.setdefault(clave, [])
+            if len(lista) < self.max_por_tipo:
+                lista.append((bot, time.time()))
+                return
+            self.descartadas += 1
+        _cerrar(bot)
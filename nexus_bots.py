@@ -0,0 +1,208 @@
+"""
+Registro declarativo de bots.
+
+Cada bot se describe una sola vez: módulo y clase, cómo se llama su run(),
+qué parámetros acepta y qué recursos ocupa. El módulo se importa recién la
+primera vez que llega una orden de ese tipo, así worker_sap arranca sin cargar
+pandas, win32com, PIL ni google.generativeai si nunca los va a usar.
+
+    clase = cargar_clase('AUDITOR')
+    args = BOTS['AUDITOR'].argumentos(ruta_archivo, params)
+
+build_portable.py toma de aquí los --hidden-import de los bots (PyInstaller
+no ve los imports diferidos).
+
+Los bots `coalescible` (sin archivo de entrada y cuyo resultado sólo depende
+de sus parámetros, como ZONALES) permiten que worker_sap junte varias órdenes
+pendientes idénticas en una sola ejecución: ver clave_coalescencia().
+
+Los bots con `cache` (reportes idempotentes como AUDITOR) guardan su resultado
+en nexus_resultados y una orden igual dentro de la ventana de frescura lo
+recibe sin volver a correr: ver clave_resultado().
+"""
+import importlib
+import json
+from datetime import date, datetime
+
+from nexus_scheduler import SAP, OUTLOOK, EXCEL, CPU, CAPACIDADES
+
+
+class Param:
+    def __init__(self, nombre, defecto=None):
+        self.nombre = nombre
+        self.defecto = defecto
+
+    def valor(self, ruta_archivo, params):
+        return params.get(self.nombre, self.defecto)
+
+
+class _Archivo(Param):
+    def valor(self, ruta_archivo, params):
+        return ruta_archivo
+
+
+# El archivo de entrada de la orden (ruta local ya descargada)
+ARCHIVO = _Archivo("ruta_archivo")
+
+
+class Cache:
+    def __init__(self, fresco_s, revalidar_s=0, si=None):
+        """
+        fresco_s: hasta esa edad el resultado guardado se entrega sin correr el bot.
+        revalidar_s: pasada la frescura y durante revalidar_s más, se entrega el
+            guardado y se refresca en segundo plano (stale-while-revalidate).
+        si(params): la orden es cacheable (p. ej. sólo rangos de fechas pasados).
+        """
+        self.fresco_s = fresco_s
+        self.revalidar_s = revalidar_s
+        self.si = si
+
+
+class Bot:
+    def __init__(self, modulo, clase, args=(), recursos=(), recursos_si=None, devuelve_resultado=False,
+                 coalescible=False, prioridad=2, timeout_s=None, cache=None):
+        """
+        args: lo que recibe run(), en orden (ARCHIVO o Param).
+        recursos_si: {parametro: recursos extra si el parámetro viene en True}.
+        devuelve_resultado: el valor de run() se guarda como result_payload.
+        coalescible: órdenes pendientes idénticas pueden compartir una ejecución.
+        prioridad: banda por defecto (0 urgente ... 3 baja), ver nexus_priority.
+        timeout_s: tiempo máximo; si viene, el bot corre en un proceso
+        supervisado (nexus_aislado) que se mata al vencer.
+        cache: Cache para reutilizar resultados recientes (opt-in).
+        """
+        self.modulo = modulo
+        self.clase = clase
+        self.args = tuple(args)
+        self.recursos = frozenset(recursos)
+        self.recursos_si = dict(recursos_si or {})
+        self.devuelve_resultado = devuelve_resultado
+        self.coalescible = coalescible
+        self.prioridad = prioridad
+        self.timeout_s = timeout_s
+        self.cache = cache
+
+    def argumentos(self, ruta_archivo, params):
+        return [a.valor(ruta_archivo, params or {}) for a in self.args]
+
+    def parametros(self, params=None):
+        """{nombre: valor} de los parámetros declarados (defectos si no hay params)."""
+        return {a.nombre: a.valor(None, params or {}) for a in self.args if a is not ARCHIVO}
+
+    def usa_archivo(self):
+        return ARCHIVO in self.args
+
+
+# Prioridades: consultas cortas (AUDITOR, VISION) antes que cargas y
+# extracciones masivas. Las cargas y extracciones largas en SAP (las que se
+# quedan colgadas en un diálogo) tienen tiempo máximo.
+HORA = 3600
+
+
+def _rango_pasado(params):
+    """TRANSPORTE: el rango de fechas (dd.mm.aaaa-dd.mm.aaaa) terminó antes de hoy y no pide correo."""
+    fechas = str(params.get('fechas') or '').strip()
+    if not fechas or params.get('sendEmail'):
+        return False
+    try:
+        fin = datetime.strptime(fechas.split('-')[-1].strip(), "%d.%m.%Y").date()
+    except ValueError:
+        return False
+    return fin < date.today()
+
+
+BOTS = {
+    'MIGO': Bot('Tx_MIGO3', 'SapMigoBotTurbo', [ARCHIVO], {SAP, EXCEL}, timeout_s=HORA),
+    'PALLET': Bot('Bot_Pallet', 'SapBotPallet', [ARCHIVO], {SAP, EXCEL}, timeout_s=HORA),
+    'TRANSPORTE': Bot('Bot_Transporte', 'SapBotTransporte', [Param('fechas'), Param('sendEmail', False)],
+                      {SAP}, recursos_si={'sendEmail': {OUTLOOK}}, devuelve_resultado=True, prioridad=3,
+                      timeout_s=2 * HORA, cache=Cache(6 * HORA, si=_rango_pasado)),
+    'AUDITOR': Bot('Bot_Auditor', 'SapBotAuditor', [Param('almacen', 'SGVT')], {SAP}, devuelve_resultado=True,
+                   prioridad=1, cache=Cache(600, revalidar_s=1200)),
+    'LT01': Bot('Bot_Traspaso_LT01', 'SapBotTraspasoLT01', [ARCHIVO], {SAP, EXCEL}, timeout_s=HORA),
+    'UMV': Bot('Bot_Conversiones_UMV', 'SapBotConversiones', [ARCHIVO], {SAP}, timeout_s=HORA),
+    'CONCILIACION_EMAIL': Bot('Bot_Conciliacion_Email', 'SapBotConciliacionEmail', [], {SAP, OUTLOOK, EXCEL},
+                              coalescible=True),
+    'ZONALES': Bot('Bot_Consolidacion_Zonales', 'BotConsolidacionZonales', [], {OUTLOOK, EXCEL}, coalescible=True,
+                   prioridad=3),
+    'ANALISIS_ZONALES': Bot('Bot_Analisis_Zonales', 'BotAnalisisZonales', [], {CPU}, coalescible=True, prioridad=3),
+    'VISION': Bot('Bot_Vision', 'BotVisionPizarra', [ARCHIVO], {CPU}, prioridad=1),
+    # Los del panel de reportes (logistic_suite)
+    'REPORTE_CAMBIADOS': Bot('Bot_Reporte_Cambiados', 'BotReporteCambiados', [], {OUTLOOK, EXCEL}, prioridad=3),
+    'EXISTENCIAS': Bot('Bot_SAP_Existencias', 'SapBotExistencias', [Param('mode', 'normal')], {SAP, OUTLOOK}),
+}
+
+_clases = {}
+
+
+class BotDesconocido(Exception):
+    pass
+
+
+def obtener(bot_id):
+    bot = BOTS.get(bot_id)
+    if bot is None:
+        raise BotDesconocido(f"Tipo de bot desconocido: {bot_id}")
+    return bot
+
+
+def cargar_clase(bot_id):
+    """Importa el módulo del bot la primera vez y devuelve su clase."""
+    clase = _clases.get(bot_id)
+    if clase is None:
+        # importlib ya serializa la importación concurrente del mismo módulo
+        bot = obtener(bot_id)
+        clase = _clases[bot_id] = getattr(importlib.import_module(bot.modulo), bot.clase)
+    return clase
+
+
+def recursos_bot(bot_type, params=None):
+    """Recursos que necesita una orden. Desconocidos (y SYSTEM_RESTART): todo, lo más seguro."""
+    bot = BOTS.get(bot_type)
+    if bot is None:
+        return frozenset(CAPACIDADES)
+    recursos = set(bot.recursos)
+    for parametro, extra in bot.recursos_si.items():
+        if (params or {}).get(parametro):
+            recursos |= extra
+    return frozenset(recursos)
+
+
+def modulos_ocultos():
+    """Módulos de bots para --hidden-import de PyInstaller."""
+    return sorted({bot.modulo for bot in BOTS.values()})
+
+
+def _normalizar(valor):
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in valor.items() if v not in (None, "", [], {})}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+def clave_coalescencia(bot_type, params=None, ruta_archivo=None):
+    """
+    Clave que comparten las órdenes que pueden correr una sola vez, o None si
+    el bot no es coalescible o la orden trae archivo de entrada.
+    """
+    bot = BOTS.get(bot_type)
+    if bot is None or not bot.coalescible or ruta_archivo:
+        return None
+    return bot_type, json.dumps(_normalizar(params or {}), sort_keys=True, default=str)
+
+
+def clave_resultado(bot_type, params=None, ruta_archivo=None):
+    """
+    Clave de la caché de resultados: bot + sus parámetros declarados (con
+    valores por defecto, normalizados). None si el bot no usa caché o la
+    orden no es cacheable (archivo de entrada, Cache.si falso).
+    """
+    bot = BOTS.get(bot_type)
+    if bot is None or bot.cache is None or ruta_archivo or bot.usa_archivo():
+        return None
+    if bot.cache.si is not None and not bot.cache.si(params or {}):
+        return None
+    return f"{bot_type}:" + json.dumps(_normalizar(bot.parametros(params)), sort_keys=True, default=str)
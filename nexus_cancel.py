@@ -0,0 +1,80 @@
+"""
+Cancelación cooperativa de trabajos.
+
+Cada orden/trabajo lleva un CancelToken. Quien quiere detenerlo llama
+token.cancelar(motivo); el bot lo nota en el próximo punto de control:
+
+    from nexus_cancel import verificar_cancelacion
+    for bloque in bloques:
+        verificar_cancelacion()   # lanza Cancelado si se pidió cancelar
+        ...
+
+El token activo vive en una variable de contexto (igual que el destino de
+nexus_capture), así que los bots no reciben nada nuevo en run(): fuera de un
+trabajo verificar_cancelacion() no hace nada.
+
+Si el bot no llega a un punto de control (diálogo SAP colgado), la
+cancelación no tiene efecto hasta que termine; para esos casos está el tiempo
+máximo por bot de nexus_aislado.
+"""
+import contextvars
+import threading
+from contextlib import contextmanager
+
+
+class Cancelado(BaseException):
+    """
+    El trabajo se detuvo porque se pidió cancelarlo. Hereda de BaseException
+    (como asyncio.CancelledError) para atravesar los `except Exception` de
+    los bots.
+    """
+
+
+class TiempoAgotado(Exception):
+    """El trabajo superó el tiempo máximo de su bot y se detuvo a la fuerza."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._evento = threading.Event()
+        self.motivo = None
+
+    def cancelar(self, motivo="Cancelación solicitada"):
+        if not self._evento.is_set():
+            self.motivo = motivo
+            self._evento.set()
+
+    @property
+    def cancelado(self):
+        return self._evento.is_set()
+
+    def verificar(self):
+        if self._evento.is_set():
+            raise Cancelado(self.motivo)
+
+    def esperar(self, timeout=None):
+        """time.sleep interrumpible: True si se canceló durante la espera."""
+        return self._evento.wait(timeout)
+
+
+_actual = contextvars.ContextVar("nexus_cancel_token", default=None)
+
+
+def token_actual():
+    return _actual.get()
+
+
+@contextmanager
+def con_token(token):
+    marca = _actual.set(token)
+    try:
+        yield token
+    finally:
+        _actual.reset(marca)
+
+
+def verificar_cancelacion():
+    """Punto de control para los bots: lanza Cancelado si el trabajo actual fue cancelado."""
+    token = _actual.get()
+    if token is not None:
+        token.verificar()
@@ -0,0 +1,133 @@
+"""
+Captura de la salida (print) por trabajo.
+
+Los bots reportan su avance con print(). Para que varios trabajos corran a la
+vez sin mezclar sus logs, sys.stdout se reemplaza UNA sola vez por un
+enrutador, y el destino de cada trabajo vive en una variable de contexto:
+
+    with capturar(mi_logger):
+        bot.run()          # todo lo que imprima este trabajo va a mi_logger
+
+Funciona igual para hilos (cada hilo tiene su contexto) y para tareas asyncio
+(cada tarea copia el contexto al crearse). Al salir del bloque, aunque sea por
+una excepción, se restaura el destino anterior: no hay redirecciones colgadas.
+
+Fuera de un bloque capturar() la salida va a la consola original. Un hilo
+lanzado desde un trabajo no hereda su destino salvo que se lance con
+propagar(fn), que corre fn en una copia del contexto actual.
+"""
+import contextvars
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+_destino = contextvars.ContextVar("nexus_capture_destino", default=None)
+
+
+class _StdoutEnrutado:
+    def __init__(self, terminal):
+        self.terminal = terminal
+
+    def write(self, message):
+        return (_destino.get() or self.terminal).write(message)
+
+    def flush(self):
+        destino = _destino.get()
+        if destino is not None:
+            destino.flush()
+        self.terminal.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.terminal, name)
+
+
+_lock = threading.Lock()
+
+
+def instalar():
+    """Instala el enrutador en sys.stdout (idempotente) y lo devuelve."""
+    with _lock:
+        if not isinstance(sys.stdout, _StdoutEnrutado):
+            # En el .exe --windowed no hay consola (sys.stdout es None)
+            sys.stdout = _StdoutEnrutado(sys.stdout or open(os.devnull, "w", encoding="utf-8"))
+        return sys.stdout
+
+
+def terminal():
+    """La consola real, para escribir sin pasar por la captura."""
+    stdout = sys.stdout
+    return stdout.terminal if isinstance(stdout, _StdoutEnrutado) else stdout
+
+
+@contextmanager
+def capturar(destino):
+    instalar()
+    token = _destino.set(destino)
+    try:
+        yield destino
+    finally:
+        _destino.reset(token)
+
+
+def propagar(fn):
+    """Envuelve fn para que corra (p. ej. en otro hilo) con el contexto de quien la envuelve."""
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(fn, *args, **kwargs)
+
+
+if __name__ == "__main__":
+    # Prueba: trabajos en paralelo (hilos y tareas asyncio) no mezclan su salida
+    import asyncio
+    import io
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def trabajo(nombre, lineas=50):
+        destino = io.StringIO()
+        with capturar(destino):
+            for i in range(lineas):
+                print(f"{nombre} linea {i}")
+                time.sleep(random.random() / 1000)
+            if nombre.endswith("3"):
+                raise RuntimeError("falla simulada")
+        return destino
+
+    def revisar(nombre, destino, lineas=50):
+        salida = destino.getvalue().splitlines()
+        assert salida == [f"{nombre} linea {i}" for i in range(lineas)], f"{nombre}: salida mezclada"
+
+    instalar()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futuros = {f"hilo{i}": pool.submit(trabajo, f"hilo{i}") for i in range(8)}
+    for nombre, futuro in futuros.items():
+        if nombre.endswith("3"):
+            assert isinstance(futuro.exception(), RuntimeError)
+        else:
+            revisar(nombre, futuro.result())
+
+    async def tarea(nombre, lineas=50):
+        destino = io.StringIO()
+        with capturar(destino):
+            for i in range(lineas):
+                print(f"{nombre} linea {i}")
+                await asyncio.sleep(0)
+        return nombre, destino
+
+    async def tareas():
+        return await asyncio.gather(*(tarea(f"tarea{i}") for i in range(8)))
+
+    for nombre, destino in asyncio.run(tareas()):
+        revisar(nombre, destino)
+
+    # Hilo hijo de un trabajo: sólo hereda el destino con propagar()
+    externo = io.StringIO()
+    with capturar(externo):
+        hijo = threading.Thread(target=propagar(print), args=("desde hilo hijo",))
+        hijo.start()
+        hijo.join()
+    assert externo.getvalue() == "desde hilo hijo\n"
+    assert _destino.get() is None
+
+    print("✅ Captura por contexto OK: 8 hilos (uno con excepción) y 8 tareas sin mezclar logs")
@@ -0,0 +1,221 @@
+"""
+Reclamo atómico de órdenes para que varios PCs compartan la cola ordenes_bot.
+
+Una orden se toma con un PATCH condicional (UPDATE ... WHERE): sólo afecta la
+fila si sigue 'pending'. Con Prefer: return=representation PostgREST devuelve
+las filas afectadas; si viene vacío, otro worker ganó la carrera.
+
+Cada reclamo deja en la fila:
+- worker:        identidad del PC que la ejecuta
+- lease_token:   id único del reclamo; toda escritura posterior filtra por él,
+                 así un worker cuyo lease fue tomado por otro no pisa el estado
+- lease_expira:  UTC; pasado este instante la orden se considera abandonada
+
+Mientras corre la orden, Latido renueva lease_expira cada LEASE_S / 4. Si el
+worker muere, reciclar_vencidas() (que corre cada worker cada RECICLAR_S)
+devuelve la orden a 'pending' sumando 1 a `intentos`, o la pasa a
+'dead_letter' al llegar a MAX_INTENTOS. Una orden abandonada vuelve a la cola
+a lo sumo LEASE_S + RECICLAR_S (más una espera del intake) después de la
+caída; si el mismo PC reinicia su worker, la recupera al arrancar
+(huerfanas_de=PC_NAME) sin esperar a que venza el lease.
+
+El latido trae de vuelta la fila: si alguien marcó `cancel_requested`, se
+cancela el CancelToken de la orden (nexus_cancel). Una orden abandonada que
+ya tenía pedida la cancelación no vuelve a la cola: queda 'cancelled'.
+
+Los vencimientos usan el reloj de cada PC: basta que estén sincronizados con
+un margen bastante menor que LEASE_S.
+
+Columnas necesarias: ver Supabase/ordenes_bot_rpc.sql.
+"""
+import os
+import threading
+import uuid
+from urllib.parse import quote
+from datetime import datetime, timedelta, timezone
+from nexus_http import http
+
+# Con latidos el lease sólo cubre el tiempo de detectar una caída
+LEASE_S = int(os.getenv("NEXUS_LEASE_S", "120"))
+RECICLAR_S = int(os.getenv("NEXUS_RECICLAR_S", "30"))
+MAX_INTENTOS = int(os.getenv("NEXUS_MAX_INTENTOS", "3"))
+
+
+def iso_utc(dt):
+    """Formato sin '+' para que viaje sin escapar en la query string."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def identidad_worker():
+    """Nombre del worker: NEXUS_WORKER_NAME, o el nombre del PC."""
+    return os.getenv("NEXUS_WORKER_NAME") or os.getenv("COMPUTERNAME") or "SANJORGE1"
+
+
+def url_orden(base_url, doc_id, token=None):
+    """URL PostgREST de la orden; con token sólo afecta si el reclamo sigue vigente."""
+    url = f"{base_url}/rest/v1/ordenes_bot?id=eq.{doc_id}"
+    if token:
+        url += f"&lease_token=eq.{token}"
+    return url
+
+
+def url_sin_terminar(base_url, doc_id):
+    """
+    URL de la orden mientras siga pending/running, con cualquier reclamo: el
+    respaldo del estado final si el lease venció durante un corte de red (la
+    orden se recicló pero nadie la terminó; `intentos` no se toca).
+    """
+    return f"{base_url}/rest/v1/ordenes_bot?id=eq.{doc_id}&status=in.(pending,running)"
+
+
+def reclamar_orden(base_url, headers, doc_id, worker, lease_s=LEASE_S):
+    """
+    Intenta tomar la orden. Devuelve el lease_token si este worker la ganó,
+    None si otro la tomó antes (o la orden ya no está disponible).
+    """
+    ahora = datetime.now(timezone.utc)
+    token = uuid.uuid4().hex
+    # Sólo 'pending': las órdenes abandonadas vuelven por reciclar_vencidas(),
+    # que lleva la cuenta de intentos
+    url = f"{base_url}/rest/v1/ordenes_bot?id=eq.{doc_id}&status=eq.pending"
+    cabeceras = dict(headers)
+    cabeceras["Prefer"] = "return=representation"
+
+    response = http.patch(url, headers=cabeceras, json={
+        'status': 'running',
+        'worker': worker,
+        'inicio': datetime.now().isoformat(),
+        'lease_token': token,
+        'lease_expira': iso_utc(ahora + timedelta(seconds=lease_s))
+    }, timeout=15)
+
+    if response.status_code == 200 and response.json():
+        return token
+    if response.status_code >= 400:
+        print(f"⚠️ Error reclamando orden {doc_id}: {response.status_code} - {response.text}")
+    return None
+
+
+def renovar_lease(base_url, headers, doc_id, token, lease_s=LEASE_S):
+    """
+    Extiende el lease. False si el reclamo ya no es nuestro (fue reciclado o
+    terminó); si no, la fila actualizada (o True si la respuesta no la trae).
+    """
+    cabeceras = dict(headers)
+    cabeceras["Prefer"] = "return=representation"
+    vence = iso_utc(datetime.now(timezone.utc) + timedelta(seconds=lease_s))
+    response = http.patch(url_orden(base_url, doc_id, token) + "&status=eq.running",
+                          headers=cabeceras, json={'lease_expira': vence}, timeout=15)
+    if response.status_code != 200:
+        return True
+    filas = response.json()
+    return filas[0] if filas else False
+
+
+class Latido:
+    """
+    Renueva el lease de una orden en segundo plano mientras corre el bot:
+
+        with Latido(base_url, headers, doc_id, token):
+            run_automation(...)
+
+    (o iniciar() / detener(), que es idempotente). El estado final viaja por
+    la bandeja de salida, que puede tardar si no hay red: soltar() deja el
+    latido renovando hasta que la bandeja lo detenga al enviarlo, y una fila
+    que deja de estar 'running' mientras tanto es el final esperado, no un
+    lease perdido.
+
+    Un fallo de red no corta el latido (se reintenta en el próximo ciclo);
+    si el reclamo se perdió, `perdido` queda marcado y se deja de renovar.
+    Si se pasa `cancel` (CancelToken) se cancela cuando la fila llega con
+    cancel_requested.
+    """
+
+    def __init__(self, base_url, headers, doc_id, token, lease_s=LEASE_S, intervalo_s=None, cancel=None):
+        self.args = (base_url, headers, doc_id, token, lease_s)
+        self.cancel = cancel
+        self.intervalo_s = intervalo_s or max(lease_s / 4, 1)
+        self.parar = threading.Event()
+        self.perdido = threading.Event()
+        self.soltado = False
+        self.hilo = threading.Thread(target=self._bucle, daemon=True, name=f"latido-{doc_id}")
+
+    def iniciar(self):
+        self.hilo.start()
+        return self
+
+    def detener(self, esperar=True):
+        self.parar.set()
+        if esperar and self.hilo.is_alive() and self.hilo is not threading.current_thread():
+            self.hilo.join(timeout=20)
+
+    def soltar(self):
+        """El estado final ya está encolado: seguir renovando hasta detener(esperar=False)."""
+        self.soltado = True
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+        return False
+
+    def _bucle(self):
+        while not self.parar.wait(self.intervalo_s):
+            try:
+                fila = renovar_lease(*self.args)
+                if not fila:
+                    if self.soltado or self.parar.is_set():
+                        return  # el estado final ya llegó
+                    self.perdido.set()
+                    print(f"⚠️ Lease perdido para la orden {self.args[2]}: otro worker puede retomarla")
+                    return
+                if self.cancel is not None and isinstance(fila, dict) and fila.get('cancel_requested'):
+                    self.cancel.cancelar("Cancelación solicitada desde el panel")
+            except Exception as e:
+                print(f"⚠️ No se pudo renovar el lease de {self.args[2]}: {e}")
+
+
+def reciclar_vencidas(base_url, headers, max_intentos=MAX_INTENTOS, limite=50, huerfanas_de=None):
+    """
+    Devuelve a 'pending' las órdenes 'running' con lease vencido (o las pasa a
+    'dead_letter' tras `max_intentos`). Seguro de correr en varios PCs a la
+    vez: cada cambio exige el mismo token y que el lease siga vencido.
+
+    Con huerfanas_de=<worker> recicla en cambio todas las 'running' de ese
+    worker sin mirar el lease: sólo debe usarlo el propio worker al arrancar.
+    Devuelve [(id, nuevo_status)].
+    """
+    ahora = iso_utc(datetime.now(timezone.utc))
+    if huerfanas_de:
+        condicion = f"worker=eq.{quote(huerfanas_de)}"
+    else:
+        condicion = f"lease_expira=lt.{ahora}"
+    response = http.get(
+        f"{base_url}/rest/v1/ordenes_bot?status=eq.running&{condicion}"
+        f"&select=id,tipo_bot,worker,lease_token,intentos,cancel_requested&limit={limite}",
+        headers=headers, timeout=15)
+    if response.status_code != 200:
+        print(f"⚠️ Error buscando órdenes vencidas: {response.status_code} - {response.text}")
+        return []
+
+    cabeceras = dict(headers)
+    cabeceras["Prefer"] = "return=representation"
+    recicladas = []
+    for orden in response.json():
+        intentos = (orden.get('intentos') or 0) + 1
+        cambios = {'intentos': intentos, 'lease_token': None, 'lease_expira': None}
+        if orden.get('cancel_requested'):
+            cambios.update(status='cancelled', error="Cancelada (el worker se detuvo antes de terminar)")
+        elif intentos >= max_intentos:
+            cambios.update(status='dead_letter',
+                           error=f"Abandonada {intentos} veces (último worker: {orden.get('worker')})")
+        else:
+            cambios.update(status='pending', worker='En Cola')
+        url = url_orden(base_url, orden['id'], orden.get('lease_token')) + f"&status=eq.running&{condicion}"
+        r = http.patch(url, headers=cabeceras, json=cambios, timeout=15)
+        if r.status_code == 200 and r.json():
+            recicladas.append((orden['id'], cambios['status']))
+            print(f"♻️ Orden {orden['id']} ({orden.get('tipo_bot')}) abandonada por "
+                  f"{orden.get('worker')}: {cambios['status']} (intento {intentos}/{max_intentos})")
+    return recicladas
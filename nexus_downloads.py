@@ -0,0 +1,185 @@
+"""
+Caché local de archivos de entrada de las órdenes (ruta_archivo en Storage).
+
+Antes cada orden hacía requests.get(url).content (todo el archivo en memoria),
+lo escribía a un temp_bot_<ts> que nunca se borraba y, si la orden se
+reintentaba, volvía a descargar lo mismo. Ahora:
+
+- La descarga es por streaming en bloques a un .part que se renombra al final.
+- Los archivos se guardan por contenido (sha256) y el índice asocia
+  URL -> (sha256, ETag). Dos URLs con el mismo contenido comparten archivo.
+- Una URL ya descargada se sirve desde disco sin tocar la red (los objetos de
+  Storage no cambian bajo la misma ruta). Con revalidar=True se envía
+  If-None-Match con el ETag y un 304 evita la descarga.
+- Antes de servir un archivo se verifica su sha256; si no coincide (alguien
+  lo modificó) se descarta y se vuelve a bajar.
+- El tamaño total está acotado (`max_bytes`) con expulsión LRU.
+
+Quien use el archivo y pueda modificarlo debe trabajar sobre una copia
+(ver worker_sap.ejecutar_tarea).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from nexus_http import http
+
+BLOQUE = 256 * 1024
+
+
+class ErrorDescarga(Exception):
+    pass
+
+
+class DownloadCache:
+    def __init__(self, directorio=None, max_bytes=1024 * 1024 * 1024):
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), "nexus_descargas")
+        self.max_bytes = max_bytes
+        self.indice_path = os.path.join(self.directorio, "indice.json")
+        self.lock = threading.Lock()
+        os.makedirs(self.directorio, exist_ok=True)
+        self.indice = self._cargar_indice()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.no_modificados = 0
+        self.bytes_descargados = 0
+        self.expulsados = 0
+        self.corruptos = 0
+
+    # --- API ---
+    def obtener(self, url, ext="", revalidar=False, headers=None):
+        """Ruta local del contenido de `url`, descargándolo sólo si hace falta."""
+        with self.lock:
+            entrada = self.indice["urls"].get(url)
+            ruta = self._ruta_valida(entrada)
+            if ruta and not revalidar:
+                self.aciertos += 1
+                self._tocar(entrada["sha256"])
+                return ruta
+
+        cabeceras = dict(headers or {})
+        if ruta and entrada.get("etag"):
+            cabeceras["If-None-Match"] = entrada["etag"]
+
+        response = http.get(url, headers=cabeceras, stream=True, timeout=(5, 120))
+        try:
+            if response.status_code == 304 and ruta:
+                with self.lock:
+                    self.no_modificados += 1
+                    self._tocar(entrada["sha256"])
+                return ruta
+            if response.status_code != 200:
+                raise ErrorDescarga(f"Status {response.status_code}")
+            sha, temporal, total = self._bajar(response)
+        finally:
+            response.close()
+
+        with self.lock:
+            self.fallos += 1
+            self.bytes_descargados += total
+            destino = os.path.join(self.directorio, sha + ext)
+            os.replace(temporal, destino)
+            self.indice["blobs"][sha] = {"archivo": os.path.basename(destino), "bytes": total, "ultimo_uso": time.time()}
+            self.indice["urls"][url] = {"sha256": sha, "etag": response.headers.get("ETag")}
+            self._expulsar(proteger=sha)
+            self._guardar_indice()
+        return destino
+
+    def estadisticas(self):
+        with self.lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "no_modificados": self.no_modificados,
+                "bytes_descargados": self.bytes_descargados,
+                "expulsados": self.expulsados,
+                "corruptos": self.corruptos,
+                "bytes_en_cache": sum(b["bytes"] for b in self.indice["blobs"].values()),
+            }
+
+    # --- internos ---
+    def _bajar(self, response):
+        sha = hashlib.sha256()
+        total = 0
+        fd, temporal = tempfile.mkstemp(suffix=".part", dir=self.directorio)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for bloque in response.iter_content(BLOQUE):
+                    f.write(bloque)
+                    sha.update(bloque)
+                    total += len(bloque)
+            esperado = response.headers.get("Content-Length")
+            if esperado and "Content-Encoding" not in response.headers and int(esperado) != total:
+                raise ErrorDescarga(f"Descarga incompleta: {total} de {esperado} bytes")
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return sha.hexdigest(), temporal, total
+
+    def _ruta_valida(self, entrada):
+        # Con self.lock tomado
+        if not entrada:
+            return None
+        blob = self.indice["blobs"].get(entrada["sha256"])
+        if not blob:
+            return None
+        ruta = os.path.join(self.directorio, blob["archivo"])
+        if os.path.exists(ruta) and os.path.getsize(ruta) == blob["bytes"] and _sha256(ruta) == entrada["sha256"]:
+            return ruta
+        # Archivo borrado o modificado: olvidarlo
+        self.corruptos += 1
+        self._borrar_blob(entrada["sha256"])
+        return None
+
+    def _tocar(self, sha):
+        self.indice["blobs"][sha]["ultimo_uso"] = time.time()
+        self._guardar_indice()
+
+    def _expulsar(self, proteger=None):
+        blobs = self.indice["blobs"]
+        total = sum(b["bytes"] for b in blobs.values())
+        for sha in sorted(blobs, key=lambda s: blobs[s]["ultimo_uso"]):
+            if total <= self.max_bytes:
+                break
+            if sha == proteger:
+                continue
+            total -= blobs[sha]["bytes"]
+            self._borrar_blob(sha)
+            self.expulsados += 1
+
+    def _borrar_blob(self, sha):
+        blob = self.indice["blobs"].pop(sha, None)
+        if blob:
+            try:
+                os.remove(os.path.join(self.directorio, blob["archivo"]))
+            except OSError:
+                pass
+        self.indice["urls"] = {u: e for u, e in self.indice["urls"].items() if e["sha256"] != sha}
+
+    def _cargar_indice(self):
+        try:
+            with open(self.indice_path, "r", encoding="utf-8") as f:
+                indice = json.load(f)
+            if "urls" in indice and "blobs" in indice:
+                return indice
+        except (OSError, ValueError):
+            pass
+        return {"urls": {}, "blobs": {}}
+
+    def _guardar_indice(self):
+        temporal = self.indice_path + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.indice, f)
+        os.replace(temporal, self.indice_path)
+
+
+def _sha256(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
@@ -0,0 +1,137 @@
+"""
+Cliente HTTP compartido para worker_sap (Supabase REST, RPC y Storage).
+
+Antes cada llamada usaba requests.get/post/patch sueltos: sin Session (una
+conexión TLS nueva por log, poll o PATCH), sin timeout (un socket colgado
+congelaba el worker) y sin reintentos. Este módulo expone un único cliente:
+
+- Session con pool de conexiones keep-alive.
+- Timeout por defecto (conexión, lectura) sobreescribible por llamada.
+- Reintentos con backoff exponencial y jitter sólo para llamadas idempotentes
+  (GET/HEAD/PUT/DELETE, o las que el llamador marque con reintentar=True).
+- Métricas: peticiones, conexiones nuevas abiertas (y por tanto reutilización),
+  reintentos y errores.
+
+Uso:
+    from nexus_http import http
+    response = http.get(url, headers=HEADERS)
+    http.patch(url, headers=HEADERS, json=..., reintentar=True)
+"""
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+TIMEOUT_DEFECTO = (5, 30)  # (conexión, lectura) en segundos
+ESTADOS_REINTENTABLES = {429, 502, 503, 504}
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class _AdapterContado(HTTPAdapter):
+    """HTTPAdapter que cuenta cada socket que abren sus pools (connect())."""
+
+    def __init__(self, **kwargs):
+        self._lock_conexiones = threading.Lock()
+        self.conexiones = 0
+        super().__init__(**kwargs)
+
+    def __setstate__(self, state):
+        # requests sólo serializa __attrs__: el contador vuelve a cero
+        self._lock_conexiones = threading.Lock()
+        self.conexiones = 0
+        super().__setstate__(state)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        clases = self.poolmanager.pool_classes_by_scheme
+        self.poolmanager.pool_classes_by_scheme = {
+            esquema: self._pool_contado(clase) for esquema, clase in clases.items()
+        }
+
+    def _pool_contado(self, pool_cls):
+        adapter = self
+
+        class Conexion(pool_cls.ConnectionCls):
+            def connect(self):
+                with adapter._lock_conexiones:
+                    adapter.conexiones += 1
+                return super().connect()
+
+        return type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": Conexion})
+
+
+class ClienteHTTP:
+    def __init__(self, pool=10, timeout=TIMEOUT_DEFECTO, reintentos=3, backoff_base=0.5, backoff_max=8.0):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.adapter = _AdapterContado(pool_connections=4, pool_maxsize=pool, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.reintentos_hechos = 0
+        self.errores = 0
+
+    def request(self, metodo, url, timeout=None, reintentar=None, **kwargs):
+        metodo = metodo.upper()
+        if reintentar is None:
+            reintentar = metodo in METODOS_IDEMPOTENTES
+        intentos = self.reintentos + 1 if reintentar else 1
+
+        for intento in range(intentos):
+            with self._lock:
+                self.peticiones += 1
+            try:
+                response = self.session.request(metodo, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                with self._lock:
+                    self.errores += 1
+                if intento == intentos - 1:
+                    raise
+            else:
+                if response.status_code not in ESTADOS_REINTENTABLES or intento == intentos - 1:
+                    return response
+                response.close()
+            with self._lock:
+                self.reintentos_hechos += 1
+            time.sleep(self._espera(intento))
+
+    def _espera(self, intento):
+        # Full jitter: evita que varios workers reintenten todos a la vez
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def conexiones_nuevas(self):
+        """Conexiones abiertas por el pool desde el inicio (no reutilizadas)."""
+        with self.adapter._lock_conexiones:
+            return self.adapter.conexiones
+
+    def estadisticas(self):
+        nuevas = self.conexiones_nuevas()
+        with self._lock:
+            peticiones = self.peticiones
+            return {
+                "peticiones": peticiones,
+                "conexiones_nuevas": nuevas,
+                "reutilizacion": round(1 - nuevas / peticiones, 3) if peticiones else 0.0,
+                "reintentos": self.reintentos_hechos,
+                "errores": self.errores,
+            }
+
+
+# Instancia compartida por todo el proceso
+http = ClienteHTTP()
@@ -0,0 +1,170 @@
+"""
+Ingesta de órdenes pendientes (ordenes_bot) para worker_sap.
+
+Antes el worker hacía GET cada 3 s para siempre: hasta 3 s de espera por orden
+y ~28.800 peticiones diarias por PC en reposo. Ahora hay dos modos:
+
+- LongPollIntake: llama rpc/esperar_ordenes_pendientes, que bloquea en la base
+  hasta que aparece una orden pending (o vence la espera). La orden se recoge
+  apenas se inserta y en reposo sólo hay una petición cada `espera_s`.
+- PollingIntake: GET clásico con backoff. Tras encontrar trabajo consulta
+  rápido; mientras no hay nada el intervalo crece hasta `intervalo_max`.
+
+`crear_intake()` arma el modo según NEXUS_INTAKE_MODE (auto | longpoll | polling).
+En "auto" se usa long-poll y, si la RPC no existe en la base, se cae a polling.
+
+Todos los modos exponen `esperar_ordenes(excluir, corriendo)`, que devuelve una
+lista (puede venir vacía tras un ciclo de espera) para que el worker pueda hacer
+mantenimiento entre ciclos.
+
+Órdenes que el worker ya salteó (su carril está ocupado): las pasa en
+`excluir` junto con los ids que está ejecutando en `corriendo`. El long-poll
+sigue bloqueado mientras sólo haya órdenes excluidas y vuelve cuando aparece
+otra o cuando termina alguna de las que corren (se liberó un carril). Si la
+RPC es anterior y no acepta esos parámetros, o en polling, `filtra_declinadas`
+es False y el worker espera por su cuenta con backoff.
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from nexus_http import http
+
+RPC_ESPERA = "rpc/esperar_ordenes_pendientes"
+
+
+class IntakeNoDisponible(Exception):
+    """La base no tiene la RPC de long-poll instalada."""
+
+
+class _BaseIntake(ABC):
+    modo = "base"
+    filtra_declinadas = False
+
+    def __init__(self, base_url, headers):
+        self.base_url = base_url
+        self.headers = headers
+        self.peticiones = 0
+        self.inicio = time.time()
+
+    def peticiones_por_hora(self):
+        horas = max(time.time() - self.inicio, 1e-6) / 3600
+        return self.peticiones / horas
+
+    @abstractmethod
+    def esperar_ordenes(self, excluir=(), corriendo=()):
+        """Lista de órdenes pending (vacía si el ciclo de espera venció sin nada)."""
+
+
+class PollingIntake(_BaseIntake):
+    """GET periódico: rápido tras actividad, backoff exponencial en reposo."""
+    modo = "polling"
+
+    def __init__(self, base_url, headers, intervalo_min=0.5, intervalo_max=10.0, factor=1.5):
+        super().__init__(base_url, headers)
+        self.url = f"{base_url}/rest/v1/ordenes_bot?status=eq.pending&order=fecha_creacion.asc"
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.factor = factor
+        self.intervalo = intervalo_min
+
+    def esperar_ordenes(self, excluir=(), corriendo=()):
+        self.peticiones += 1
+        try:
+            response = http.get(self.url, headers=self.headers, timeout=15)
+            if response.status_code == 200:
+                ordenes = response.json()
+                if ordenes:
+                    self.intervalo = self.intervalo_min
+                    return ordenes
+            else:
+                print(f"⚠️ Error Supabase: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"⚠️ Error consultando órdenes: {e}")
+
+        time.sleep(self.intervalo)
+        self.intervalo = min(self.intervalo * self.factor, self.intervalo_max)
+        return []
+
+
+class LongPollIntake(_BaseIntake):
+    """Espera bloqueante en la base vía RPC; latencia de recogida ~ RTT."""
+    modo = "longpoll"
+
+    def __init__(self, base_url, headers, espera_s=20, limite=50, espera_min=2):
+        super().__init__(base_url, headers)
+        self.url = f"{base_url}/rest/v1/{RPC_ESPERA}"
+        self.espera_s = espera_s
+        self.espera_min = espera_min
+        self.limite = limite
+        self.errores = 0
+        self.filtra_declinadas = True  # hasta que la RPC rechace p_excluir
+
+    def esperar_ordenes(self, excluir=(), corriendo=()):
+        self.peticiones += 1
+        args = {"p_timeout_s": self.espera_s, "p_limite": self.limite}
+        filtros = self.filtra_declinadas and bool(excluir)
+        if filtros:
+            args.update(p_excluir=sorted(excluir), p_corriendo=sorted(corriendo))
+        try:
+            response = http.post(self.url, headers=self.headers, json=args, timeout=self.espera_s + 10)
+        except Exception as e:
+            return self._fallo(f"⚠️ Error en long-poll: {e}")
+
+        if response.status_code == 200:
+            self.errores = 0
+            return response.json() or []
+        if response.status_code == 404 and filtros:
+            # La RPC existe pero es la versión sin p_excluir/p_corriendo
+            print(f"⚠️ {RPC_ESPERA} no acepta p_excluir: actualizar Supabase/ordenes_bot_rpc.sql. "
+                  f"Mientras tanto el worker espera carril por su cuenta.")
+            self.filtra_declinadas = False
+            return self.esperar_ordenes(excluir, corriendo)
+        if response.status_code == 404:
+            raise IntakeNoDisponible(response.text)
+        if "57014" in response.text and self.espera_s > self.espera_min:
+            # statement_timeout del rol es menor que la espera: acortarla
+            self.espera_s = max(self.espera_min, self.espera_s // 2)
+            print(f"⚠️ Long-poll cortado por statement_timeout. Nueva espera: {self.espera_s}s")
+            return []
+        return self._fallo(f"⚠️ Error Supabase: {response.status_code} - {response.text}")
+
+    def _fallo(self, mensaje):
+        print(mensaje)
+        self.errores += 1
+        time.sleep(min(2 ** self.errores, 30))
+        return []
+
+
+class AutoIntake(_BaseIntake):
+    """Long-poll con caída automática a polling si la RPC no está instalada."""
+
+    def __init__(self, base_url, headers, **kwargs):
+        super().__init__(base_url, headers)
+        self.actual = LongPollIntake(base_url, headers, **kwargs)
+
+    @property
+    def modo(self):
+        return self.actual.modo
+
+    @property
+    def filtra_declinadas(self):
+        return self.actual.filtra_declinadas
+
+    def esperar_ordenes(self, excluir=(), corriendo=()):
+        # Cada ciclo de cualquiera de los dos modos es una petición
+        self.peticiones += 1
+        try:
+            return self.actual.esperar_ordenes(excluir, corriendo)
+        except IntakeNoDisponible:
+            print(f"⚠️ {RPC_ESPERA} no existe en la base. Usando polling con backoff.")
+            self.actual = PollingIntake(self.base_url, self.headers)
+            return []
+
+
+def crear_intake(base_url, headers, modo=None):
+    modo = (modo or os.getenv("NEXUS_INTAKE_MODE", "auto")).lower()
+    if modo == "polling":
+        return PollingIntake(base_url, headers)
+    if modo == "longpoll":
+        return LongPollIntake(base_url, headers)
+    return AutoIntake(base_url, headers)
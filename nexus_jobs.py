@@ -0,0 +1,240 @@
+"""
+Trabajos asíncronos para nexus_server.
+
+POST /jobs devuelve un id al instante y el bot corre en segundo plano:
+
+- Cola acotada (`max_cola`): si está llena, enviar() lanza ColaLlena (HTTP 429).
+- Límite de concurrencia por bot (`limites`, 1 por defecto) además de las
+  reglas de recursos de nexus_scheduler (SAP, Outlook, Excel, CPU).
+- Cada trabajo guarda sus propios logs (capturados con nexus_capture) para
+  consultarlos o seguirlos en vivo por SSE.
+- cancelar(): un trabajo en cola se descarta; uno en ejecución recibe la
+  cancelación en su CancelToken (nexus_cancel) y se detiene en el próximo
+  punto de control del bot, o al vencer el tiempo de gracia si corre aislado
+  (nexus_aislado). Termina como 'cancelled'.
+
+Estados: queued -> running -> success | error | cancelled
+"""
+import threading
+import time
+import uuid
+from collections import deque
+
+from nexus_capture import capturar, terminal
+from nexus_cancel import CancelToken, Cancelado, con_token
+from nexus_scheduler import ResourceScheduler
+from nexus_bots import recursos_bot
+from nexus_metrics import registrar_ejecucion, EN_CURSO
+
+ESTADOS_FINALES = ("success", "error", "cancelled")
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class _LogTrabajo:
+    """Destino de print() de un trabajo: guarda líneas y hace eco en consola."""
+
+    def __init__(self, trabajo):
+        self.trabajo = trabajo
+        self.terminal = terminal()
+        self._parcial = ""
+
+    def write(self, message):
+        self.terminal.write(message)
+        texto = self._parcial + message
+        *lineas, self._parcial = texto.split("\n")
+        for linea in lineas:
+            if linea.strip():
+                self.trabajo.agregar_log(linea.rstrip())
+
+    def flush(self):
+        self.terminal.flush()
+
+    def cerrar(self):
+        if self._parcial.strip():
+            self.trabajo.agregar_log(self._parcial.rstrip())
+        self._parcial = ""
+
+
+class Trabajo:
+    def __init__(self, bot_id, params, file_path, max_logs=5000):
+        self.id = uuid.uuid4().hex[:12]
+        self.bot_id = bot_id
+        self.params = params or {}
+        self.file_path = file_path
+        self.status = "queued"
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.result = None
+        self.error = None
+        self.cancel = CancelToken()
+        self.future = None
+
+        # Logs con desplazamiento absoluto: el stream SSE sigue funcionando
+        # aunque se recorten las líneas más viejas
+        self.logs = deque(maxlen=max_logs)
+        self.logs_base = 0
+        self.cond = threading.Condition()
+
+    def agregar_log(self, linea):
+        with self.cond:
+            if len(self.logs) == self.logs.maxlen:
+                self.logs_base += 1
+            self.logs.append(linea)
+            self.cond.notify_all()
+
+    def logs_desde(self, desde):
+        """(nuevas líneas, siguiente desplazamiento) a partir de `desde`."""
+        with self.cond:
+            inicio = max(desde, self.logs_base)
+            lineas = list(self.logs)[inicio - self.logs_base:]
+            return lineas, inicio + len(lineas)
+
+    def terminado(self):
+        return self.status in ESTADOS_FINALES
+
+    def esperar(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(self.terminado, timeout)
+
+    def _cambiar_estado(self, status, **campos):
+        with self.cond:
+            self.status = status
+            for k, v in campos.items():
+                setattr(self, k, v)
+            self.cond.notify_all()
+
+    def resumen(self, ultimas=20):
+        with self.cond:
+            total = self.logs_base + len(self.logs)
+            return {
+                "jobId": self.id,
+                "botId": self.bot_id,
+                "status": self.status,
+                "params": self.params,
+                "filePath": self.file_path,
+                "creado": self.creado,
+                "inicio": self.inicio,
+                "fin": self.fin,
+                "result": self.result,
+                "error": self.error,
+                "cancelRequested": self.cancel.cancelado,
+                "logCount": total,
+                "logTail": list(self.logs)[-ultimas:] if ultimas else [],
+            }
+
+
+class JobManager:
+    def __init__(self, ejecutor, max_cola=50, limites=None, limite_defecto=1, historial=200, scheduler=None):
+        """
+        ejecutor(bot_id, file_path, params) corre el bot; normalmente
+        worker_sap.run_automation.
+        """
+        self.ejecutor = ejecutor
+        self.max_cola = max_cola
+        self.limites = dict(limites or {})
+        self.limite_defecto = limite_defecto
+        self.historial = historial
+        self.scheduler = scheduler or ResourceScheduler()
+
+        self.trabajos = {}
+        self.cola = deque()
+        self.corriendo = {}
+        self.lock = threading.Lock()
+
+    # --- API ---
+    def enviar(self, bot_id, params=None, file_path=None):
+        with self.lock:
+            # En espera = en self.cola o ya en el scheduler esperando carril
+            if sum(1 for t in self.trabajos.values() if t.status == "queued") >= self.max_cola:
+                raise ColaLlena(f"Cola llena ({self.max_cola} trabajos en espera)")
+            trabajo = Trabajo(bot_id, params, file_path)
+            self.trabajos[trabajo.id] = trabajo
+            self.cola.append(trabajo)
+            self._podar()
+            self._despachar()
+        return trabajo
+
+    def obtener(self, job_id):
+        return self.trabajos.get(job_id)
+
+    def listar(self):
+        with self.lock:
+            return [t.resumen(ultimas=0) for t in self.trabajos.values()]
+
+    def cancelar(self, job_id):
+        trabajo = self.trabajos.get(job_id)
+        if trabajo is None or trabajo.terminado():
+            return trabajo
+        trabajo.cancel.cancelar("Cancelado desde la API")
+        with self.lock:
+            if trabajo in self.cola:
+                self.cola.remove(trabajo)
+                trabajo._cambiar_estado("cancelled", fin=time.time())
+                return trabajo
+        # Enviado al scheduler pero aún sin hilo: Future.cancel lo descarta
+        if trabajo.future is not None and trabajo.future.cancel():
+            trabajo._cambiar_estado("cancelled", fin=time.time())
+            self._liberar(trabajo)
+        return trabajo
+
+    # --- internos ---
+    def _limite(self, bot_id):
+        return self.limites.get(bot_id, self.limite_defecto)
+
+    def _despachar(self):
+        # Con self.lock tomado: FIFO, saltando bots que ya están en su límite
+        for trabajo in list(self.cola):
+            if self.corriendo.get(trabajo.bot_id, 0) >= self._limite(trabajo.bot_id):
+                continue
+            self.cola.remove(trabajo)
+            self.corriendo[trabajo.bot_id] = self.corriendo.get(trabajo.bot_id, 0) + 1
+            recursos = recursos_bot(trabajo.bot_id, trabajo.params)
+            trabajo.future = self.scheduler.enviar(trabajo.bot_id, recursos, self._correr, trabajo,
+                                                   encolado=trabajo.creado)
+
+    def _liberar(self, trabajo):
+        with self.lock:
+            self.corriendo[trabajo.bot_id] -= 1
+            self._despachar()
+
+    def _correr(self, trabajo):
+        if trabajo.cancel.cancelado:
+            trabajo._cambiar_estado("cancelled", fin=time.time())
+            self._liberar(trabajo)
+            return
+        trabajo._cambiar_estado("running", inicio=time.time())
+        EN_CURSO.inc(bot=trabajo.bot_id)
+        log = _LogTrabajo(trabajo)
+        try:
+            with capturar(log), con_token(trabajo.cancel):
+                resultado = self.ejecutor(trabajo.bot_id, trabajo.file_path, trabajo.params)
+            log.cerrar()
+            estado = "cancelled" if trabajo.cancel.cancelado else "success"
+            trabajo._cambiar_estado(estado, result=resultado, fin=time.time())
+        except Cancelado as e:
+            log.cerrar()
+            trabajo._cambiar_estado("cancelled", error=str(e), fin=time.time())
+        except Exception as e:
+            log.cerrar()
+            estado = "cancelled" if trabajo.cancel.cancelado else "error"
+            trabajo._cambiar_estado(estado, error=str(e), fin=time.time())
+        finally:
+            # SystemExit/KeyboardInterrupt de un bot: cerrar el trabajo igual
+            if not trabajo.terminado():
+                trabajo._cambiar_estado("error", error="El bot terminó abruptamente", fin=time.time())
+            EN_CURSO.dec(bot=trabajo.bot_id)
+            try:
+                self._liberar(trabajo)
+            finally:
+                registrar_ejecucion(trabajo.bot_id, trabajo.inicio - trabajo.creado,
+                                    (trabajo.fin or time.time()) - trabajo.inicio, trabajo.status)
+
+    def _podar(self):
+        # Con self.lock tomado: conservar sólo los últimos `historial` terminados
+        terminados = [t for t in self.trabajos.values() if t.terminado()]
+        for trabajo in sorted(terminados, key=lambda t: t.creado)[:-self.historial or None]:
+            del self.trabajos[trabajo.id]
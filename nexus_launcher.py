@@ -15,17 +15,15 @@ if sys.platform == 'win32':
 multiprocessing.freeze_support()
 
 # Import core modules lazily but we rely on hidden imports/PyInstaller analysis
-# to bundle them.
-
-# Import core modules lazily but we rely on hidden imports/PyInstaller analysis
-# to bundle them.
-import nexus_updater
+# to bundle them. Cada modo importa sólo lo suyo (nexus_updater trae tkinter):
+# el arranque en frío de la GUI se mide con Tools/bench_arranque_gui.py
 
 def main():
     # --- AUTO-UPDATE CHECK (GUI MODE ONLY) ---
     if len(sys.argv) <= 1:
         # Solo chequear actualizaciones si iniciamos en modo normal (GUI)
         # para evitar bucles si lo iniciamos desde otro proceso
+        import nexus_updater
         nexus_updater.run_updater_check()
 
     # Parse arguments
@@ -42,6 +40,10 @@ def main():
             mode = "worker_zonales"
         elif arg == "--manager":
             mode = "manager"
+        elif arg == "--api-server":
+            mode = "api_server"
+        elif arg == "--bot-aislado":
+            mode = "bot_aislado"
     
     # Hide console if in GUI mode and running from console? 
     # No, PyInstaller handles console vs windowed. 
@@ -50,7 +52,7 @@ def main():
     # If mode is NOT gui, we might want to attach a console if possible?
     # Or rely on logs. For now, we assume simple execution.
     
-    if mode != "gui":
+    if mode not in ("gui", "bot_aislado"):
         print(f"[INFO] Nexus Jarvis Launcher: Mode={mode}")
 
     if mode == "worker_sap":
@@ -68,6 +70,15 @@ def main():
     elif mode == "manager":
         import nexus_manager
         nexus_manager.main()
+
+    elif mode == "api_server":
+        import nexus_server
+        nexus_server.main()
+
+    elif mode == "bot_aislado":
+        # Proceso hijo de nexus_aislado: stdout es el canal con el worker
+        import nexus_aislado
+        nexus_aislado.hijo()
         
     else:
         # GUI
@@ -1,21 +1,78 @@
-import os
+"""
+Bitácora centralizada de operaciones (bitacora_operaciones.csv en OneDrive).
+
+log_event() no toca el disco: deja la fila en memoria y un hilo la escribe
+en lotes (cada LOTE eventos o INTERVALO_S segundos), así OneDrive sincroniza
+una vez por lote y no una por evento. Al salir del proceso se escribe lo
+pendiente (atexit).
+
+- Varios procesos (worker, suite, email) escriben el mismo archivo: cada
+  lote se agrega bajo un bloqueo entre procesos (nexus_bloqueo) sobre un
+  archivo .lock local, fuera de OneDrive.
+- Rotación diaria: el primer lote de un día nuevo renombra el archivo del
+  día anterior a bitacora_operaciones_AAAA-MM-DD.csv, que nexus_archive
+  compacta en particiones consultables con query_events().
+
+Importarlo es barato (sólo biblioteca estándar, nada de disco): settings.json
+y la carpeta de OneDrive se resuelven en el primer lote, en el hilo escritor.
+Los análisis con pandas están aparte, en nexus_analisis.
+"""
+import atexit
 import csv
-import pandas as pd
-from datetime import datetime
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import date, datetime
 import json
-import logging
+
+from nexus_bloqueo import BloqueoArchivo
 
 # Configuración por defecto
 DEFAULT_LOG_DIR = os.path.join(os.path.expanduser("~"), r"OneDrive - CIAL Alimentos\Nexus_System\Logs")
 DEFAULT_LOG_FILE = "bitacora_operaciones.csv"
 SETTINGS_FILE = "settings.json"
 
+COLUMNAS = ["Timestamp", "Bot", "Usuario", "Accion", "Detalle", "Estado"]
+LOTE = int(os.getenv("NEXUS_BITACORA_LOTE", "200"))
+INTERVALO_S = float(os.getenv("NEXUS_BITACORA_INTERVALO_S", "2"))
+# Si OneDrive bloquea el archivo, lo no escrito se reintenta hasta este tope
+MAX_PENDIENTES = 50000
+
+
 class NexusLogger:
-    def __init__(self):
-        self.log_dir = DEFAULT_LOG_DIR
+    def __init__(self, log_dir=None, lote=LOTE, intervalo_s=INTERVALO_S):
+        """No toca el disco: la configuración se carga en preparar()."""
+        self.log_dir = log_dir
         self.log_file = DEFAULT_LOG_FILE
-        self.load_config()
-        self.setup_logging()
+        self.full_path = None
+        self.lock_path = None
+        self._preparado = False
+        self._preparando = threading.Lock()
+
+        self.lote = lote
+        self.intervalo_s = intervalo_s
+        self.escritos = 0
+        self.lotes = 0
+        self._pendientes = []
+        self._cond = threading.Condition()
+        self._escritura = threading.Lock()
+        self._hilo = None
+        atexit.register(self.flush)
+
+    def preparar(self):
+        """Resuelve la carpeta (settings.json / OneDrive) una sola vez. Devuelve el logger."""
+        if not self._preparado:
+            with self._preparando:
+                if not self._preparado:
+                    explicito = self.log_dir
+                    self.log_dir = DEFAULT_LOG_DIR
+                    self.load_config()
+                    if explicito:
+                        self.log_dir = explicito
+                    self.setup_logging()
+                    self._preparado = True
+        return self
 
     def load_config(self):
         """Carga configuración desde settings.json si existe"""
@@ -30,7 +87,7 @@ class NexusLogger:
                 pass # Usar defaults
 
     def setup_logging(self):
-        """Asegura que el directorio y archivo existan"""
+        """Asegura que el directorio exista (el header lo escribe el primer lote)"""
         if not os.path.exists(self.log_dir):
             try:
                 os.makedirs(self.log_dir)
@@ -41,34 +98,96 @@ class NexusLogger:
                 os.makedirs(self.log_dir, exist_ok=True)
 
         self.full_path = os.path.join(self.log_dir, self.log_file)
-        
-        # Crear header si no existe
-        if not os.path.exists(self.full_path):
-            try:
-                df = pd.DataFrame(columns=["Timestamp", "Bot", "Usuario", "Accion", "Detalle", "Estado"])
-                df.to_csv(self.full_path, index=False)
-            except Exception as e:
-                print(f"[LOGGER] Error inicializando CSV: {e}")
+        # El .lock vive en %TEMP%: dentro de OneDrive también se sincronizaría
+        marca = hashlib.sha1(os.path.abspath(self.full_path).lower().encode("utf-8")).hexdigest()[:12]
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"nexus_bitacora_{marca}.lock")
 
     def log(self, bot_name, accion, detalle="", estado="INFO"):
-        """Registra un evento en el log centralizado"""
+        """Registra un evento en el log centralizado (se escribe en el próximo lote)"""
+        timestamp = datetime.now().isoformat()
+        usuario = os.getenv('USERNAME') or "Unknown"
+        with self._cond:
+            self._pendientes.append([timestamp, bot_name, usuario, accion, detalle, estado])
+            if len(self._pendientes) == 1 or len(self._pendientes) >= self.lote:
+                self._cond.notify()
+        if self._hilo is None:
+            self._iniciar()
+
+        # También mostrar en consola para debug
+        print(f"[{bot_name}] {accion}: {detalle} ({estado})")
+
+    def flush(self):
+        """Escribe ya todo lo pendiente (lo llama el hilo por lote y atexit al salir)."""
+        with self._escritura:
+            with self._cond:
+                lote, self._pendientes = self._pendientes, []
+            if lote:
+                self._escribir(lote)
+
+    # --- internos ---
+    def _iniciar(self):
+        with self._cond:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, daemon=True, name="nexus-bitacora")
+                self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                if not self._pendientes:
+                    self._cond.wait()
+                # Desde el primer evento, esperar a completar un lote o a que pase el intervalo
+                self._cond.wait_for(lambda: len(self._pendientes) >= self.lote, self.intervalo_s)
+            self.flush()
+
+    def _escribir(self, lote):
         try:
-            timestamp = datetime.now().isoformat()
-            usuario = os.getenv('USERNAME') or "Unknown"
-            
-            # 1. Escribir a CSV (Append mode)
-            # Usamos CSV estándar para velocidad y robustez concurrente simple
-            with open(self.full_path, "a", newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([timestamp, bot_name, usuario, accion, detalle, estado])
-                
-            # 2. También mostrar en consola para debug
-            print(f"[{bot_name}] {accion}: {detalle} ({estado})")
-            
+            self.preparar()
+            with BloqueoArchivo(self.lock_path):
+                self._rotar_si_cambio_dia()
+                nuevo = not os.path.exists(self.full_path) or os.path.getsize(self.full_path) == 0
+                # Usamos CSV estándar para velocidad y robustez concurrente simple
+                with open(self.full_path, "a", newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    if nuevo:
+                        writer.writerow(COLUMNAS)
+                    writer.writerows(lote)
+            self.escritos += len(lote)
+            self.lotes += 1
         except Exception as e:
             print(f"[LOGGER ERROR] No se pudo escribir log: {e}")
+            with self._cond:
+                if len(self._pendientes) + len(lote) <= MAX_PENDIENTES:
+                    self._pendientes[:0] = lote  # se reintenta en el próximo lote
+
+    def _rotar_si_cambio_dia(self):
+        """Con el bloqueo tomado: el archivo de un día anterior pasa a <nombre>_AAAA-MM-DD.csv."""
+        try:
+            dia = date.fromtimestamp(os.path.getmtime(self.full_path))
+        except OSError:
+            return
+        if dia >= date.today():
+            return
+        base, ext = os.path.splitext(self.full_path)
+        destino, n = f"{base}_{dia:%Y-%m-%d}{ext}", 1
+        while os.path.exists(destino):
+            destino, n = f"{base}_{dia:%Y-%m-%d}_{n}{ext}", n + 1
+        try:
+            os.replace(self.full_path, destino)
+        except OSError:
+            return # OneDrive lo tiene tomado: se rota en el próximo lote
+        # El día cerrado pasa al archivo consultable (nexus_archive)
+        threading.Thread(target=self._compactar, daemon=True, name="nexus-archivo").start()
+
+    def _compactar(self):
+        try:
+            from nexus_archive import compactar
+            resumen = compactar(self.log_dir, self.log_file)
+            print(f"[LOGGER] Bitácora compactada: {resumen}")
+        except Exception as e:
+            print(f"[LOGGER] No se pudo compactar la bitácora: {e}")
 
-# Instancia global
+# Instancia global (perezosa: no lee configuración ni toca OneDrive hasta el primer lote)
 nexus_logger = NexusLogger()
 
 def log_event(bot_name, accion, detalle="", estado="INFO"):
@@ -77,4 +196,5 @@ def log_event(bot_name, accion, detalle="", estado="INFO"):
 if __name__ == "__main__":
     # Prueba
     log_event("TestBot", "Inicio", "Probando logger centralizado", "OK")
-    print(f"Log escrito en: {nexus_logger.full_path}")
+    nexus_logger.flush()
+    print(f"Log escrito en: {nexus_logger.preparar().full_path}")
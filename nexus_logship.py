@@ -0,0 +1,186 @@
+"""
+Envío asíncrono y por lotes de los logs de ejecución a Supabase.
+
+SupabaseLogger hacía un requests.post a rpc/append_execution_log por cada línea
+impresa, así que los bots conversadores (Zonales, MIGO) esperaban la red en cada
+print. LogShipper desacopla eso:
+
+- write() sólo agrega la línea a un buffer circular acotado (no bloquea).
+- Un hilo de fondo envía lotes por tamaño (`lote`) o por tiempo (`intervalo_s`)
+  a rpc/append_execution_logs (una llamada por lote y orden).
+- Si el buffer se llena se descarta la línea más antigua y se cuenta en
+  `descartadas`; `lag_s()` indica la antigüedad de lo que aún no se envía.
+- drenar(order_id) bloquea hasta enviar lo pendiente de ESA orden (se llama
+  al terminar cada orden). Sus líneas salen antes que las de otras órdenes,
+  así que un bot conversador en paralelo no demora el cierre de los demás.
+
+Si la RPC masiva no existe en la base se cae a append_execution_log línea por
+línea (sigue siendo en segundo plano).
+"""
+import threading
+import time
+from collections import deque
+from nexus_http import http
+
+RPC_LOTE = "rpc/append_execution_logs"
+RPC_LINEA = "rpc/append_execution_log"
+
+
+class LogShipper:
+    def __init__(self, base_url, headers, capacidad=5000, lote=100, intervalo_s=0.5):
+        self.base_url = base_url
+        self.headers = headers
+        self.capacidad = capacidad
+        self.lote = lote
+        self.intervalo_s = intervalo_s
+        self.masivo = True
+
+        self.buffer = deque()
+        self.cond = threading.Condition()
+        self._en_vuelo = 0
+        self._pendientes = {}  # order_id -> líneas en buffer o en vuelo
+        self._drenando = {}    # order_id (None = todas) -> cuántos drenar() esperan
+        self._hilo = None
+
+        # Contadores
+        self.recibidas = 0
+        self.enviadas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.errores = 0
+
+    # --- Productor (hilo del bot) ---
+    def enviar(self, order_id, linea):
+        with self.cond:
+            if len(self.buffer) >= self.capacidad:
+                self._descontar([self.buffer.popleft()])
+                self.descartadas += 1
+            self.buffer.append((order_id, linea, time.time()))
+            self._pendientes[order_id] = self._pendientes.get(order_id, 0) + 1
+            self.recibidas += 1
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="LogShipper", daemon=True)
+                self._hilo.start()
+            if len(self.buffer) == 1 or len(self.buffer) >= self.lote:
+                self.cond.notify_all()
+
+    def drenar(self, order_id=None, timeout=15):
+        """
+        Espera a que se envíe lo encolado de `order_id` (o todo, sin order_id).
+        Devuelve True si quedó vacío.
+        """
+        if order_id is None:
+            vacio = lambda: not self.buffer and not self._en_vuelo
+        else:
+            vacio = lambda: not self._pendientes.get(order_id)
+        with self.cond:
+            if self._hilo is None:
+                return True
+            self._drenando[order_id] = self._drenando.get(order_id, 0) + 1
+            self.cond.notify_all()
+            try:
+                return self.cond.wait_for(vacio, timeout)
+            finally:
+                self._drenando[order_id] -= 1
+                if not self._drenando[order_id]:
+                    del self._drenando[order_id]
+
+    def lag_s(self):
+        with self.cond:
+            return time.time() - self.buffer[0][2] if self.buffer else 0.0
+
+    def estadisticas(self):
+        with self.cond:
+            return {
+                "recibidas": self.recibidas,
+                "enviadas": self.enviadas,
+                "descartadas": self.descartadas,
+                "lotes": self.lotes,
+                "errores": self.errores,
+                "en_buffer": len(self.buffer),
+                "lag_s": round(time.time() - self.buffer[0][2], 3) if self.buffer else 0.0,
+            }
+
+    # --- Consumidor (hilo de fondo) ---
+    def _bucle(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.buffer and (self._drenando or len(self.buffer) >= self.lote):
+                        break
+                    if self.buffer:
+                        restante = self.buffer[0][2] + self.intervalo_s - time.time()
+                        if restante <= 0:
+                            break
+                        self.cond.wait(restante)
+                    else:
+                        self.cond.wait()
+                lote = self._tomar_lote()
+                self._en_vuelo = len(lote)
+
+            enviadas, errores = self._enviar_lote(lote)
+
+            with self.cond:
+                self._en_vuelo = 0
+                self._descontar(lote)
+                self.enviadas += enviadas
+                self.descartadas += len(lote) - enviadas
+                self.errores += errores
+                self.lotes += 1
+                self.cond.notify_all()
+
+    def _tomar_lote(self):
+        # Con self.cond tomado: primero las líneas de las órdenes que se están
+        # drenando (en su orden original), si no, FIFO
+        if self._drenando and None not in self._drenando:
+            lote, resto = [], deque()
+            for item in self.buffer:
+                (lote if item[0] in self._drenando and len(lote) < self.lote else resto).append(item)
+            if lote:
+                self.buffer = resto
+                return lote
+        return [self.buffer.popleft() for _ in range(min(self.lote, len(self.buffer)))]
+
+    def _descontar(self, lineas):
+        # Con self.cond tomado
+        for order_id, _, _ in lineas:
+            if self._pendientes[order_id] > 1:
+                self._pendientes[order_id] -= 1
+            else:
+                del self._pendientes[order_id]
+
+    def _enviar_lote(self, lote):
+        # Agrupar líneas consecutivas de la misma orden para mantener el orden
+        grupos = []
+        for order_id, linea, _ in lote:
+            if grupos and grupos[-1][0] == order_id:
+                grupos[-1][1].append(linea)
+            else:
+                grupos.append((order_id, [linea]))
+
+        # Los errores se cuentan aquí y se suman bajo el lock en _bucle
+        enviadas = errores = 0
+        for order_id, lineas in grupos:
+            try:
+                if self.masivo:
+                    codigo = self._post(RPC_LOTE, {'order_id': order_id, 'log_lines': lineas})
+                    if codigo < 400:
+                        enviadas += len(lineas)
+                        continue
+                    if codigo == 404:
+                        # La base aún no tiene la RPC masiva
+                        self.masivo = False
+                    else:
+                        errores += 1
+                for linea in lineas:
+                    if self._post(RPC_LINEA, {'order_id': order_id, 'log_line': linea}) < 400:
+                        enviadas += 1
+                    else:
+                        errores += 1
+            except Exception:
+                errores += 1
+        return enviadas, errores
+
+    def _post(self, rpc, payload):
+        """Código HTTP de la respuesta."""
+        return http.post(f"{self.base_url}/rest/v1/{rpc}", headers=self.headers, json=payload, timeout=10).status_code
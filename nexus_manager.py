@@ -1,10 +1,39 @@
-import subprocess
+"""
+Supervisor de los servicios de Nexus (worker SAP, email, zonales y API).
+
+Un solo event loop (asyncio) lanza cada servicio como subproceso, reimprime
+sus logs y lo vigila:
+
+- Caída: se relanza con backoff exponencial (1 s, 2 s, 4 s... hasta 60 s).
+  El backoff vuelve a 1 s si el servicio llevaba `estable_s` corriendo.
+- Crash-loop: `crashloop_n` caídas dentro de `crashloop_ventana_s` dejan el
+  servicio en pausa `crashloop_pausa_s` antes de intentarlo otra vez.
+- Colgado: una sonda de vida por servicio. NEXUS API tiene que responder
+  /status; los workers escriben su pulso (nexus_pulso) desde su bucle
+  principal. Si la sonda falla, el proceso (y sus hijos) se mata y se relanza.
+- Reinicios, uptime y último motivo en http://127.0.0.1:8766/estado (JSON) y
+  /metrics (Prometheus). Puerto en NEXUS_MANAGER_PUERTO (0 = sin servidor).
+- Logs: cada línea queda como registro estructurado en un archivo rotado por
+  servicio y en un buffer en memoria (nexus_registros), consultable en
+  /logs y /logs/<servicio>?n=&nivel=&desde=&esperar= (long-poll para seguirlo).
+  La consola y el disco van por hilos aparte: nada frena la lectura de los pipes.
+
+Se prueba en Linux con servicios de prueba: python Tools/demo_manager.py
+"""
+import asyncio
+import json
+import os
+import queue
+import sys
 import threading
 import time
-import sys
-import os
-import signal
+from collections import deque
 from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import nexus_pulso
+from nexus_metrics import contador, medidor, exportar
+from nexus_registros import EscritorRegistros, RegistroServicio, slug
 
 # Configuraciones
 SERVICES = [
@@ -12,31 +41,50 @@ SERVICES = [
         "name": "WORKER SAP",
         "script": "worker_sap.py",
         "color": "\033[94m", # Azul
-        "enabled": True
+        "enabled": True,
+        "pulso": "worker_sap",
+        "max_edad_s": 180,
     },
     {
         "name": "EMAIL CMDR",
         "script": "email_commander.py",
         "color": "\033[92m", # Verde
-        "enabled": True
+        "enabled": True,
+        "pulso": "email_commander",
+        "max_edad_s": 300,
     },
     {
         "name": "ZONALES",
         "script": "worker_zonales.py",
         "color": "\033[93m", # Amarillo
-        "enabled": True
+        "enabled": True,
+        # bot.run() no late mientras consolida: se tolera un ciclo largo
+        "pulso": "worker_zonales",
+        "max_edad_s": 2 * 3600,
     },
     {
         "name": "NEXUS API",
         "script": "nexus_server.py",
         "color": "\033[95m", # Magenta
-        "enabled": True
+        "enabled": True,
+        "status_url": "http://127.0.0.1:8000/status",
     }
 ]
 
+# Argumento del exe (modo frozen) para cada script
+MODOS_EXE = {
+    "worker_sap.py": "--worker-sap",
+    "email_commander.py": "--email-commander",
+    "worker_zonales.py": "--worker-zonales",
+    "nexus_server.py": "--api-server",
+}
+
 RESET = "\033[0m"
-processes = {}
-running = True
+ROJO = "\033[91m"
+PUERTO_ESTADO = int(os.getenv("NEXUS_MANAGER_PUERTO", "8766"))
+
+REINICIOS = contador("nexus_servicio_reinicios_total", "Reinicios de servicios hechos por el supervisor",
+                     ("servicio", "motivo"))
 
 if sys.platform == 'win32':
     os.system('color') # Habilitar colores ANSI en Windows CMD
@@ -46,110 +94,362 @@ def log(service_name, message, color):
     # Limpiamos saltos de línea extra para que se vea compacto
     msg_clean = message.strip()
     if msg_clean:
-        print(f"{color}[{timestamp}] [{service_name}] {msg_clean}{RESET}")
-
-def stream_reader(process, service_info):
-    """Lee stdout del proceso y lo imprime"""
-    name = service_info['name']
-    color = service_info['color']
-    
-    for line in iter(process.stdout.readline, ''):
-        if not running: break
-        if line:
-            log(name, line, color)
-    process.stdout.close()
-
-def run_service(service_info):
-    name = service_info['name']
-    script = service_info['script']
-    color = service_info['color']
-    
-    while running:
-        log(name, "[START] Iniciando servicio...", color)
-        
-        # Ejecutar con python -u (unbuffered) para ver logs en tiempo real
-        cmd = []
-        cwd = os.path.dirname(os.path.abspath(__file__))
-        
-        if getattr(sys, 'frozen', False):
-            # Modo Frozen (EXE)
-            exe_path = sys.executable
-            # Mapear script a argumento
-            if script == "worker_sap.py":
-                cmd = [exe_path, "--worker-sap"]
-            elif script == "email_commander.py":
-                cmd = [exe_path, "--email-commander"]
-            elif script == "worker_zonales.py":
-                cmd = [exe_path, "--worker-zonales"]
-            elif script == "nexus_server.py":
-                cmd = [exe_path, "--api-server"]
-            else:
-                log(name, f"[WARN] Script desconocido en modo EXE: {script}", color)
-                time.sleep(5)
-                continue
-        else:
-            # Modo Script Normal
-            python_exe = sys.executable if sys.platform == "win32" else "python3"
-            cmd = [python_exe, "-u", script]
+        print(f"{color}[{timestamp}] [{service_name}] {msg_clean}{RESET}", flush=True)
+
+
+class _Consola:
+    """log() desde un hilo: una consola pausada (selección en CMD) no frena el event loop."""
+
+    def __init__(self, max_cola=5000):
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.descartadas = 0
+        threading.Thread(target=self._bucle, daemon=True, name="nexus-consola").start()
 
+    def log(self, service_name, message, color):
         try:
-            p = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=cwd,
-                encoding='utf-8',
-                errors='replace'
-            )
-            processes[name] = p
-            
-            # Hilo para leer logs
-            t = threading.Thread(target=stream_reader, args=(p, service_info))
-            t.daemon = True
-            t.start()
-            
-            p.wait() # Esperar a que termine/crashee
-            
-            if running:
-                log(name, f"[WARN] Servicio detenido (Codigo {p.returncode}). Reiniciando en 5s...", "\033[91m")
-                time.sleep(5)
-                
+            self.cola.put_nowait((service_name, message, color))
+        except queue.Full:
+            self.descartadas += 1
+
+    def _bucle(self):
+        while True:
+            log(*self.cola.get())
+
+
+# --- Sondas de vida ---
+class SondaHttp:
+    """Vivo si GET url responde 200 antes de `timeout_s`."""
+
+    def __init__(self, url, intervalo_s=15, timeout_s=5, fallos_max=3):
+        self.url = url
+        self.intervalo_s = intervalo_s
+        self.timeout_s = timeout_s
+        self.fallos_max = fallos_max
+
+    async def probar(self, servicio):
+        from nexus_http import http
+        try:
+            respuesta = await asyncio.wait_for(
+                asyncio.to_thread(http.get, self.url, timeout=self.timeout_s), self.timeout_s + 1)
         except Exception as e:
-            log(name, f"[ERROR] Error critico lanzando proceso: {e}", "\033[91m")
-            time.sleep(10)
+            return False, f"{self.url} sin respuesta ({type(e).__name__})"
+        return respuesta.status_code == 200, f"{self.url} -> {respuesta.status_code}"
+
+
+class SondaPulso:
+    """Vivo si el servicio latió (nexus_pulso) hace menos de `max_edad_s`."""
+
+    def __init__(self, nombre, max_edad_s=180, intervalo_s=15, fallos_max=1):
+        self.nombre = nombre
+        self.max_edad_s = max_edad_s
+        self.intervalo_s = intervalo_s
+        self.fallos_max = fallos_max
+
+    async def probar(self, servicio):
+        pulso = nexus_pulso.leer_pulso(self.nombre)
+        ultimo = servicio.inicio
+        # Sólo cuentan los pulsos de esta ejecución (no el de la anterior)
+        if pulso and pulso.get("ts", 0) >= servicio.inicio:
+            ultimo = pulso["ts"]
+        edad = time.time() - ultimo
+        return edad <= self.max_edad_s, f"sin pulso hace {edad:.0f}s (máx {self.max_edad_s}s)"
+
+
+# --- Servicios ---
+class Servicio:
+    def __init__(self, nombre, comando, color="", sonda=None, arranque_s=30, cwd=None, env=None):
+        """arranque_s: gracia tras lanzar antes de empezar a sondear."""
+        self.nombre = nombre
+        self.comando = comando
+        self.color = color
+        self.sonda = sonda
+        self.arranque_s = arranque_s
+        self.cwd = cwd
+        self.env = env
+
+        self.estado = "detenido"     # corriendo | reiniciando | crashloop | detenido
+        self.proceso = None
+        self.inicio = None
+        self.arranques = 0
+        self.reinicios = 0
+        self.seguidas = 0            # caídas seguidas sin un periodo estable (backoff)
+        self.caidas = deque()        # momentos de las caídas recientes (crash-loop)
+        self.ultimo_codigo = None
+        self.ultimo_motivo = None
+        self.motivo = None           # por qué se lo está matando (sonda)
+        self.registro = RegistroServicio(nombre)
+
+    def uptime_s(self):
+        if self.estado != "corriendo" or self.inicio is None:
+            return 0.0
+        return time.time() - self.inicio
+
+    def resumen(self):
+        return {
+            "estado": self.estado,
+            "pid": self.proceso.pid if self.proceso is not None and self.proceso.returncode is None else None,
+            "uptime_s": round(self.uptime_s(), 1),
+            "arranques": self.arranques,
+            "reinicios": self.reinicios,
+            "ultimo_codigo": self.ultimo_codigo,
+            "ultimo_motivo": self.ultimo_motivo,
+        }
+
+
+def crear_servicio(info, arranque_s=60):
+    """Servicio a partir de una entrada de SERVICES (comando según exe o script)."""
+    script = info["script"]
+    if getattr(sys, 'frozen', False):
+        # Modo Frozen (EXE)
+        comando = [sys.executable, MODOS_EXE[script]]
+    else:
+        # Modo Script Normal, -u (unbuffered) para ver logs en tiempo real
+        comando = [sys.executable, "-u", script]
+    if info.get("status_url"):
+        sonda = SondaHttp(info["status_url"])
+    elif info.get("pulso"):
+        sonda = SondaPulso(info["pulso"], max_edad_s=info.get("max_edad_s", 180))
+    else:
+        sonda = None
+    return Servicio(info["name"], comando, info["color"], sonda=sonda, arranque_s=arranque_s,
+                    cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- Supervisor ---
+class Supervisor:
+    def __init__(self, servicios, backoff_base_s=1, backoff_max_s=60, estable_s=60,
+                 crashloop_n=5, crashloop_ventana_s=120, crashloop_pausa_s=300,
+                 puerto_estado=None, escalonar_s=1, directorio_logs=None):
+        """directorio_logs: carpeta de los archivos por servicio (False = sólo memoria)."""
+        self.servicios = servicios
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.estable_s = estable_s
+        self.crashloop_n = crashloop_n
+        self.crashloop_ventana_s = crashloop_ventana_s
+        self.crashloop_pausa_s = crashloop_pausa_s
+        self.puerto_estado = puerto_estado
+        self.escalonar_s = escalonar_s
+        self.inicio = time.time()
+        self._parar = None
+        self.consola = _Consola()
+        self.escritor = EscritorRegistros(directorio_logs) if directorio_logs is not False else None
+        for servicio in servicios:
+            servicio.registro.escritor = self.escritor
+
+        medidor("nexus_servicio_uptime_segundos", "Segundos desde el último arranque del servicio", ("servicio",),
+                funcion=lambda: {(s.nombre,): round(s.uptime_s(), 1) for s in self.servicios})
+        medidor("nexus_servicio_arriba", "1 si el servicio está corriendo", ("servicio",),
+                funcion=lambda: {(s.nombre,): int(s.estado == "corriendo") for s in self.servicios})
+
+    def estado(self):
+        return {
+            "uptime_s": round(time.time() - self.inicio, 1),
+            "servicios": {s.nombre: s.resumen() for s in self.servicios},
+        }
+
+    def detener(self):
+        if self._parar is not None:
+            self._parar.set()
+
+    async def correr(self, duracion_s=None):
+        """Supervisa hasta detener() (o `duracion_s`); al salir mata los servicios."""
+        self._parar = asyncio.Event()
+        servidor = None
+        if self.puerto_estado:
+            try:
+                servidor = await asyncio.start_server(self._atender, "127.0.0.1", self.puerto_estado)
+            except OSError as e:
+                print(f"⚠️ Estado del supervisor no disponible en el puerto {self.puerto_estado}: {e}")
+        tareas = []
+        try:
+            for servicio in self.servicios:
+                tareas.append(asyncio.create_task(self._supervisar(servicio)))
+                await asyncio.sleep(self.escalonar_s) # Escalonar inicios
+            try:
+                await asyncio.wait_for(self._parar.wait(), duracion_s)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            self._parar.set()
+            await asyncio.gather(*(self._matar(s) for s in self.servicios), return_exceptions=True)
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            for servicio in self.servicios:
+                servicio.estado = "detenido"
+            if servidor is not None:
+                servidor.close()
+            if self.escritor is not None:
+                await asyncio.to_thread(self.escritor.cerrar)
+
+    async def _supervisar(self, s):
+        while not self._parar.is_set():
+            self._log(s, "[START] Iniciando servicio...", s.color)
+            try:
+                codigo = await self._ejecutar(s)
+            except OSError as e:
+                self._log(s, f"[ERROR] Error critico lanzando proceso: {e}", ROJO)
+                s.inicio, codigo, s.motivo = time.time(), None, f"no se pudo lanzar: {e}"
+            if self._parar.is_set():
+                break
+            espera = self._registrar_caida(s, s.motivo or f"código {codigo}")
+            if s.estado == "crashloop":
+                self._log(s, f"[CRASHLOOP] {self.crashloop_n} caídas en {self.crashloop_ventana_s}s. "
+                              f"Pausa de {espera:.0f}s ({s.ultimo_motivo})", ROJO)
+            else:
+                self._log(s, f"[WARN] Servicio detenido ({s.ultimo_motivo}). Reiniciando en {espera:g}s...", ROJO)
+            try:
+                await asyncio.wait_for(self._parar.wait(), espera)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _ejecutar(self, s):
+        """Lanza el servicio y espera a que termine (solo o matado por la sonda)."""
+        env = {**os.environ, "PYTHONIOENCODING": "utf-8", **(s.env or {})}
+        s.motivo = None
+        s.proceso = await asyncio.create_subprocess_exec(
+            *s.comando, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.DEVNULL, cwd=s.cwd, env=env, limit=1024 * 1024)
+        s.inicio = time.time()
+        s.arranques += 1
+        s.estado = "corriendo"
+        lector = asyncio.create_task(self._leer(s))
+        vigia = asyncio.create_task(self._vigilar(s)) if s.sonda else None
+        try:
+            return await s.proceso.wait()
+        finally:
+            if vigia is not None:
+                vigia.cancel()
+            try:
+                await asyncio.wait_for(lector, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            s.ultimo_codigo = s.proceso.returncode
+
+    async def _leer(self, s):
+        """Lee stdout del proceso y lo imprime"""
+        while True:
+            linea = await s.proceso.stdout.readline()
+            if not linea:
+                return
+            self._log(s, linea.decode("utf-8", errors="replace"), s.color)
+
+    def _log(self, s, mensaje, color):
+        s.registro.agregar(mensaje)
+        self.consola.log(s.nombre, mensaje, color)
+
+    async def _vigilar(self, s):
+        await asyncio.sleep(s.arranque_s)
+        fallos = 0
+        while s.proceso.returncode is None:
+            ok, detalle = await s.sonda.probar(s)
+            fallos = 0 if ok else fallos + 1
+            if fallos >= s.sonda.fallos_max:
+                s.motivo = f"sonda: {detalle}"
+                self._log(s, f"[HUNG] {detalle}. Matando el proceso para reiniciarlo...", ROJO)
+                await self._matar(s)
+                return
+            await asyncio.sleep(s.sonda.intervalo_s)
+
+    def _registrar_caida(self, s, motivo):
+        """Anota la caída y devuelve cuánto esperar antes de relanzar."""
+        ahora = time.time()
+        s.reinicios += 1
+        s.ultimo_motivo = motivo
+        REINICIOS.inc(servicio=s.nombre, motivo="sonda" if motivo.startswith("sonda") else "caida")
+        if ahora - s.inicio >= self.estable_s:
+            s.seguidas = 0
+        s.seguidas += 1
+        s.caidas.append(ahora)
+        while s.caidas and ahora - s.caidas[0] > self.crashloop_ventana_s:
+            s.caidas.popleft()
+        if len(s.caidas) >= self.crashloop_n:
+            s.caidas.clear()
+            s.estado = "crashloop"
+            return self.crashloop_pausa_s
+        s.estado = "reiniciando"
+        return min(self.backoff_base_s * 2 ** (s.seguidas - 1), self.backoff_max_s)
+
+    async def _matar(self, s):
+        """Mata el proceso y sus hijos (SAP/Excel lanzados por el servicio)."""
+        p = s.proceso
+        if p is None or p.returncode is not None:
+            return
+        try:
+            if sys.platform == 'win32':
+                taskkill = await asyncio.create_subprocess_exec(
+                    "taskkill", "/F", "/T", "/PID", str(p.pid),
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+                await taskkill.wait()
+            else:
+                p.kill()
+        except (OSError, ProcessLookupError):
+            pass
+        try:
+            await asyncio.wait_for(p.wait(), 10)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _atender(self, reader, writer):
+        """HTTP mínimo: GET /estado (JSON), /metrics y /logs[/<servicio>]."""
+        try:
+            pedido = (await asyncio.wait_for(reader.readline(), 5)).decode("latin-1").split()
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            url = urlsplit(pedido[1] if len(pedido) > 1 else "/")
+            estado, tipo = "200 OK", "application/json"
+            if url.path.startswith("/metrics"):
+                cuerpo, tipo = exportar(), "text/plain; version=0.0.4"
+            elif url.path.startswith("/logs"):
+                datos = await self._logs(unquote(url.path[len("/logs"):].strip("/")), parse_qs(url.query))
+                if datos is None:
+                    estado, datos = "404 Not Found", {"error": "Servicio desconocido"}
+                cuerpo = json.dumps(datos, ensure_ascii=False)
+            else:
+                cuerpo = json.dumps(self.estado(), indent=2)
+            cuerpo = cuerpo.encode("utf-8")
+            writer.write(f"HTTP/1.0 {estado}\r\nContent-Type: {tipo}; charset=utf-8\r\n"
+                         f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode("latin-1") + cuerpo)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, IndexError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _logs(self, nombre, query):
+        """Sin nombre: resumen por servicio. Con nombre: sus líneas del buffer (long-poll con esperar=)."""
+        if not nombre:
+            return {s.nombre: {"ultimo": s.registro.seq, "en_memoria": len(s.registro.lineas)}
+                    for s in self.servicios}
+        servicio = next((s for s in self.servicios if nombre in (s.nombre, slug(s.nombre))), None)
+        if servicio is None:
+            return None
+
+        def valor(clave, defecto):
+            return query.get(clave, [defecto])[0]
+
+        desde = int(valor("desde", 0))
+        esperar = min(float(valor("esperar", 0)), 60)
+        if esperar:
+            await servicio.registro.esperar(desde, esperar)
+        lineas = servicio.registro.consultar(int(valor("n", 100)), valor("nivel", None), desde)
+        return {"servicio": servicio.nombre, "ultimo": servicio.registro.seq, "lineas": lineas}
 
 def main():
-    global running
     print(f"{RESET}==================================================")
-    print(f"   [N.JARVIS] NEXUS JARVIS - PROCESS MANAGER v1.0")
+    print(f"   [N.JARVIS] NEXUS JARVIS - PROCESS MANAGER v2.0")
     print(f"==================================================\n")
-    
-    threads = []
-    
-    # Iniciar hilos de gestión
-    for service_info in SERVICES:
-        if service_info['enabled']:
-            t = threading.Thread(target=run_service, args=(service_info,))
-            t.daemon = True
-            t.start()
-            threads.append(t)
-            time.sleep(1) # Escalonar inicios
 
+    servicios = [crear_servicio(info) for info in SERVICES if info['enabled']]
+    supervisor = Supervisor(servicios, puerto_estado=PUERTO_ESTADO)
+    if PUERTO_ESTADO:
+        print(f"📊 Estado de servicios: http://127.0.0.1:{PUERTO_ESTADO}/estado\n")
     try:
-        while True:
-            time.sleep(1)
+        asyncio.run(supervisor.correr())
     except KeyboardInterrupt:
-        print(f"\n[STOP] Deteniendo NEXUS MANAGER...")
-        running = False
-        
-        # Matar subprocesos
-        for name, p in processes.items():
-            try:
-                print(f"   Matando {name}...")
-                p.terminate()
-            except:
-                pass
+        # asyncio.run cancela correr(): su finally mata los subprocesos
+        print(f"\n[STOP] NEXUS MANAGER detenido.")
         sys.exit(0)
 
 if __name__ == "__main__":
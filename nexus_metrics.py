@@ -0,0 +1,286 @@
+"""
+Métricas de la suite (contadores, medidores e histogramas) en formato de texto
+Prometheus.
+
+- worker_sap y nexus_server registran cada ejecución con registrar_ejecucion():
+  espera en cola (fecha_creacion -> inicio), duración por bot y resultado.
+- Los bots miden sus pasos SAP con paso_sap('MIGO', 'validar_origen').
+- nexus_server expone GET /metrics.
+- Cada proceso puede dejar una foto periódica en %TEMP%/nexus_metrics_<nombre>.prom
+  (iniciar_snapshots). Para verla sin la API:
+
+      python nexus_metrics.py            # fotos locales
+      python nexus_metrics.py --url http://localhost:8000/metrics
+
+El costo por observación es un lock y unas sumas: seguro para el camino caliente.
+"""
+import atexit
+import bisect
+import glob
+import os
+import tempfile
+import threading
+import time
+
+BUCKETS_DEFECTO = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formato_etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre}: se esperaban etiquetas {self.etiquetas}, llegaron {tuple(etiquetas)}")
+        return tuple(str(etiquetas[n]) for n in self.etiquetas)
+
+    def _cabecera(self):
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self.lock:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas):
+        with self.lock:
+            return self.valores.get(self._clave(etiquetas), 0)
+
+    def exportar(self):
+        with self.lock:
+            items = sorted(self.valores.items())
+        return self._cabecera() + [
+            f"{self.nombre}{_formato_etiquetas(self.etiquetas, c)} {_numero(v)}" for c, v in items
+        ]
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None):
+        """funcion() opcional: se evalúa al exportar y devuelve el valor o {etiquetas_tupla: valor}."""
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def set(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self.lock:
+            self.valores[clave] = valor
+
+    def dec(self, cantidad=1, **etiquetas):
+        self.inc(-cantidad, **etiquetas)
+
+    def exportar(self):
+        if self.funcion is not None:
+            try:
+                resultado = self.funcion()
+            except Exception:
+                resultado = None
+            if resultado is not None:
+                with self.lock:
+                    self.valores = dict(resultado) if isinstance(resultado, dict) else {(): resultado}
+        return super().exportar()
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_DEFECTO):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        i = bisect.bisect_left(self.buckets, valor)
+        with self.lock:
+            serie = self.valores.get(clave)
+            if serie is None:
+                # [conteos por bucket (no acumulados)..., +Inf], suma
+                serie = self.valores[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][i] += 1
+            serie[1] += valor
+
+    def medir(self, **etiquetas):
+        """with HIST.medir(bot='MIGO'): ...  observa la duración del bloque."""
+        return _Cronometro(self, etiquetas)
+
+    def conteo(self, **etiquetas):
+        with self.lock:
+            serie = self.valores.get(self._clave(etiquetas))
+            return sum(serie[0]) if serie else 0
+
+    def exportar(self):
+        with self.lock:
+            items = sorted((c, (list(s[0]), s[1])) for c, s in self.valores.items())
+        lineas = self._cabecera()
+        for clave, (conteos, suma) in items:
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += n
+                le = 'le="' + _numero(limite) + '"'
+                lineas.append(f"{self.nombre}_bucket{_formato_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            etiquetas = _formato_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class _Cronometro:
+    def __init__(self, histograma, etiquetas):
+        self.histograma = histograma
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observe(time.perf_counter() - self.inicio, **self.etiquetas)
+        return False
+
+
+class Registro:
+    def __init__(self):
+        self.metricas = {}
+        self.lock = threading.Lock()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **kwargs):
+        with self.lock:
+            metrica = self.metricas.get(nombre)
+            if metrica is None:
+                metrica = self.metricas[nombre] = clase(nombre, ayuda, etiquetas, **kwargs)
+            elif type(metrica) is not clase:
+                raise ValueError(f"La métrica {nombre} ya existe como {metrica.tipo}")
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._obtener(Counter, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda, etiquetas=(), funcion=None):
+        return self._obtener(Gauge, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_DEFECTO):
+        return self._obtener(Histogram, nombre, ayuda, etiquetas, buckets=buckets)
+
+    def exportar(self):
+        with self.lock:
+            metricas = list(self.metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas += metrica.exportar()
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+contador = REGISTRO.contador
+medidor = REGISTRO.medidor
+histograma = REGISTRO.histograma
+exportar = REGISTRO.exportar
+
+# --- Métricas comunes ---
+ORDENES = contador("nexus_ordenes_total", "Órdenes/trabajos terminados por bot y resultado", ("bot", "resultado"))
+ESPERA_COLA = histograma("nexus_espera_cola_segundos", "Desde la creación de la orden hasta el inicio", ("bot",))
+DURACION = histograma("nexus_ejecucion_segundos", "Duración de la ejecución del bot", ("bot", "resultado"))
+EN_CURSO = medidor("nexus_trabajos_en_curso", "Trabajos ejecutándose ahora", ("bot",))
+PASO_SAP = histograma("nexus_paso_sap_segundos", "Duración de pasos/transacciones SAP dentro de un bot",
+                      ("bot", "paso"), buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300))
+
+
+def registrar_ejecucion(bot, espera_s, duracion_s, resultado):
+    if espera_s is not None and espera_s >= 0:
+        ESPERA_COLA.observe(espera_s, bot=bot)
+    DURACION.observe(duracion_s, bot=bot, resultado=resultado)
+    ORDENES.inc(bot=bot, resultado=resultado)
+
+
+def paso_sap(bot, paso):
+    """with paso_sap('MIGO', 'validar_origen'): ..."""
+    return PASO_SAP.medir(bot=bot, paso=paso)
+
+
+def registrar_carriles(scheduler):
+    """Cupos en uso y trabajos en cola por carril de un ResourceScheduler (leídos al exportar)."""
+    def campo(nombre):
+        return lambda: {(carril,): e[nombre] for carril, e in scheduler.estadisticas().items()}
+
+    medidor("nexus_carril_en_uso", "Cupos ocupados por carril de recurso", ("carril",), funcion=campo("en_uso"))
+    medidor("nexus_carril_en_cola", "Trabajos esperando por carril de recurso", ("carril",), funcion=campo("en_cola"))
+
+
+# --- Fotos en disco (para consultar sin la API) ---
+def ruta_snapshot(nombre):
+    return os.path.join(tempfile.gettempdir(), f"nexus_metrics_{nombre}.prom")
+
+
+def escribir_snapshot(nombre):
+    ruta = ruta_snapshot(nombre)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(f"# snapshot {nombre} pid={os.getpid()} ts={time.time():.0f}\n")
+        f.write(exportar())
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def iniciar_snapshots(nombre, intervalo_s=30):
+    """Escribe la foto cada `intervalo_s` y al salir del proceso."""
+    def bucle():
+        while True:
+            time.sleep(intervalo_s)
+            try:
+                escribir_snapshot(nombre)
+            except OSError:
+                pass
+
+    threading.Thread(target=bucle, daemon=True, name=f"metrics-{nombre}").start()
+    atexit.register(escribir_snapshot, nombre)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Muestra las métricas de la suite Nexus")
+    parser.add_argument("--url", help="Leer en vivo desde la API (ej: http://localhost:8000/metrics)")
+    args = parser.parse_args()
+
+    if args.url:
+        from nexus_http import http
+        print(http.get(args.url).text, end="")
+    else:
+        rutas = sorted(glob.glob(ruta_snapshot("*")))
+        if not rutas:
+            print(f"⚠️ No hay fotos de métricas en {tempfile.gettempdir()}")
+        for ruta in rutas:
+            edad = time.time() - os.path.getmtime(ruta)
+            print(f"# === {ruta} (hace {edad:.0f}s) ===")
+            with open(ruta, "r", encoding="utf-8") as f:
+                print(f.read(), end="")
@@ -0,0 +1,251 @@
+"""
+Bandeja de salida local (SQLite) para los cambios de estado de las órdenes.
+
+El estado final de una orden (success/error, result_payload) era un PATCH
+directo: si la red fallaba en ese momento, la orden quedaba 'running' y el
+resultado se perdía. Ahora:
+
+- encolar(url, cambios) guarda el PATCH en SQLite (WAL) y vuelve al instante;
+  el worker sigue procesando aunque no haya red.
+- Un hilo de fondo envía los mensajes en el orden en que se encolaron, por
+  lotes: los cambios consecutivos sobre la misma URL se fusionan en un solo
+  PATCH (PATCH es un merge, el resultado es el mismo).
+- Errores de red, 429 y 5xx: se reintenta el mismo mensaje con espera
+  exponencial (hasta `espera_max_s`) sin adelantar los siguientes.
+- Otros 4xx no se van a arreglar reintentando: se descartan y se avisa.
+- Un PATCH que no tocó ninguna fila no cuenta como enviado: se pide
+  return=representation y una respuesta vacía (p. ej. el lease_token del
+  filtro ya no existe porque la orden se recicló durante un corte largo) se
+  reintenta con la URL de `respaldo` si el mensaje la trae. Si tampoco aplica
+  se cuenta en `huerfanos` y se avisa, en vez de perder el resultado callado.
+- `al_terminar` (opcional) se llama cuando el mensaje deja la bandeja
+  (aplicado, huérfano o descartado); worker_sap lo usa para seguir
+  renovando el lease de la orden hasta que su estado final llegue a la base.
+- Lo que quedó sin enviar al cerrar el proceso se reenvía al volver a abrir
+  la bandeja (reinicio del worker, corte de luz).
+- Un solo proceso envía: encolar() funciona desde cualquiera, pero el hilo
+  de envío (iniciar(), lo llama worker_sap.start_worker) toma antes un
+  bloqueo exclusivo sobre <ruta>.lock. Un segundo drenador queda en espera
+  y sólo toma el relevo si el primero muere, así no se duplican PATCH ni se
+  desordenan los de una misma orden.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from nexus_http import http
+from nexus_bloqueo import BloqueoArchivo
+
+REINTENTABLES = (408, 425, 429, 500, 502, 503, 504)
+
+
+class Outbox:
+    def __init__(self, headers, ruta=None, lote=50, espera_max_s=60):
+        self.headers = headers
+        self.ruta = ruta or os.getenv("NEXUS_OUTBOX_DB") or os.path.join(tempfile.gettempdir(), "nexus_outbox.db")
+        self.lote = lote
+        self.espera_max_s = espera_max_s
+
+        self.db = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")  # pocos mensajes por orden: priorizar durabilidad
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS mensajes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT NOT NULL,"
+            " cuerpo TEXT NOT NULL,"
+            " creado REAL NOT NULL)"
+        )
+        # Bandejas creadas por versiones anteriores no tienen la columna
+        columnas = {fila[1] for fila in self.db.execute("PRAGMA table_info(mensajes)")}
+        if "respaldo" not in columnas:
+            self.db.execute("ALTER TABLE mensajes ADD COLUMN respaldo TEXT")
+        self.cabeceras = dict(headers)
+        self.cabeceras["Prefer"] = "return=representation"
+        self.cond = threading.Condition()
+        self._en_vuelo = False
+        self._hilo = None
+        self._avisos = {}      # id del mensaje -> al_terminar (sólo en memoria)
+        self.drenando = False  # este proceso tiene el bloqueo y es el que envía
+
+        self.encolados = 0
+        self.enviados = 0
+        self.peticiones = 0
+        self.reintentos = 0
+        self.descartados = 0
+        self.huerfanos = 0
+        self.ultimo_error = None
+
+    def iniciar(self):
+        """Arranca el hilo de envío (idempotente). Devuelve la bandeja."""
+        with self.cond:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="Outbox", daemon=True)
+                self._hilo.start()
+        return self
+
+    # --- Productor ---
+    def encolar(self, url, cambios, respaldo=None, al_terminar=None):
+        """
+        Guarda el PATCH `cambios` sobre `url`. `respaldo`: URL a la que se
+        reenvían los mismos cambios si `url` no afecta ninguna fila.
+        """
+        cuerpo = json.dumps(cambios, default=str)
+        with self.cond:
+            id_ = self.db.execute("INSERT INTO mensajes (url, cuerpo, creado, respaldo) VALUES (?, ?, ?, ?)",
+                                  (url, cuerpo, time.time(), respaldo)).lastrowid
+            if al_terminar is not None:
+                self._avisos[id_] = al_terminar
+            self.encolados += 1
+            self.cond.notify_all()
+
+    def pendientes(self):
+        with self.cond:
+            return self.db.execute("SELECT COUNT(*) FROM mensajes").fetchone()[0]
+
+    def antiguedad_s(self):
+        """Edad del mensaje más viejo sin enviar (0 si no hay)."""
+        with self.cond:
+            fila = self.db.execute("SELECT MIN(creado) FROM mensajes").fetchone()
+        return time.time() - fila[0] if fila and fila[0] else 0.0
+
+    def drenar(self, timeout=15):
+        """Espera a que se envíe todo lo encolado. True si se vació."""
+        fin = time.time() + timeout
+        with self.cond:
+            self.cond.notify_all()
+            while self._contar() or self._en_vuelo:
+                restante = fin - time.time()
+                if restante <= 0:
+                    return False
+                self.cond.wait(min(restante, 0.5))
+        return True
+
+    def estadisticas(self):
+        return {
+            "encolados": self.encolados,
+            "enviados": self.enviados,
+            "peticiones": self.peticiones,
+            "reintentos": self.reintentos,
+            "descartados": self.descartados,
+            "huerfanos": self.huerfanos,
+            "pendientes": self.pendientes(),
+            "drenando": self.drenando,
+            "ultimo_error": self.ultimo_error,
+        }
+
+    # --- Hilo de envío ---
+    def _contar(self):
+        # Con self.cond tomado
+        return self.db.execute("SELECT COUNT(*) FROM mensajes").fetchone()[0]
+
+    def _bucle(self):
+        # El bloqueo no se suelta mientras viva el proceso: si muere, el SO lo libera
+        bloqueo = BloqueoArchivo(self.ruta + ".lock")
+        bloqueo.__enter__()
+        self.drenando = True
+        espera = 0.5
+        while True:
+            with self.cond:
+                filas = self.db.execute("SELECT id, url, cuerpo, respaldo FROM mensajes ORDER BY id LIMIT ?",
+                                        (self.lote,)).fetchall()
+                if not filas:
+                    self.cond.wait(5)
+                    continue
+                self._en_vuelo = True
+            try:
+                enviado = self._enviar_lote(filas)
+            finally:
+                with self.cond:
+                    self._en_vuelo = False
+                    self.cond.notify_all()
+            if enviado:
+                if self.ultimo_error is not None:
+                    print("✅ Outbox: conexión recuperada, cambios pendientes reenviados en orden")
+                    self.ultimo_error = None
+                espera = 0.5
+            else:
+                # Sin red: reintentar el mismo mensaje más tarde, sin adelantar otros
+                time.sleep(espera)
+                espera = min(espera * 2, self.espera_max_s)
+
+    def _enviar_lote(self, filas):
+        """Envía los grupos en orden; True si se avanzó hasta el final del lote."""
+        for url, ids, cambios, respaldo in _agrupar(filas):
+            response = self._patch(url, cambios)
+            if response is None:
+                return False
+            if response.status_code >= 400:
+                self.descartados += len(ids)
+                print(f"⚠️ Outbox: cambio descartado ({response.status_code} - {response.text[:200]}): {url} {cambios}")
+            elif _aplicado(response):
+                self.enviados += len(ids)
+            else:
+                # La fila ya no coincide con el filtro (lease reciclado durante el corte)
+                response = self._patch(respaldo, cambios) if respaldo else None
+                if respaldo and response is None:
+                    return False
+                if response is not None and response.status_code < 400 and _aplicado(response):
+                    self.enviados += len(ids)
+                    print(f"⚠️ Outbox: {url} ya no aplicaba (reclamo vencido); cambio aplicado vía {respaldo}")
+                else:
+                    self.huerfanos += len(ids)
+                    print(f"⚠️ Outbox: cambio sin fila que actualizar, no se aplicó: {url} {sorted(cambios)}")
+            with self.cond:
+                self.db.execute(f"DELETE FROM mensajes WHERE id IN ({','.join('?' * len(ids))})", ids)
+                avisos = [self._avisos.pop(i) for i in ids if i in self._avisos]
+            for aviso in avisos:
+                try:
+                    aviso()
+                except Exception as e:
+                    print(f"⚠️ Outbox: error en al_terminar: {e}")
+        return True
+
+    def _patch(self, url, cambios):
+        """La respuesta, o None si hay que reintentar más tarde (red, 429, 5xx)."""
+        separador = "&" if "?" in url else "?"
+        try:
+            response = http.patch(f"{url}{separador}select=id", headers=self.cabeceras, json=cambios, timeout=(5, 30))
+            self.peticiones += 1
+        except Exception as e:
+            self._fallo(f"{type(e).__name__}: {e}")
+            return None
+        if response.status_code in REINTENTABLES:
+            self._fallo(f"{response.status_code} - {response.text[:200]}")
+            return None
+        return response
+
+    def _fallo(self, error):
+        if self.ultimo_error is None:
+            print(f"⚠️ Outbox: sin conexión con Supabase ({error}); los cambios quedan guardados")
+        self.ultimo_error = error
+        self.reintentos += 1
+
+
+def _agrupar(filas):
+    """
+    [(url, [ids], cambios fusionados, respaldo)] uniendo mensajes consecutivos
+    a la misma URL (el respaldo del último que lo traiga).
+    """
+    grupos = []
+    for id_, url, cuerpo, respaldo in filas:
+        if grupos and grupos[-1][0] == url:
+            grupos[-1][1].append(id_)
+            grupos[-1][2].update(json.loads(cuerpo))
+            grupos[-1][3] = respaldo or grupos[-1][3]
+        else:
+            grupos.append([url, [id_], json.loads(cuerpo), respaldo])
+    return grupos
+
+
+def _aplicado(response):
+    """True si el PATCH afectó alguna fila (204: el servidor no la devolvió, se asume que sí)."""
+    if response.status_code == 204:
+        return True
+    try:
+        return bool(response.json())
+    except ValueError:
+        return True
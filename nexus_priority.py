@@ -0,0 +1,94 @@
+"""
+Orden de atención de las órdenes pendientes: prioridad, plazo y envejecimiento.
+
+procesar_ordenes atendía las órdenes en el orden en que llegaban, así que un
+AUDITOR urgente pedido por correo esperaba detrás de una carga MIGO o una
+extracción TRANSPORTE. Ahora las pendientes se ordenan por:
+
+1. Banda de prioridad (0 = urgente, 1 = alta, 2 = normal, 3 = baja).
+   Sale de la columna `prioridad` de la orden (o parametros.prioridad); si no
+   viene, del bot: valor por defecto en nexus_bots, sobreescribible en
+   settings.json con {"PrioridadesBot": {"AUDITOR": 0, ...}}.
+2. Dentro de la banda, plazo más cercano primero (EDF) según `fecha_limite`
+   (o parametros.fecha_limite); las órdenes sin plazo van después.
+3. Por último, la más antigua primero.
+
+Contra la inanición, cada ENVEJECIMIENTO_S de espera sube la orden una banda
+(NEXUS_ENVEJECIMIENTO_S, 10 min por defecto): una orden BAJA llega a URGENTE
+tras 30 minutos en cola.
+
+La simulación Tools/sim_prioridades.py compara este orden con FIFO.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from nexus_bots import BOTS
+
+URGENTE, ALTA, NORMAL, BAJA = 0, 1, 2, 3
+NOMBRES = {URGENTE: "urgente", ALTA: "alta", NORMAL: "normal", BAJA: "baja"}
+
+ENVEJECIMIENTO_S = float(os.getenv("NEXUS_ENVEJECIMIENTO_S", "600"))
+SETTINGS_FILE = "settings.json"
+
+_prioridades = None
+
+
+def prioridades_bot():
+    """{bot: prioridad por defecto}: nexus_bots + PrioridadesBot de settings.json."""
+    global _prioridades
+    if _prioridades is None:
+        prioridades = {bot_id: bot.prioridad for bot_id, bot in BOTS.items()}
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                prioridades.update({k: int(v) for k, v in json.load(f).get("PrioridadesBot", {}).items()})
+        except (OSError, ValueError, AttributeError):
+            pass
+        _prioridades = prioridades
+    return _prioridades
+
+
+def _epoch(valor):
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return datetime.fromisoformat(str(valor).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _campo(datos, nombre):
+    valor = datos.get(nombre)
+    if valor is None:
+        valor = (datos.get('parametros') or {}).get(nombre)
+    return valor
+
+
+def prioridad_orden(datos):
+    """Banda declarada de la orden (sin envejecimiento)."""
+    prioridad = _campo(datos, 'prioridad')
+    if prioridad is None:
+        return prioridades_bot().get(datos.get('tipo_bot'), NORMAL)
+    try:
+        return max(URGENTE, min(BAJA, int(prioridad)))
+    except (TypeError, ValueError):
+        return NORMAL
+
+
+def clave_orden(datos, ahora=None):
+    """Clave de orden: (banda efectiva, plazo, creación). Menor = antes."""
+    ahora = time.time() if ahora is None else ahora
+    creada = _epoch(datos.get('fecha_creacion')) or ahora
+    banda = prioridad_orden(datos)
+    if ENVEJECIMIENTO_S > 0:
+        banda = max(URGENTE, banda - int(max(ahora - creada, 0) // ENVEJECIMIENTO_S))
+    plazo = _epoch(_campo(datos, 'fecha_limite'))
+    return banda, plazo if plazo is not None else float("inf"), creada
+
+
+def ordenar_ordenes(ordenes, ahora=None):
+    ahora = time.time() if ahora is None else ahora
+    return sorted(ordenes, key=lambda datos: clave_orden(datos, ahora))
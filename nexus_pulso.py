@@ -0,0 +1,66 @@
+"""
+Pulso de vida de los servicios para el supervisor (nexus_manager).
+
+Cada worker escribe su pulso desde su bucle principal (no desde un hilo
+aparte): si el bucle se queda pegado en una llamada COM o de red, el pulso
+deja de avanzar y el supervisor reinicia el servicio.
+
+    from nexus_pulso import latir, dormir
+    while True:
+        latir("worker_sap", ordenes=n)
+        ...
+        dormir("worker_zonales", 3600)   # sleep largo que sigue latiendo
+
+Los pulsos son archivos JSON en %TEMP%/nexus_pulsos (NEXUS_PULSOS_DIR).
+"""
+import json
+import os
+import tempfile
+import time
+
+DIRECTORIO = os.getenv("NEXUS_PULSOS_DIR") or os.path.join(tempfile.gettempdir(), "nexus_pulsos")
+
+# Un bucle que gira rápido no reescribe el archivo más de una vez por esto
+MIN_INTERVALO_S = 1.0
+
+_ultimo = {}
+
+
+def ruta_pulso(nombre):
+    return os.path.join(DIRECTORIO, f"{nombre}.json")
+
+
+def latir(nombre, **datos):
+    """Marca al servicio `nombre` como vivo ahora. Nunca lanza: un disco lleno no debe tumbar el worker."""
+    ahora = time.time()
+    if ahora - _ultimo.get(nombre, 0) < MIN_INTERVALO_S:
+        return
+    _ultimo[nombre] = ahora
+    ruta = ruta_pulso(nombre)
+    try:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "ts": ahora, **datos}, f, default=str)
+        os.replace(ruta + ".tmp", ruta)
+    except OSError:
+        pass
+
+
+def dormir(nombre, segundos, cada_s=30):
+    """time.sleep(segundos) que sigue latiendo: dormir no es estar colgado."""
+    fin = time.monotonic() + segundos
+    while True:
+        latir(nombre)
+        resto = fin - time.monotonic()
+        if resto <= 0:
+            return
+        time.sleep(min(cada_s, resto))
+
+
+def leer_pulso(nombre):
+    """El último pulso de `nombre` ({"pid", "ts", ...}) o None si no hay."""
+    try:
+        with open(ruta_pulso(nombre), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
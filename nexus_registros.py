@@ -0,0 +1,248 @@
+"""
+Registros estructurados de los servicios del supervisor (nexus_manager).
+
+Cada línea que imprime un servicio se vuelve un registro
+{"ts", "servicio", "nivel", "mensaje", "seq"} y va a dos lugares:
+
+- Un buffer circular en memoria por servicio (las últimas `capacidad`
+  líneas) que el supervisor sirve por HTTP sin releer archivos:
+
+      curl "http://127.0.0.1:8766/logs/WORKER%20SAP?n=50&nivel=WARNING"
+      python nexus_registros.py "WORKER SAP"        # seguir en vivo (tail -f)
+
+- Un archivo JSON Lines por servicio en %TEMP%/nexus_logs (NEXUS_LOGS_DIR),
+  rotado por tamaño (`max_bytes`) y por día, con `respaldos` archivos viejos.
+
+La escritura a disco es de un hilo aparte con cola acotada: si el disco (o
+OneDrive) se traba, se descartan líneas del archivo y se cuentan, pero nunca
+se deja de leer la salida de los servicios (un pipe lleno los bloquearía).
+"""
+import asyncio
+import glob
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from nexus_metrics import contador
+
+DIRECTORIO = os.getenv("NEXUS_LOGS_DIR") or os.path.join(tempfile.gettempdir(), "nexus_logs")
+CAPACIDAD = int(os.getenv("NEXUS_LOGS_BUFFER", "2000"))
+
+NIVELES = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+DESCARTADAS = contador("nexus_registros_descartados_total", "Líneas de servicios no escritas a disco (cola llena)",
+                       ("servicio",))
+
+_ERROR = re.compile(r"❌|⛔|\[ERROR\]|\[HUNG\]|\[CRASHLOOP\]|Traceback|Error critico|\bERROR\b")
+_WARNING = re.compile(r"⚠️|\[WARN\]|\bWARNING\b")
+
+
+def nivel_de(mensaje):
+    """Nivel según las marcas que ya usan los servicios en sus print()."""
+    if _ERROR.search(mensaje):
+        return "ERROR"
+    if _WARNING.search(mensaje):
+        return "WARNING"
+    return "INFO"
+
+
+def slug(nombre):
+    """'WORKER SAP' -> 'worker_sap' (nombre de archivo y de URL)."""
+    return re.sub(r"[^a-z0-9]+", "_", nombre.lower()).strip("_")
+
+
+class ArchivoRotativo:
+    """<directorio>/<nombre>.jsonl rotado al pasar `max_bytes` o al cambiar el día."""
+
+    def __init__(self, directorio, nombre, max_bytes=10 * 1024 * 1024, respaldos=14):
+        self.directorio = directorio
+        self.nombre = nombre
+        self.max_bytes = max_bytes
+        self.respaldos = respaldos
+        self.ruta = os.path.join(directorio, f"{nombre}.jsonl")
+        self._archivo = None
+        self._dia = None
+
+    def escribir(self, lineas):
+        dia = datetime.now().strftime("%Y%m%d")
+        if self._archivo is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._abrir()
+        if dia != self._dia or self._archivo.tell() >= self.max_bytes:
+            self._rotar()
+        self._archivo.write("".join(lineas))
+        self._archivo.flush()
+
+    def _abrir(self):
+        self._archivo = open(self.ruta, "a", encoding="utf-8")
+        try:
+            # Un archivo de ayer que quedó de la ejecución anterior rota ya
+            self._dia = datetime.fromtimestamp(os.path.getmtime(self.ruta)).strftime("%Y%m%d") \
+                if self._archivo.tell() else datetime.now().strftime("%Y%m%d")
+        except OSError:
+            self._dia = datetime.now().strftime("%Y%m%d")
+
+    def _rotar(self):
+        self._archivo.close()
+        if os.path.getsize(self.ruta):
+            destino = os.path.join(self.directorio, f"{self.nombre}.{datetime.now():%Y%m%d-%H%M%S-%f}.jsonl")
+            try:
+                os.replace(self.ruta, destino)
+            except OSError:
+                pass
+        viejos = sorted(glob.glob(os.path.join(self.directorio, f"{self.nombre}.*.jsonl")))
+        for ruta in viejos[:-self.respaldos or None]:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self._dia = datetime.now().strftime("%Y%m%d")
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+
+class EscritorRegistros:
+    """Un hilo que vuelca a disco, en lotes, los registros de todos los servicios."""
+
+    def __init__(self, directorio=None, max_bytes=10 * 1024 * 1024, respaldos=14, max_cola=20000):
+        self.directorio = directorio or DIRECTORIO
+        self.max_bytes = max_bytes
+        self.respaldos = respaldos
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.archivos = {}
+        self.escritas = 0
+        self.descartadas = 0
+        self._hilo = threading.Thread(target=self._bucle, daemon=True, name="nexus-registros")
+        self._hilo.start()
+
+    def enviar(self, registro):
+        """No bloquea nunca: con la cola llena la línea sólo queda en memoria."""
+        try:
+            self.cola.put_nowait(registro)
+        except queue.Full:
+            self.descartadas += 1
+            DESCARTADAS.inc(servicio=registro["servicio"])
+
+    def cerrar(self, timeout=5):
+        self.cola.put(None)
+        self._hilo.join(timeout)
+
+    def _bucle(self):
+        while True:
+            lote = [self.cola.get()]
+            try:
+                while len(lote) < 1000:
+                    lote.append(self.cola.get_nowait())
+            except queue.Empty:
+                pass
+            fin = None in lote
+            por_servicio = {}
+            for registro in lote:
+                if registro is not None:
+                    por_servicio.setdefault(slug(registro["servicio"]), []).append(
+                        json.dumps(registro, ensure_ascii=False) + "\n")
+            for nombre, lineas in por_servicio.items():
+                archivo = self.archivos.get(nombre)
+                if archivo is None:
+                    archivo = self.archivos[nombre] = ArchivoRotativo(self.directorio, nombre, self.max_bytes,
+                                                                      self.respaldos)
+                try:
+                    archivo.escribir(lineas)
+                    self.escritas += len(lineas)
+                except OSError as e:
+                    self.descartadas += len(lineas)
+                    print(f"⚠️ No se pudo escribir el log de {nombre}: {e}")
+            if fin:
+                for archivo in self.archivos.values():
+                    archivo.cerrar()
+                return
+
+
+class RegistroServicio:
+    """Buffer circular de las últimas líneas de un servicio (se usa desde el event loop)."""
+
+    def __init__(self, servicio, escritor=None, capacidad=None):
+        self.servicio = servicio
+        self.escritor = escritor
+        self.lineas = deque(maxlen=capacidad or CAPACIDAD)
+        self.seq = 0
+        self._nuevo = asyncio.Event()
+
+    def agregar(self, mensaje, nivel=None):
+        mensaje = mensaje.rstrip()
+        if not mensaje.strip():
+            return None
+        self.seq += 1
+        registro = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "servicio": self.servicio,
+            "nivel": nivel or nivel_de(mensaje),
+            "mensaje": mensaje,
+            "seq": self.seq,
+        }
+        self.lineas.append(registro)
+        if self.escritor is not None:
+            self.escritor.enviar(registro)
+        self._nuevo.set()
+        self._nuevo = asyncio.Event()
+        return registro
+
+    def consultar(self, n=100, nivel=None, desde=0):
+        """Las últimas `n` líneas con seq > desde y nivel >= `nivel`."""
+        minimo = NIVELES.get((nivel or "").upper(), 0)
+        filtradas = [r for r in self.lineas if r["seq"] > desde and NIVELES[r["nivel"]] >= minimo]
+        return filtradas[-n:] if n else filtradas
+
+    async def esperar(self, desde, timeout):
+        """Espera (long-poll) hasta que haya una línea con seq > desde o pase `timeout`."""
+        if self.seq <= desde:
+            try:
+                await asyncio.wait_for(self._nuevo.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def seguir(servicio, url="http://127.0.0.1:8766", n=20, nivel=None):
+    """tail -f de un servicio contra el supervisor."""
+    from urllib.parse import quote
+    from nexus_http import http
+    desde = 0
+    primero = True
+    while True:
+        params = {"n": n if primero else 0, "desde": desde, "esperar": 0 if primero else 25}
+        if nivel:
+            params["nivel"] = nivel
+        try:
+            datos = http.get(f"{url}/logs/{quote(servicio)}", params=params, timeout=35).json()
+        except Exception as e:
+            print(f"⚠️ Sin conexión con el supervisor ({e}); reintentando...")
+            time.sleep(3)
+            continue
+        for registro in datos.get("lineas", []):
+            print(f"[{registro['ts'][11:19]}] {registro['nivel']:<7} {registro['mensaje']}")
+        desde = datos.get("ultimo", desde)
+        primero = False
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sigue en vivo los logs de un servicio del supervisor")
+    parser.add_argument("servicio")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{os.getenv('NEXUS_MANAGER_PUERTO', '8766')}")
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--nivel", choices=list(NIVELES))
+    args = parser.parse_args()
+    try:
+        seguir(args.servicio, args.url, args.n, args.nivel)
+    except KeyboardInterrupt:
+        pass
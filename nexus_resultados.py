@@ -0,0 +1,190 @@
+"""
+Caché de resultados de bots de reporte (AUDITOR, TRANSPORTE de fechas pasadas).
+
+El mismo AUDITOR de un almacén se pide varias veces en pocos minutos y cada
+pedido repetía la extracción MB52/MB51 completa. Los bots con `cache` en
+nexus_bots (opt-in) pasan por aquí:
+
+- Clave: bot + parámetros normalizados (nexus_bots.clave_resultado).
+- Fresco (edad <= fresco_s): se entrega el resultado guardado sin correr el bot.
+- Obsoleto (hasta fresco_s + revalidar_s): se entrega el guardado y se pide
+  un refresco en segundo plano al `revalidador` (stale-while-revalidate).
+- Con el parámetro sinCache=true la orden corre igual y actualiza la caché.
+- Si el resultado es un archivo (el reporte), se guarda una copia: un
+  acierto devuelve el original si sigue intacto o, si no, la copia. Las
+  copias ocupan como máximo `max_bytes` (se expulsan las menos usadas).
+
+El índice es SQLite (WAL) para que worker_sap y nexus_server, en el mismo
+PC, compartan la caché.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from nexus_metrics import contador
+
+CONSULTAS = contador("nexus_cache_resultados_total", "Consultas a la caché de resultados", ("bot", "estado"))
+
+# Un refresco pedido y no terminado no se vuelve a pedir antes de esto
+REVALIDANDO_MAX_S = 600
+
+
+class ResultCache:
+    def __init__(self, directorio=None, max_bytes=512 * 1024 * 1024, revalidador=None):
+        """revalidador(bot_type, params): encola una ejecución sinCache en segundo plano."""
+        self.directorio = directorio or os.getenv("NEXUS_RESULTADOS_DIR") or \
+            os.path.join(tempfile.gettempdir(), "nexus_resultados")
+        self.max_bytes = max_bytes
+        self.revalidador = revalidador
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.directorio, "indice.db"), check_same_thread=False,
+                                  isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS resultados ("
+            " clave TEXT PRIMARY KEY,"
+            " bot TEXT NOT NULL,"
+            " resultado TEXT,"
+            " origen TEXT,"           # archivo que devolvió el bot
+            " origen_mtime REAL,"
+            " artefacto TEXT,"        # copia del archivo en la caché
+            " bytes INTEGER NOT NULL DEFAULT 0,"
+            " creado REAL NOT NULL,"
+            " ultimo_uso REAL NOT NULL)"
+        )
+        self._revalidando = {}
+
+        self.aciertos = 0
+        self.obsoletos = 0
+        self.fallos = 0
+        self.expulsados = 0
+
+    # --- API ---
+    def buscar(self, clave, cache, bot_type=""):
+        """(resultado, estado, edad_s) con estado 'fresco' | 'obsoleto' | None (fallo)."""
+        with self.lock:
+            fila = self.db.execute(
+                "SELECT resultado, origen, origen_mtime, artefacto, creado FROM resultados WHERE clave = ?",
+                (clave,)).fetchone()
+            estado, resultado, edad = None, None, None
+            if fila is not None:
+                resultado, origen, origen_mtime, artefacto, creado = fila
+                resultado = json.loads(resultado)
+                edad = time.time() - creado
+                if artefacto:
+                    resultado = _archivo_vigente(origen, origen_mtime, artefacto)
+                if resultado is None or edad > cache.fresco_s + cache.revalidar_s:
+                    self._borrar(clave)
+                else:
+                    estado = "fresco" if edad <= cache.fresco_s else "obsoleto"
+                    self.db.execute("UPDATE resultados SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+            if estado == "fresco":
+                self.aciertos += 1
+            elif estado == "obsoleto":
+                self.obsoletos += 1
+            else:
+                self.fallos += 1
+        CONSULTAS.inc(bot=bot_type, estado=estado or "fallo")
+        return resultado, estado, edad
+
+    def guardar(self, clave, bot_type, resultado):
+        """Guarda el resultado de una ejecución exitosa (None no se guarda: los bots devuelven None al fallar)."""
+        if resultado is None:
+            return
+        origen = origen_mtime = artefacto = None
+        tamano = 0
+        if isinstance(resultado, str) and os.path.isfile(resultado):
+            origen, origen_mtime = resultado, os.path.getmtime(resultado)
+            nombre = hashlib.sha1(clave.encode("utf-8")).hexdigest()[:16] + "_" + os.path.basename(resultado)
+            artefacto = os.path.join(self.directorio, nombre)
+            shutil.copyfile(resultado, artefacto + ".part")
+            os.replace(artefacto + ".part", artefacto)
+            tamano = os.path.getsize(artefacto)
+        ahora = time.time()
+        with self.lock:
+            anterior = self.db.execute("SELECT artefacto FROM resultados WHERE clave = ?", (clave,)).fetchone()
+            if anterior and anterior[0] and anterior[0] != artefacto:
+                _eliminar(anterior[0])
+            self.db.execute(
+                "INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (clave, bot_type, json.dumps(resultado, default=str), origen, origen_mtime, artefacto, tamano,
+                 ahora, ahora))
+            self._revalidando.pop(clave, None)
+            self._expulsar()
+
+    def revalidar(self, clave, bot_type, params):
+        """Pide (una sola vez por clave) que se refresque un resultado obsoleto."""
+        if self.revalidador is None:
+            return False
+        with self.lock:
+            if time.time() - self._revalidando.get(clave, 0) < REVALIDANDO_MAX_S:
+                return False
+            self._revalidando[clave] = time.time()
+        self.revalidador(bot_type, {**(params or {}), "sinCache": True})
+        return True
+
+    def invalidar(self, bot_type=None):
+        """Borra las entradas de un bot (o todas). Devuelve cuántas."""
+        with self.lock:
+            if bot_type:
+                filas = self.db.execute("SELECT clave FROM resultados WHERE bot = ?", (bot_type,)).fetchall()
+            else:
+                filas = self.db.execute("SELECT clave FROM resultados").fetchall()
+            for (clave,) in filas:
+                self._borrar(clave)
+            return len(filas)
+
+    def estadisticas(self):
+        with self.lock:
+            entradas, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM resultados").fetchone()
+            return {
+                "entradas": entradas,
+                "bytes": total,
+                "aciertos": self.aciertos,
+                "obsoletos": self.obsoletos,
+                "fallos": self.fallos,
+                "expulsados": self.expulsados,
+            }
+
+    # --- internos (con self.lock tomado) ---
+    def _borrar(self, clave):
+        fila = self.db.execute("SELECT artefacto FROM resultados WHERE clave = ?", (clave,)).fetchone()
+        if fila and fila[0]:
+            _eliminar(fila[0])
+        self.db.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+
+    def _expulsar(self):
+        total = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for clave, tamano in self.db.execute(
+                "SELECT clave, bytes FROM resultados WHERE bytes > 0 ORDER BY ultimo_uso").fetchall():
+            self._borrar(clave)
+            self.expulsados += 1
+            total -= tamano
+            if total <= self.max_bytes:
+                break
+
+
+def _archivo_vigente(origen, origen_mtime, artefacto):
+    """El archivo original si no cambió; si no, la copia guardada; None si no queda ninguno."""
+    try:
+        if origen and os.path.getmtime(origen) == origen_mtime:
+            return origen
+    except OSError:
+        pass
+    return artefacto if os.path.isfile(artefacto) else None
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
@@ -0,0 +1,247 @@
+"""
+Planificador por clases de recurso para worker_sap.
+
+Cada tipo de bot declara en nexus_bots los recursos que usa: la sesión SAP GUI,
+Outlook, la instancia COM de Excel o sólo CPU. Los trabajos que no comparten
+recursos corren en paralelo en un pool de hilos; los que chocan se serializan.
+
+Ejemplo: un ANALISIS_ZONALES (sólo pandas) ya no espera detrás de una carga
+MIGO de 20 minutos, pero dos bots SAP nunca pelean por la misma sesión.
+
+Reglas de despacho (FIFO con reserva):
+- Un trabajo arranca si todos sus recursos tienen cupo libre.
+- Un trabajo en cola reserva sus recursos frente a los que llegaron después,
+  para que un MIGO no quede postergado para siempre por bots más cortos.
+
+Cada recurso es un "carril" con estadísticas de espera en cola y utilización.
+
+Hilos fijos por carril: cada carril tiene tantos hilos propios como cupos y
+un trabajo corre en un hilo de su carril principal (el primero de sus
+recursos en el orden de CAPACIDADES: SAP, Outlook, Excel, CPU). Los objetos
+COM pertenecen al hilo que los creó, así un bot SAP siempre vuelve al mismo
+hilo y nexus_botpool encuentra su instancia caliente. periodico(fn) corre fn
+en cada uno de esos hilos cada tanto (p. ej. expirar instancias ociosas en el
+apartment que las creó).
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+
+SAP = "sap"
+OUTLOOK = "outlook"
+EXCEL = "excel"
+CPU = "cpu"
+
+# Cupo por carril: los recursos GUI/COM son exclusivos
+CAPACIDADES = {SAP: 1, OUTLOOK: 1, EXCEL: 1, CPU: 2}
+
+
+class _Carril:
+    def __init__(self, nombre, capacidad):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.en_uso = 0
+        self.trabajos = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.ocupado_total = 0.0
+        self._desde = None  # inicio del tramo con en_uso > 0
+
+    def tomar(self, espera, ahora):
+        if self.en_uso == 0:
+            self._desde = ahora
+        self.en_uso += 1
+        self.trabajos += 1
+        self.espera_total += espera
+        self.espera_max = max(self.espera_max, espera)
+
+    def liberar(self, ahora):
+        self.en_uso -= 1
+        if self.en_uso == 0 and self._desde is not None:
+            self.ocupado_total += ahora - self._desde
+            self._desde = None
+
+    def ocupado(self, ahora):
+        return self.ocupado_total + (ahora - self._desde if self._desde is not None else 0.0)
+
+
+class _Trabajo:
+    def __init__(self, etiqueta, recursos, fn, args, kwargs):
+        self.etiqueta = etiqueta
+        self.recursos = recursos
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.encolado = time.time()
+        # Como asyncio.to_thread: el trabajo ve las variables de contexto de
+        # quien lo envió (p. ej. la captura de logs de nexus_capture)
+        self.contexto = contextvars.copy_context()
+        self.hilo = None  # _Hilo del carril donde corre
+
+
+class _Hilo:
+    """Un hilo fijo de un carril (executor de un solo hilo)."""
+
+    def __init__(self, nombre):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=nombre)
+        self.ocupado = False
+        self.ultima = None  # etiqueta del último trabajo que corrió aquí
+        self.barrido = None  # Future del último periodico() encolado
+
+
+class ResourceScheduler:
+    def __init__(self, capacidades=None):
+        self.capacidades = dict(capacidades or CAPACIDADES)
+        self.carriles = {n: _Carril(n, c) for n, c in self.capacidades.items()}
+        # Nunca puede haber más trabajos simultáneos que la suma de cupos
+        self.hilos = {n: [_Hilo(f"Nexus-{n}-{i}") for i in range(c)] for n, c in self.capacidades.items()}
+        self._sin_recursos = None  # trabajos sin recursos: sin límite ni hilo fijo
+        self.cola = []
+        self.cond = threading.Condition()
+        self.inicio = time.time()
+        self._parar = threading.Event()
+
+    def disponible(self, recursos):
+        """True si un trabajo con estos recursos arrancaría ahora mismo."""
+        with self.cond:
+            return self._puede_iniciar(recursos, self._reservados())
+
+    def enviar(self, etiqueta, recursos, fn, *args, encolado=None, **kwargs):
+        """
+        Encola fn(*args, **kwargs) y devuelve un Future.
+        `encolado` (epoch) permite contar la espera desde antes de llegar aquí,
+        p. ej. desde la fecha de creación de la orden.
+        """
+        trabajo = _Trabajo(etiqueta, frozenset(recursos), fn, args, kwargs)
+        if encolado:
+            trabajo.encolado = min(trabajo.encolado, encolado)
+        desconocidos = trabajo.recursos - set(self.carriles)
+        if desconocidos:
+            raise ValueError(f"Recursos desconocidos: {desconocidos}")
+        with self.cond:
+            self.cola.append(trabajo)
+            self._despachar()
+        return trabajo.future
+
+    def esperar_cambio(self, timeout=None):
+        """Bloquea hasta que termine algún trabajo (o venza el timeout)."""
+        with self.cond:
+            self.cond.wait(timeout)
+
+    def periodico(self, intervalo_s, fn):
+        """
+        Cada `intervalo_s` encola fn() en cada hilo de carril (tras el trabajo
+        que esté corriendo en él). Si el anterior aún no corrió, no se repite.
+        """
+        def bucle():
+            while not self._parar.wait(intervalo_s):
+                for hilo in (h for hilos in self.hilos.values() for h in hilos):
+                    if hilo.barrido is None or hilo.barrido.done():
+                        hilo.barrido = hilo.executor.submit(_sin_fallar, fn)
+
+        threading.Thread(target=bucle, daemon=True, name="Nexus-periodico").start()
+
+    def ocupado(self):
+        with self.cond:
+            return bool(self.cola) or any(c.en_uso for c in self.carriles.values())
+
+    def estadisticas(self):
+        ahora = time.time()
+        transcurrido = max(ahora - self.inicio, 1e-9)
+        with self.cond:
+            return {
+                nombre: {
+                    "en_uso": c.en_uso,
+                    "capacidad": c.capacidad,
+                    "en_cola": sum(1 for t in self.cola if nombre in t.recursos),
+                    "trabajos": c.trabajos,
+                    "espera_prom_s": round(c.espera_total / c.trabajos, 3) if c.trabajos else 0.0,
+                    "espera_max_s": round(c.espera_max, 3),
+                    "utilizacion": round(c.ocupado(ahora) / transcurrido, 3),
+                }
+                for nombre, c in self.carriles.items()
+            }
+
+    def cerrar(self, esperar=True):
+        self._parar.set()
+        for hilo in (h for hilos in self.hilos.values() for h in hilos):
+            hilo.executor.shutdown(wait=esperar)
+        if self._sin_recursos is not None:
+            self._sin_recursos.shutdown(wait=esperar)
+
+    # --- internos (con self.cond tomado) ---
+    def _reservados(self):
+        reservados = {}
+        for trabajo in self.cola:
+            for r in trabajo.recursos:
+                reservados[r] = reservados.get(r, 0) + 1
+        return reservados
+
+    def _puede_iniciar(self, recursos, reservados):
+        return all(
+            self.carriles[r].en_uso + reservados.get(r, 0) < self.carriles[r].capacidad
+            for r in recursos
+        )
+
+    def _despachar(self):
+        reservados = {}
+        ahora = time.time()
+        for trabajo in list(self.cola):
+            if self._puede_iniciar(trabajo.recursos, reservados):
+                self.cola.remove(trabajo)
+                for r in trabajo.recursos:
+                    self.carriles[r].tomar(ahora - trabajo.encolado, ahora)
+                self._ejecutor(trabajo).submit(self._correr, trabajo)
+            else:
+                # Reservar lo que pide para que los de atrás no lo adelanten
+                for r in trabajo.recursos:
+                    reservados[r] = reservados.get(r, 0) + 1
+
+    def _ejecutor(self, trabajo):
+        if not trabajo.recursos:
+            if self._sin_recursos is None:
+                self._sin_recursos = ThreadPoolExecutor(thread_name_prefix="Nexus-libre")
+            return self._sin_recursos
+        principal = next(n for n in self.capacidades if n in trabajo.recursos)
+        # El carril tiene cupo, así que alguno de sus hilos está libre; mejor
+        # el que ya corrió esta etiqueta (ahí está su instancia caliente)
+        libres = [h for h in self.hilos[principal] if not h.ocupado]
+        hilo = next((h for h in libres if h.ultima == trabajo.etiqueta), libres[0])
+        hilo.ocupado, hilo.ultima = True, trabajo.etiqueta
+        trabajo.hilo = hilo
+        return hilo.executor
+
+    def _correr(self, trabajo):
+        if not trabajo.future.set_running_or_notify_cancel():
+            self._terminar(trabajo)
+            return
+        try:
+            try:
+                import pythoncom
+                pythoncom.CoInitialize()
+            except Exception:
+                pass
+            trabajo.future.set_result(trabajo.contexto.run(trabajo.fn, *trabajo.args, **trabajo.kwargs))
+        except BaseException as e:
+            trabajo.future.set_exception(e)
+        finally:
+            self._terminar(trabajo)
+
+    def _terminar(self, trabajo):
+        with self.cond:
+            ahora = time.time()
+            for r in trabajo.recursos:
+                self.carriles[r].liberar(ahora)
+            if trabajo.hilo is not None:
+                trabajo.hilo.ocupado = False
+            self._despachar()
+            self.cond.notify_all()
+
+
+def _sin_fallar(fn):
+    try:
+        fn()
+    except Exception as e:
+        print(f"⚠️ Tarea periódica del planificador falló: {e}")
@@ -1,9 +1,14 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
+import json
 import worker_sap
 import sys
 import io
+from nexus_jobs import JobManager, ColaLlena
+import nexus_metrics
 
 # Setup stdout for Windows
 if sys.platform == 'win32':
@@ -11,6 +16,23 @@ if sys.platform == 'win32':
 
 app = FastAPI()
 
+# Trabajos en segundo plano: el bot ya no corre dentro de la petición HTTP
+jobs = JobManager(worker_sap.run_automation)
+nexus_metrics.registrar_carriles(jobs.scheduler)
+nexus_metrics.medidor("nexus_jobs_en_cola", "Trabajos de la API esperando límite por bot",
+                      funcion=lambda: len(jobs.cola))
+
+def _revalidar(bot_type, params):
+    # El refresco de un resultado obsoleto es un trabajo más (visible en /jobs)
+    try:
+        jobs.enviar(bot_type, params)
+    except ColaLlena:
+        pass
+
+# Caché de resultados compartida con worker_sap (mismo índice en disco). Un
+# solo planificador en este proceso: el de los trabajos de la API
+worker_sap.preparar(scheduler=jobs.scheduler, revalidador=_revalidar)
+
 class Order(BaseModel):
     botId: str
     params: Dict[str, Any] = {}
@@ -20,19 +42,90 @@ class Order(BaseModel):
 def get_status():
     return {"status": "online", "mode": "local_bridge"}
 
+def _obtener_trabajo(job_id):
+    trabajo = jobs.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no existe")
+    return trabajo
+
+def _params(order, sin_cache):
+    # ?sinCache=true: ejecutar aunque haya un resultado reciente en caché
+    return {**order.params, "sinCache": True} if sin_cache else order.params
+
+@app.post("/jobs", status_code=202)
+def create_job(order: Order, sinCache: bool = False):
+    print(f"📥 [LOCAL SERVER] Trabajo recibido: {order.botId}")
+    try:
+        trabajo = jobs.enviar(order.botId, _params(order, sinCache), order.filePath)
+    except ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"jobId": trabajo.id, "status": trabajo.status}
+
+@app.get("/jobs")
+def list_jobs():
+    return jobs.listar()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _obtener_trabajo(job_id).resumen()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    trabajo = _obtener_trabajo(job_id)
+    jobs.cancelar(job_id)
+    return {"jobId": trabajo.id, "status": trabajo.status, "cancelRequested": trabajo.cancel.cancelado}
+
+@app.get("/jobs/{job_id}/logs")
+async def stream_job_logs(job_id: str, desde: int = 0):
+    """Server-Sent Events: una línea de log por evento y un evento 'end' al terminar."""
+    trabajo = _obtener_trabajo(job_id)
+
+    async def eventos():
+        posicion = desde
+        while True:
+            terminado = trabajo.terminado()
+            lineas, posicion = trabajo.logs_desde(posicion)
+            for linea in lineas:
+                yield f"data: {json.dumps(linea)}\n\n"
+            if terminado and not lineas:
+                yield f"event: end\ndata: {json.dumps({'status': trabajo.status})}\n\n"
+                return
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/cache")
+def get_cache():
+    return worker_sap.RESULTADOS.estadisticas()
+
+@app.delete("/cache")
+def clear_cache(bot: Optional[str] = None):
+    return {"invalidadas": worker_sap.RESULTADOS.invalidar(bot)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(nexus_metrics.exportar(), media_type="text/plain; version=0.0.4")
+
 @app.post("/execute")
-def execute_bot(order: Order):
+def execute_bot(order: Order, sinCache: bool = False):
+    """Compatibilidad: encola el trabajo y espera a que termine."""
     print(f"📥 [LOCAL SERVER] Recibida orden: {order.botId}")
     try:
-        # Call the refactored logic from worker_sap
-        # We pass params as the third arg
-        result = worker_sap.run_automation(order.botId, order.filePath, order.params)
-        return {"status": "success", "result": result}
-    except Exception as e:
-        print(f"❌ [LOCAL SERVER] Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        trabajo = jobs.enviar(order.botId, _params(order, sinCache), order.filePath)
+    except ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    trabajo.esperar()
+    if trabajo.status == "success":
+        return {"status": "success", "result": trabajo.result}
+    print(f"❌ [LOCAL SERVER] Error: {trabajo.error}")
+    raise HTTPException(status_code=500, detail=trabajo.error or trabajo.status)
 
-if __name__ == "__main__":
+def main():
     import uvicorn
+    nexus_metrics.iniciar_snapshots("server")
     # Run on port 8000
     uvicorn.run(app, host="0.0.0.0", port=8000)
+
+if __name__ == "__main__":
+    main()
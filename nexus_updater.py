@@ -2,7 +2,6 @@ import os
 import sys
 import shutil
 import time
-import requests
 import subprocess
 import json
 from tkinter import messagebox
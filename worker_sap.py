@@ -1,42 +1,47 @@
 import time
 import os
 import sys
-import requests
 import tempfile
+import shutil
 import io
 import json
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from nexus_intake import crear_intake
+from nexus_claim import (reclamar_orden, identidad_worker, url_orden, url_sin_terminar, reciclar_vencidas,
+                         Latido, RECICLAR_S)
+from nexus_logship import LogShipper
+from nexus_http import http
+from nexus_scheduler import ResourceScheduler
+from nexus_bots import recursos_bot, cargar_clase, obtener as obtener_bot, clave_coalescencia, clave_resultado
+from nexus_priority import ordenar_ordenes
+from nexus_capture import capturar, instalar as instalar_captura, terminal
+from nexus_botpool import BotPool
+from nexus_downloads import DownloadCache
+from nexus_outbox import Outbox
+from nexus_cancel import CancelToken, Cancelado, TiempoAgotado, con_token, token_actual, verificar_cancelacion
+from nexus_aislado import ejecutar_aislado, estadisticas as estadisticas_aislados
+from nexus_resultados import ResultCache
+from nexus_pulso import latir
+from nexus_metrics import registrar_ejecucion, registrar_carriles, iniciar_snapshots, medidor, contador, EN_CURSO
 
 # --- CONFIGURACIÓN UTF-8 PARA WINDOWS ---
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-# --- IMPORTA TUS BOTS EXISTENTES ---
+# --- RUTAS DE TUS BOTS EXISTENTES ---
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Bots'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Tools'))
 
-try:
-    from Tx_MIGO3 import SapMigoBotTurbo
-    from Bot_Pallet import SapBotPallet
-    from Bot_Transporte import SapBotTransporte
-    from Bot_Auditor import SapBotAuditor
-    from Bot_Traspaso_LT01 import SapBotTraspasoLT01
-    from Bot_Conversiones_UMV import SapBotConversiones
-    from Bot_Conciliacion_Email import SapBotConciliacionEmail
-    from Bot_Consolidacion_Zonales import BotConsolidacionZonales
-    from Bot_Analisis_Zonales import BotAnalisisZonales
-    from Bot_Vision import BotVisionPizarra
-except ImportError as e:
-    print(f"❌ Error importando bots: {e}")
-    sys.exit(1)
+# Los módulos de bots se importan recién al llegar su primera orden (nexus_bots)
 
 # --- CONFIGURACIÓN ---
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-PC_NAME = "SANJORGE1"
+PC_NAME = identidad_worker()
 
 # Headers globales para Supabase
 HEADERS = {
@@ -48,6 +53,68 @@ HEADERS = {
     "Content-Profile": "public"
 }
 
+AGRUPADAS = contador("nexus_ordenes_agrupadas_total", "Órdenes resueltas por la ejecución de otra idéntica", ("bot",))
+
+# --- SERVICIOS DEL WORKER ---
+# No se crean al importar: nexus_server importa este módulo por run_automation
+# y no debe abrir otro envío de la bandeja de salida ni otro planificador.
+# preparar() crea lo que necesita run_automation; start_worker() el resto.
+
+# Envío de logs en segundo plano (compartido por todas las órdenes)
+LOG_SHIPPER = None
+# Cambios de estado de las órdenes: primero a SQLite local, luego a Supabase
+OUTBOX = None
+# Caché de archivos de entrada (reintentos y órdenes repetidas no vuelven a descargar)
+DESCARGAS = None
+# Instancias de bot ya conectadas (SAP/Outlook) reutilizadas entre órdenes
+BOT_POOL = None
+# Órdenes que no comparten recursos (SAP, Outlook, Excel, CPU) corren en paralelo
+SCHEDULER = None
+# Resultados de reportes recientes (bots con `cache` en nexus_bots)
+RESULTADOS = None
+
+_preparando = threading.Lock()
+
+def preparar(scheduler=None, revalidador=None):
+    """
+    Crea (una sola vez) el pool de bots, el planificador y la caché de
+    resultados. nexus_server pasa su propio planificador y revalidador para
+    que haya uno solo por proceso.
+    """
+    global BOT_POOL, SCHEDULER, RESULTADOS
+    with _preparando:
+        if SCHEDULER is None:
+            SCHEDULER = scheduler or ResourceScheduler()
+        if BOT_POOL is None:
+            BOT_POOL = BotPool(ttl_s=int(os.getenv("NEXUS_BOT_TTL_S", "900")))
+            # Sin tráfico nadie llama a prestar(): el barrido corre en cada hilo
+            # de carril para que el TTL se cumpla y COM se libere en su apartment
+            SCHEDULER.periodico(min(max(BOT_POOL.ttl_s / 4, 1), 60), BOT_POOL.evictar_inactivos)
+        if RESULTADOS is None:
+            RESULTADOS = ResultCache(max_bytes=int(os.getenv("NEXUS_RESULTADOS_MB", "512")) * 1024 * 1024,
+                                     revalidador=revalidador or _revalidar)
+
+def _preparar_worker():
+    """Lo que sólo usa el worker: envío de logs, descargas y la bandeja de salida."""
+    global LOG_SHIPPER, OUTBOX, DESCARGAS
+    preparar()
+    LOG_SHIPPER = LogShipper(SUPABASE_URL, HEADERS)
+    DESCARGAS = DownloadCache(max_bytes=int(os.getenv("NEXUS_DESCARGAS_MB", "1024")) * 1024 * 1024)
+    OUTBOX = Outbox(HEADERS)
+
+def _revalidar(bot_type, params):
+    """Refresco en segundo plano de un resultado obsoleto, en el carril del bot."""
+    SCHEDULER.enviar(bot_type, recursos_bot(bot_type, params), _refrescar, bot_type, params)
+
+def _refrescar(bot_type, params):
+    # Contexto propio: no escribir en los logs ni heredar la cancelación de la orden que lo pidió
+    with capturar(terminal()), con_token(None):
+        try:
+            print(f"♻️ Refrescando en segundo plano el resultado de {bot_type}...")
+            run_automation(bot_type, None, params)
+        except BaseException as e:
+            print(f"⚠️ No se pudo refrescar {bot_type}: {e}")
+
 def init_supabase():
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("❌ Error: Faltan variables de entorno SUPABASE_URL o SUPABASE_KEY")
@@ -57,100 +124,159 @@ def start_worker():
     init_supabase()
     print(f"🤖 WORKER SAP INICIADO EN {PC_NAME}")
     print("📡 Escuchando órdenes desde Supabase (NexusStaging)...")
+    instalar_captura()
+    _preparar_worker()
+    # Sólo el worker envía la bandeja de salida (con bloqueo: un drenador por archivo)
+    OUTBOX.iniciar()
+    # Lo que este PC dejó corriendo antes de reiniciarse vuelve a la cola ya
+    try:
+        reciclar_vencidas(SUPABASE_URL, HEADERS, huerfanas_de=PC_NAME)
+    except Exception as e:
+        print(f"⚠️ Error recuperando órdenes huérfanas: {e}")
+    registrar_carriles(SCHEDULER)
+    medidor("nexus_logs_retraso_segundos", "Antigüedad del log más viejo sin enviar", funcion=LOG_SHIPPER.lag_s)
+    medidor("nexus_outbox_pendientes", "Cambios de estado guardados sin enviar", funcion=OUTBOX.pendientes)
+    medidor("nexus_outbox_retraso_segundos", "Antigüedad del cambio de estado más viejo sin enviar",
+            funcion=OUTBOX.antiguedad_s)
+    iniciar_snapshots("worker_sap")
     procesar_ordenes()
 
 def procesar_ordenes():
     print("🔍 Buscando órdenes pendientes...")
-    url = f"{SUPABASE_URL}/rest/v1/ordenes_bot?status=eq.pending"
+    intake = crear_intake(SUPABASE_URL, HEADERS)
+    print(f"📡 Modo de ingesta: {intake.modo}")
+    ultimo_reporte = time.time()
+    ultimo_reciclaje = 0
+    declinadas = set()   # pendientes salteadas por carril ocupado en la última vuelta
+    en_ejecucion = {}    # id de la orden -> Future de su ejecutar_tarea
+    espera_local = 1.0   # backoff si el intake no puede filtrar las salteadas
     
     while True:
+        # Pulso de vida para nexus_manager: si este bucle se cuelga, deja de latir
+        latir("worker_sap")
+        if time.time() - ultimo_reporte > 3600:
+            print(f"📊 HTTP: {http.estadisticas()} | Logs: {LOG_SHIPPER.estadisticas()}")
+            print(f"📊 Carriles: {SCHEDULER.estadisticas()}")
+            print(f"📊 Pool de bots: {BOT_POOL.estadisticas()}")
+            print(f"📊 Bots aislados: {estadisticas_aislados()}")
+            print(f"📊 Descargas: {DESCARGAS.estadisticas()}")
+            print(f"📊 Outbox: {OUTBOX.estadisticas()}")
+            print(f"📊 Caché de resultados: {RESULTADOS.estadisticas()}")
+            ultimo_reporte = time.time()
+        if time.time() - ultimo_reciclaje > RECICLAR_S:
+            # Órdenes de workers caídos: de vuelta a la cola (o a dead_letter)
+            try:
+                reciclar_vencidas(SUPABASE_URL, HEADERS)
+            except Exception as e:
+                print(f"⚠️ Error reciclando órdenes vencidas: {e}")
+            ultimo_reciclaje = time.time()
         try:
-            response = requests.get(url, headers=HEADERS)
-            if response.status_code == 200:
-                ordenes = response.json()
-                for datos in ordenes:
-                    if datos.get('worker') != PC_NAME:
-                        print(f"\n📩 NUEVA ORDEN RECIBIDA: {datos.get('tipo_bot')}")
-                        ejecutar_tarea(datos.get('id'), datos)
-            else:
-                print(f"⚠️ Error Supabase: {response.status_code} - {response.text}")
+            # Bloquea hasta que haya órdenes (long-poll) o pase un ciclo de polling.
+            # Se atienden por prioridad, plazo y antigüedad (nexus_priority)
+            # Con `corriendo` el long-poll vuelve cuando alguna deja de estar
+            # 'running' (se liberó su carril). Las que ya terminaron se pasan una
+            # vez más: su carril quedó libre justo después de terminar
+            terminadas = [i for i, futuro in en_ejecucion.items() if futuro.done()]
+            ordenes = ordenar_ordenes(intake.esperar_ordenes(declinadas, set(en_ejecucion)))
+            for doc_id in terminadas:
+                del en_ejecucion[doc_id]
+            if not ordenes:
+                continue  # ciclo de espera vencido: las salteadas siguen salteadas
+            lanzadas = 0
+            bloqueados = set()
+            agrupadas = set()
+            declinadas = set()
+            for datos in ordenes:
+                if datos.get('id') in agrupadas:
+                    continue
+                bot_type = datos.get('tipo_bot')
+                recursos = recursos_bot(bot_type, datos.get('parametros') or {})
+                # Sólo reclamamos lo que puede arrancar ya; lo demás queda para
+                # otro PC libre. Los recursos de una orden salteada quedan
+                # reservados para que las de menor prioridad no la adelanten.
+                if recursos & bloqueados or not SCHEDULER.disponible(recursos):
+                    bloqueados |= recursos
+                    declinadas.add(datos.get('id'))
+                    continue
+                token = reclamar_orden(SUPABASE_URL, HEADERS, datos.get('id'), PC_NAME)
+                if not token:
+                    continue
+                print(f"\n📩 NUEVA ORDEN RECIBIDA: {bot_type}")
+                seguidoras = _reclamar_identicas(datos, ordenes, agrupadas)
+                en_ejecucion[datos.get('id')] = SCHEDULER.enviar(
+                    bot_type, recursos, ejecutar_tarea, datos.get('id'), datos, token, seguidoras,
+                    encolado=_epoch(datos.get('fecha_creacion')))
+                lanzadas += 1
+            if lanzadas or not declinadas:
+                espera_local = 1.0
+            elif not intake.filtra_declinadas:
+                # Todo lo pendiente choca con lo que ya corre y el intake no puede
+                # seguir esperando por nosotros: esperar a que se libere un carril
+                SCHEDULER.esperar_cambio(timeout=espera_local)
+                espera_local = min(espera_local * 2, 30)
         except Exception as e:
             print(f"⚠️ Error consultando órdenes: {e}")
-        
-        time.sleep(3)
+            time.sleep(3)
+
+def _reclamar_identicas(datos, ordenes, agrupadas):
+    """
+    Reclama las otras órdenes pendientes idénticas a `datos` (bots coalescibles)
+    para resolverlas con una sola ejecución. Devuelve [(id, lease_token)].
+    """
+    clave = clave_coalescencia(datos.get('tipo_bot'), datos.get('parametros'), datos.get('ruta_archivo'))
+    if clave is None:
+        return []
+    seguidoras = []
+    for otra in ordenes:
+        if otra.get('id') == datos.get('id') or otra.get('id') in agrupadas:
+            continue
+        if clave_coalescencia(otra.get('tipo_bot'), otra.get('parametros'), otra.get('ruta_archivo')) != clave:
+            continue
+        token = reclamar_orden(SUPABASE_URL, HEADERS, otra.get('id'), PC_NAME)
+        if token:
+            agrupadas.add(otra.get('id'))
+            seguidoras.append((otra.get('id'), token))
+            LOG_SHIPPER.enviar(otra.get('id'), f"🔗 Orden idéntica a {datos.get('id')}: se resuelve con esa ejecución.")
+    if seguidoras:
+        AGRUPADAS.inc(len(seguidoras), bot=datos.get('tipo_bot'))
+        print(f"🔗 {len(seguidoras)} orden(es) {datos.get('tipo_bot')} idénticas agrupadas en esta ejecución")
+    return seguidoras
+
+def _epoch(fecha):
+    try:
+        return datetime.fromisoformat(str(fecha).replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return None
 
 # --- LOGGER SUPABASE ---
 class SupabaseLogger:
-    def __init__(self, doc_id):
+    def __init__(self, doc_id, terminal=None):
         self.doc_id = doc_id
-        self.terminal = sys.stdout
-        self.url = f"{SUPABASE_URL}/rest/v1/rpc/append_execution_log"
+        self.terminal = terminal or sys.stdout
 
     def write(self, message):
         self.terminal.write(message)
         self.terminal.flush()
         text = message.strip()
         if text:
-            try:
-                requests.post(self.url, headers=HEADERS, json={
-                    'order_id': self.doc_id,
-                    'log_line': text
-                })
-            except:
-                pass
+            # No bloquea: LOG_SHIPPER lo envía por lotes en segundo plano
+            LOG_SHIPPER.enviar(self.doc_id, text)
 
     def flush(self):
         self.terminal.flush()
 
+    def close(self):
+        """Vacía los logs pendientes de esta orden antes de cerrar su estado."""
+        if not LOG_SHIPPER.drenar(self.doc_id):
+            self.terminal.write(f"⚠️ Logs sin enviar al cerrar la orden: {LOG_SHIPPER.estadisticas()}\n")
+        elif LOG_SHIPPER.descartadas:
+            self.terminal.write(f"⚠️ Líneas de log descartadas (buffer lleno): {LOG_SHIPPER.descartadas}\n")
+
 def run_automation(bot_type, ruta_archivo, params):
     """Core logic to dispatch bots. Used by both Cloud and Local modes."""
     execution_result = None
 
-    if bot_type == 'MIGO':
-        bot = SapMigoBotTurbo()
-        bot.run(ruta_archivo)
-        
-    elif bot_type == 'PALLET':
-        bot = SapBotPallet()
-        bot.run(ruta_archivo)
-        
-    elif bot_type == 'TRANSPORTE':
-        bot = SapBotTransporte()
-        fechas = params.get('fechas')
-        enviar_correo = params.get('sendEmail', False)
-        print(f"🚚 Ejecutando Bot Transporte con fechas: {fechas}, enviar_correo: {enviar_correo}")
-        bot.run(fechas, enviar_correo)
-        
-    elif bot_type == 'AUDITOR':
-        bot = SapBotAuditor()
-        almacen = params.get('almacen', 'SGVT')
-        execution_result = bot.run(almacen)
-        
-    elif bot_type == 'LT01':
-        bot = SapBotTraspasoLT01()
-        bot.run(ruta_archivo)
-        
-    elif bot_type == 'UMV':
-        bot = SapBotConversiones()
-        bot.run(ruta_archivo)
-        
-    elif bot_type == 'CONCILIACION_EMAIL':
-        bot = SapBotConciliacionEmail()
-        bot.run()
-        
-    elif bot_type == 'ZONALES':
-        bot = BotConsolidacionZonales()
-        bot.run()
-
-    elif bot_type == 'ANALISIS_ZONALES':
-        bot = BotAnalisisZonales()
-        bot.run()
-        
-    elif bot_type == 'VISION':
-        bot = BotVisionPizarra()
-        bot.run(ruta_archivo)
-        
-    elif bot_type == 'SYSTEM_RESTART':
+    if bot_type == 'SYSTEM_RESTART':
         print("🔄 REINICIO SOLICITADO")
         import subprocess
         try:
@@ -167,20 +293,59 @@ def run_automation(bot_type, ruta_archivo, params):
         except Exception as e:
             print(f"❌ Error lanzando reinicio: {e}")
             raise e
-    
+
+    preparar()
+    bot_def = obtener_bot(bot_type)
+    params = params or {}
+    # La caché va antes de importar el bot: un acierto no carga pandas/win32com
+    clave = clave_resultado(bot_type, params, ruta_archivo)
+    if clave and not params.get('sinCache'):
+        guardado, estado, edad = RESULTADOS.buscar(clave, bot_def.cache, bot_type)
+        if estado:
+            print(f"♻️ {bot_type} {bot_def.parametros(params)}: resultado en caché de hace {edad / 60:.0f} min, "
+                  f"no se vuelve a ejecutar.")
+            if estado == "obsoleto" and RESULTADOS.revalidar(clave, bot_type, params):
+                print("   (se está actualizando en segundo plano)")
+            return guardado if bot_def.devuelve_resultado else None
+
+    args = bot_def.argumentos(ruta_archivo, params)
+    if bot_def.parametros():
+        print(f"▶️ Ejecutando {bot_type} con parámetros: {bot_def.parametros(params)}")
+    verificar_cancelacion()
+    if bot_def.timeout_s:
+        # Proceso aparte (caliente entre órdenes): si se cuelga (diálogo SAP), se mata al vencer el tiempo
+        resultado = ejecutar_aislado(bot_type, args, bot_def.timeout_s, token_actual())
     else:
-        raise Exception(f"Tipo de bot desconocido: {bot_type}")
-        
+        try:
+            clase = cargar_clase(bot_type)
+        except ImportError as e:
+            raise Exception(f"No se pudo cargar el bot {bot_type}: {e}")
+        with BOT_POOL.prestar(bot_type, clase) as bot:
+            resultado = bot.run(*args)
+    if clave:
+        RESULTADOS.guardar(clave, bot_type, resultado)
+    if bot_def.devuelve_resultado:
+        execution_result = resultado
     return execution_result
 
-def ejecutar_tarea(doc_id, datos):
-    # 1. Avisar que empezamos
-    url_order = f"{SUPABASE_URL}/rest/v1/ordenes_bot?id=eq.{doc_id}"
-    requests.patch(url_order, headers=HEADERS, json={
-        'status': 'running',
-        'worker': PC_NAME,
-        'inicio': datetime.now().isoformat()
-    })
+def ejecutar_tarea(doc_id, datos, token, seguidoras=()):
+    """
+    Ejecuta una orden ya reclamada (token = lease_token del reclamo).
+    `seguidoras` [(id, token)]: órdenes idénticas ya reclamadas que reciben el
+    mismo resultado sin ejecutar el bot otra vez.
+    """
+    # Escrituras posteriores sólo aplican mientras el reclamo siga siendo nuestro
+    url_order = url_orden(SUPABASE_URL, doc_id, token)
+    reclamos = [(doc_id, token), *seguidoras]
+    # Latidos: mientras la orden corre (y hasta que su estado final salga de
+    # la bandeja) su lease no vence; si este proceso muere, otro worker la
+    # recicla al vencer. El de la orden también trae el pedido de
+    # cancelación (cancel_requested)
+    cancel = CancelToken()
+    latidos = [Latido(SUPABASE_URL, HEADERS, d, t, cancel=cancel if d == doc_id else None).iniciar()
+               for d, t in reclamos]
+    creada = _epoch(datos.get('fecha_creacion'))
+    espera_s = time.time() - creada if creada else None
 
     bot_type = datos.get('tipo_bot')
     ruta_archivo = datos.get('ruta_archivo')
@@ -188,63 +353,109 @@ def ejecutar_tarea(doc_id, datos):
     print(f"🔍 Datos completos de la orden: {datos}")
     
     # DESCARGAR ARCHIVO SI ES URL
+    archivo_trabajo = None
     if ruta_archivo and ruta_archivo.startswith("http"):
         try:
             print(f"⬇️ Descargando archivo desde: {ruta_archivo[:50]}...")
-            response = requests.get(ruta_archivo)
-            if response.status_code == 200:
-                nombre_original = datos.get('nombre_archivo_original', 'archivo_temp.xlsx')
-                ext = os.path.splitext(nombre_original)[1] or ".xlsx"
-                temp_dir = tempfile.gettempdir()
-                archivo_local = os.path.join(temp_dir, f"temp_bot_{int(time.time())}{ext}")
-                with open(archivo_local, 'wb') as f:
-                    f.write(response.content)
-                ruta_archivo = archivo_local
-                print(f"✅ Archivo descargado en: {archivo_local}")
-            else:
-                print(f"⚠️ Error descargando archivo: Status {response.status_code}")
+            nombre_original = datos.get('nombre_archivo_original') or 'archivo_temp.xlsx'
+            ext = os.path.splitext(nombre_original)[1] or ".xlsx"
+            # Desde la caché (sin red si la URL ya se bajó); el bot trabaja sobre
+            # una copia porque algunos escriben en el archivo de entrada
+            cacheado = DESCARGAS.obtener(ruta_archivo, ext)
+            archivo_trabajo = os.path.join(tempfile.gettempdir(), f"temp_bot_{doc_id}{ext}")
+            shutil.copyfile(cacheado, archivo_trabajo)
+            ruta_archivo = archivo_trabajo
+            print(f"✅ Archivo listo en: {archivo_trabajo}")
         except Exception as e:
             print(f"❌ Error descargando archivo: {e}")
     elif not ruta_archivo and datos.get('nombre_archivo_original'):
         ruta_archivo = datos.get('nombre_archivo_original')
         print(f"📂 Modo Local/Abierto: Usando nombre '{ruta_archivo}'")
 
-    # CAPTURAR LOGS
-    original_stdout = sys.stdout
-    sys.stdout = SupabaseLogger(doc_id)
+    # CAPTURAR LOGS (sólo la salida de este trabajo va a esta orden)
+    logger = SupabaseLogger(doc_id, terminal())
+    inicio = time.perf_counter()
+    duracion = None
+    EN_CURSO.inc(bot=bot_type)
 
     try:
-        # CALL THE REFACTORED FUNCTION
-        execution_result = run_automation(bot_type, ruta_archivo, datos.get('parametros', {}))
+        with capturar(logger), con_token(cancel):
+            # CALL THE REFACTORED FUNCTION
+            execution_result = run_automation(bot_type, ruta_archivo, datos.get('parametros', {}))
+            if execution_result != "RESTARTING":
+                print("✅ Tarea finalizada con éxito.")
+        duracion = time.perf_counter() - inicio
+        logger.close()
+        registrar_ejecucion(bot_type, espera_s, duracion, "success")
 
         # Handle restart special case
         if execution_result == "RESTARTING":
-            requests.patch(url_order, headers=HEADERS, json={
+            _detener(latidos)
+            OUTBOX.encolar(url_order, {
                 'status': 'success',
                 'worker': PC_NAME,
                 'fin': datetime.now().isoformat(),
                 'execution_logs': ["✅ Sistema reiniciando..."]
-            })
-            time.sleep(2)
-            sys.exit(0)
-
-        print("✅ Tarea finalizada con éxito.")
-        sys.stdout = original_stdout
-        
-        requests.patch(url_order, headers=HEADERS, json={
+            }, respaldo=url_sin_terminar(SUPABASE_URL, doc_id))
+            # Lo que no alcance a salir se reenvía al arrancar de nuevo
+            OUTBOX.drenar(timeout=10)
+            # Corre en un hilo del scheduler: sys.exit sólo terminaría el hilo
+            os._exit(0)
+
+        _publicar(reclamos, latidos, {
             'status': 'success',
             'fin': datetime.now().isoformat(),
             'mensaje': 'Ejecución completada en SAP.',
             'result_payload': execution_result
         })
 
+    except Cancelado as e:
+        logger.close()
+        registrar_ejecucion(bot_type, espera_s, time.perf_counter() - inicio, "cancelled")
+        print(f"⛔ Orden cancelada: {e}")
+        _publicar(reclamos, latidos, {
+            'status': 'cancelled',
+            'fin': datetime.now().isoformat(),
+            'error': str(e)
+        })
     except Exception as e:
-        sys.stdout = original_stdout
+        logger.close()
+        if duracion is None:
+            resultado = "timeout" if isinstance(e, TiempoAgotado) else "error"
+            registrar_ejecucion(bot_type, espera_s, time.perf_counter() - inicio, resultado)
         print(f"❌ Error ejecutando bot: {e}")
-        requests.patch(url_order, headers=HEADERS, json={
+        _publicar(reclamos, latidos, {
             'status': 'error',
             'error': str(e)
         })
+    finally:
+        # Los latidos soltados por _publicar los detiene la bandeja al enviar
+        _detener([l for l in latidos if not l.soltado])
+        EN_CURSO.dec(bot=bot_type)
+        if archivo_trabajo and os.path.exists(archivo_trabajo):
+            try:
+                os.remove(archivo_trabajo)
+            except OSError:
+                pass
+
+def _detener(latidos):
+    for latido in latidos:
+        latido.detener()
+
+def _publicar(reclamos, latidos, cambios):
+    """
+    Estado final de la orden y de las idénticas agrupadas con ella. Cada
+    latido sigue renovando hasta que la bandeja envía el estado de su orden;
+    si el reclamo venció igual (corte más largo que LEASE_S), la bandeja lo
+    aplica mientras la orden siga sin terminar (url_sin_terminar).
+    """
+    lider = reclamos[0][0]
+    for i, ((doc_id, token), latido) in enumerate(zip(reclamos, latidos)):
+        extra = {'mensaje': f"Resultado compartido con la orden {lider}."} if i else {}
+        OUTBOX.encolar(url_orden(SUPABASE_URL, doc_id, token), {'worker': PC_NAME, **cambios, **extra},
+                       respaldo=url_sin_terminar(SUPABASE_URL, doc_id),
+                       al_terminar=lambda latido=latido: latido.detener(esperar=False))
+        latido.soltar()
 
 if __name__ == "__main__":
     start_worker()
\ No newline at end of file
@@ -1,7 +1,7 @@
-import time
 import sys
 import os
 from datetime import datetime
+from nexus_pulso import latir, dormir
 
 # Asegurar que podemos importar desde Bots
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Bots'))
@@ -21,19 +21,20 @@ def main():
     bot = BotConsolidacionZonales()
     
     while True:
+        latir("worker_zonales")
         try:
             print(f"\n⏰ Ejecutando ciclo Zonales: {datetime.now().strftime('%H:%M:%S')}")
             bot.run() # Esto ejecuta un ciclo de escaneo y consolidación
             
             print("💤 Durmiendo 60 minutos...")
-            time.sleep(3600) 
+            dormir("worker_zonales", 3600)
             
         except KeyboardInterrupt:
             print("🛑 Detenido por usuario.")
             break
         except Exception as e:
             print(f"❌ Error en ciclo worker zonales: {e}")
-            time.sleep(60) # Esperar 1 min tras error antes de reintentar
+            dormir("worker_zonales", 60) # Esperar 1 min tras error antes de reintentar
 
 if __name__ == "__main__":
     main()